@@ -6,41 +6,132 @@ based on GPS coordinates from configured entities.
 """
 from __future__ import annotations
 
+from contextlib import suppress
+from dataclasses import asdict
+from functools import partial
 import logging
-import math
+import os
+from datetime import datetime, timedelta
 from typing import Any
 
 import voluptuous as vol
 
 from homeassistant.config_entries import ConfigEntry
-from homeassistant.const import EVENT_HOMEASSISTANT_STARTED
-from homeassistant.core import HomeAssistant, ServiceCall, callback, Event
+from homeassistant.const import EVENT_HOMEASSISTANT_STARTED, Platform
+from homeassistant.core import (
+    HomeAssistant,
+    ServiceCall,
+    ServiceResponse,
+    SupportsResponse,
+    callback,
+    Event,
+)
+from homeassistant.exceptions import HomeAssistantError
 from homeassistant.helpers import config_validation as cv
-from homeassistant.helpers.event import async_track_state_change_event
+from homeassistant.helpers.dispatcher import async_dispatcher_send
+from homeassistant.helpers.event import (
+    async_call_later,
+    async_track_state_change_event,
+    async_track_time_interval,
+)
+from homeassistant.helpers.storage import Store
 from homeassistant.helpers.typing import ConfigType
+from homeassistant.util import dt as dt_util
 
 from .const import (
     DOMAIN,
     SERVICE_SET_TIMEZONE,
     SERVICE_SET_GEO_TIMEZONE,
-    CONF_LATITUDE_ENTITY,
-    CONF_LONGITUDE_ENTITY,
+    SERVICE_LOOKUP_TIMEZONES,
+    SERVICE_LOAD_ROUTE,
+    SERVICE_CLEAR_ROUTE,
+    SERVICE_GET_TRACK,
+    SERVICE_SET_OVERRIDE,
+    SERVICE_REMOVE_OVERRIDE,
+    SERVICE_SIMULATE,
     CONF_UPDATE_THRESHOLD,
+    CONF_LOCATION_THRESHOLD,
+    CONF_LOCATION_INTERVAL,
+    CONF_SMOOTHING,
+    CONF_SOURCES,
+    CONF_SOURCE_MAX_AGE,
+    CONF_CACHE_CELL_SIZE,
+    CONF_CACHE_SIZE,
+    CONF_GRID_RESOLUTION,
+    CONF_DATA_FILE,
+    CONF_REGION_FILE,
+    CONF_STREAM,
+    CONF_MODE,
+    CONF_FLEET_TRACKERS,
+    MODE_FLEET,
+    SOURCE_OPTIONS,
+    DATA_RESOLVER,
+    DATA_ROUTE,
+    DATA_OVERRIDES,
+    SIGNAL_METRICS_UPDATED,
+    METRICS_SIGNAL_INTERVAL,
+    SIGNAL_REGION_UPDATED,
     DEFAULT_UPDATE_THRESHOLD,
+    DEFAULT_LOCATION_THRESHOLD,
+    DEFAULT_LOCATION_INTERVAL,
+    DEFAULT_CACHE_CELL_SIZE,
+    DEFAULT_CACHE_SIZE,
+    DEFAULT_GRID_RESOLUTION,
+    DEFAULT_SMOOTHING,
+    DEFAULT_SOURCE_MAX_AGE,
+    DEFAULT_SIMULATION_INTERVAL,
+    UPDATE_SETTLE_TIME,
+    STORAGE_KEY,
+    STORAGE_VERSION,
+    STORAGE_SAVE_DELAY,
+    TRACK_STORAGE_KEY,
+    TRACK_FLUSH_INTERVAL,
+    OVERRIDES_STORAGE_KEY,
     ATTR_LATITUDE,
     ATTR_LONGITUDE,
     ATTR_TIMEZONE,
+    ATTR_COORDINATES,
+    ATTR_GPX,
+    ATTR_POLYLINE,
+    ATTR_START,
+    ATTR_END,
+    ATTR_NAME,
+    ATTR_RADIUS,
+    ATTR_LOCATION,
+    ATTR_TIME,
+    ATTR_ACCURACY,
+    ATTR_INTERVAL,
+    ATTR_OUTPUT,
+    MAX_LOOKUP_COORDINATES,
+    MAX_ROUTE_POINTS,
+    MAX_OVERRIDE_RADIUS,
+    MAX_OVERRIDE_POINTS,
+    MAX_SIMULATION_FIXES,
 )
+from .boundary import SafeZone
+from .fleet import FleetTracker
+from .gate import MovementGate
+from .geo import consecutive_miles, haversine_miles as _haversine_miles
+from .metrics import ArveeMetrics
+from .overrides import (
+    LOCATION_BEHAVIOURS,
+    LOCATION_FOLLOW,
+    OverrideIndex,
+    RegionOverride,
+)
+from .pipeline import ACCEPTED_RESULTS, async_process_fix
+from .resolver import TimezoneResolver
+from .route import decode_polyline, parse_gpx
+from .scheduler import LocationUpdateScheduler
+from .simulate import SimulatedFix, Simulation
+from .source import FixSelector, GpsFix
+from .stream import GpsStream
+from .track import TripLog, load_trip_log, save_trip_log
+from .worker import LookupSuperseded
 
 _LOGGER = logging.getLogger(__name__)
 
-# Try to import tzfpy
-try:
-    from tzfpy import get_tz
-    TZFPY_AVAILABLE = True
-except ImportError:
-    TZFPY_AVAILABLE = False
-    _LOGGER.warning("tzfpy not available, timezone lookups will not work")
+PLATFORMS = [Platform.SENSOR]
 
 
 async def async_setup(hass: HomeAssistant, config: ConfigType) -> bool:
@@ -52,17 +143,76 @@ async def async_setup(hass: HomeAssistant, config: ConfigType) -> bool:
 async def async_setup_entry(hass: HomeAssistant, entry: ConfigEntry) -> bool:
     """Set up Arvee from a config entry."""
     hass.data.setdefault(DOMAIN, {})
-    
+
+    if entry.data.get(CONF_MODE) == MODE_FLEET:
+        return await _async_setup_fleet_entry(hass, entry)
+
+    store = _async_get_store(hass, entry)
+
     # Store config
-    hass.data[DOMAIN][entry.entry_id] = {
+    hass.data[DOMAIN][entry.entry_id] = data = {
         "config": entry.data,
+        "store": store,
+        "store_dirty": False,
         "last_lat": None,
         "last_lon": None,
+        "timezone": None,
+        "fix_time": None,
+        "safe_zone": None,
+        "border_crossing": None,
+        "location_updated": None,
+        "pending_location": None,
+        "fix_received": None,
+        "pending_received": None,
+        "location_flush": None,
+        "metrics_signalled": None,
+        "metrics_signal": None,
         "unsub": None,
+        "stream": None,
+        "scheduler": None,
+        "initial_update": None,
+        "initial_update_time": None,
+        "route_distance": None,
+        "country": None,
+        "region": None,
+        "region_position": None,
+        "override": None,
+        "track": None,
+        "metrics": ArveeMetrics(),
     }
 
+    # Pick up where we left off before the restart
+    if stored := await store.async_load():
+        _async_restore_fix(data, stored)
+    try:
+        track = await hass.async_add_executor_job(
+            load_trip_log, _track_path(hass, entry)
+        )
+    except (OSError, ValueError) as err:
+        _LOGGER.warning("Could not read the trip log, starting a new one: %s", err)
+        track = None
+    data["track"] = track or TripLog()
+
+    async def async_flush_track(_now: datetime) -> None:
+        """Write the trip log if it changed."""
+        await _async_flush_track(hass, entry)
+
+    entry.async_on_unload(
+        async_track_time_interval(
+            hass, async_flush_track, timedelta(seconds=TRACK_FLUSH_INTERVAL)
+        )
+    )
+
     # Register services if not already done
     await _async_register_services(hass)
+    await _async_get_overrides(hass)
+
+    # Apply cache tuning to the shared resolver
+    config = {**entry.data, **entry.options}
+    _async_get_resolver(hass).configure_cache(
+        config.get(CONF_CACHE_CELL_SIZE, DEFAULT_CACHE_CELL_SIZE),
+        int(config.get(CONF_CACHE_SIZE, DEFAULT_CACHE_SIZE)),
+    )
 
     # Set up entity listeners after HA is fully started
     async def async_startup(event: Event) -> None:
@@ -77,23 +227,204 @@ async def async_setup_entry(hass: HomeAssistant, entry: ConfigEntry) -> bool:
     # Listen for options updates
     entry.async_on_unload(entry.add_update_listener(_async_update_listener))
 
+    await hass.config_entries.async_forward_entry_setups(entry, PLATFORMS)
+
     return True
 
 
 async def async_unload_entry(hass: HomeAssistant, entry: ConfigEntry) -> bool:
     """Unload Arvee config entry."""
+    if not await hass.config_entries.async_unload_platforms(entry, PLATFORMS):
+        return False
+
     data = hass.data[DOMAIN].pop(entry.entry_id, {})
     
+    # Stop following a fleet's trackers
+    if fleet := data.get("fleet"):
+        await fleet.async_stop()
+
     # Unsubscribe from state changes
     if unsub := data.get("unsub"):
         unsub()
 
+    # Stop reading the GPS stream
+    if stream := data.get("stream"):
+        stream.async_stop()
+
+    # Drop any deferred location write
+    if flush := data.get("location_flush"):
+        flush()
+
+    # Drop any deferred metrics signal
+    if signal := data.get("metrics_signal"):
+        signal()
+
+    # Stop the initial reconcile if it's still running
+    if (task := data.get("initial_update")) and not task.done():
+        task.cancel()
+
+    # Drop any queued location update
+    if scheduler := data.get("scheduler"):
+        await scheduler.async_shutdown()
+
+    # Write out the last fix now rather than waiting for the delayed save
+    if data.get("store_dirty"):
+        await data["store"].async_save(_async_stored_fix(data))
+
+    # Write out the trip log along with it
+    if data.get("track"):
+        await _async_flush_track(hass, entry, data)
+
+    return True
+
+
+async def _async_setup_fleet_entry(hass: HomeAssistant, entry: ConfigEntry) -> bool:
+    """Set up an entry that follows the timezones of many trackers."""
+    config = {**entry.data, **entry.options}
+    resolver = _async_get_resolver(hass)
+    fleet = FleetTracker(hass, resolver, config[CONF_FLEET_TRACKERS])
+    hass.data[DOMAIN][entry.entry_id] = {
+        "config": entry.data,
+        "fleet": fleet,
+        "metrics": fleet.metrics,
+    }
+
+    await _async_register_services(hass)
+
+    @callback
+    def async_start(event: Event | None = None) -> None:
+        """Load the timezone data and start following the trackers."""
+        resolver.async_start_warmup()
+        # A vehicle entry's grid resolution takes precedence
+        if not any(
+            other.data.get(CONF_MODE) != MODE_FLEET
+            for other in hass.config_entries.async_entries(DOMAIN)
+        ):
+            resolver.async_start_grid(DEFAULT_GRID_RESOLUTION)
+        fleet.async_start()
+
+    if hass.is_running:
+        async_start()
+    else:
+        hass.bus.async_listen_once(EVENT_HOMEASSISTANT_STARTED, async_start)
+
+    entry.async_on_unload(entry.add_update_listener(_async_update_listener))
+
+    await hass.config_entries.async_forward_entry_setups(entry, PLATFORMS)
+
     return True
 
 
+async def async_remove_entry(hass: HomeAssistant, entry: ConfigEntry) -> None:
+    """Remove the stored fix and trip log of a deleted entry."""
+    await _async_get_store(hass, entry).async_remove()
+    await hass.async_add_executor_job(_remove_file, _track_path(hass, entry))
+
+
 async def _async_update_listener(hass: HomeAssistant, entry: ConfigEntry) -> None:
     """Handle options update."""
-    await hass.config_entries.async_reload(entry.entry_id)
+    if (data := hass.data[DOMAIN].get(entry.entry_id)) is None:
+        return
+    if data.get("fleet") is not None:
+        # Trackers come and go with their sensors, which takes a reload
+        await hass.config_entries.async_reload(entry.entry_id)
+        return
+    _async_apply_options(hass, entry)
+
+
+@callback
+def _async_apply_options(hass: HomeAssistant, entry: ConfigEntry) -> None:
+    """Apply changed options to a running entry in place.
+
+    Nothing is looked up or written unless the GPS sources changed and
+    the position they give differs from the last accepted one.
+    """
+    config = {**entry.data, **entry.options}
+    data = hass.data[DOMAIN][entry.entry_id]
+    resolver = _async_get_resolver(hass)
+    resolver.configure_cache(
+        config.get(CONF_CACHE_CELL_SIZE, DEFAULT_CACHE_CELL_SIZE),
+        int(config.get(CONF_CACHE_SIZE, DEFAULT_CACHE_SIZE)),
+    )
+
+    if (gate := data.get("gate")) is None:
+        return  # Listeners aren't set up yet and will read the new options
+
+    # Location write options are read on each write
+    gate.base_threshold = config.get(CONF_UPDATE_THRESHOLD, DEFAULT_UPDATE_THRESHOLD)
+    resolver.async_start_grid(
+        config.get(CONF_GRID_RESOLUTION, DEFAULT_GRID_RESOLUTION)
+    )
+
+    if _source_options(config) == data["source_options"]:
+        return
+    selector = FixSelector.from_config(hass, config)
+    selector.refresh(hass.loop.time())
+    data["selector"] = selector
+    data["source_options"] = _source_options(config)
+    _async_track_sources(hass, entry)
+
+    if (fix := selector.current()) is not None and (
+        fix.latitude,
+        fix.longitude,
+    ) != (data["last_lat"], data["last_lon"]):
+        data["scheduler"].async_schedule()
+
+
+def _source_options(config: dict[str, Any]) -> dict[str, Any]:
+    """Return the options that decide where fixes come from.
+
+    Options left unset take the defaults the options form fills in, so
+    submitting the form unchanged doesn't look like a new source.
+    """
+    defaults = {
+        CONF_SOURCES: [],
+        CONF_SOURCE_MAX_AGE: DEFAULT_SOURCE_MAX_AGE,
+        CONF_SMOOTHING: DEFAULT_SMOOTHING,
+        CONF_STREAM: "",
+    }
+    return {key: config.get(key, defaults.get(key)) for key in SOURCE_OPTIONS}
+
+
+@callback
+def _async_get_resolver(hass: HomeAssistant) -> TimezoneResolver:
+    """Return the shared timezone resolver, creating it if needed."""
+    if (resolver := hass.data.get(DATA_RESOLVER)) is None:
+        resolver = hass.data[DATA_RESOLVER] = TimezoneResolver(hass)
+    return resolver
+
+
+async def _async_get_overrides(hass: HomeAssistant) -> OverrideIndex:
+    """Return the saved timezone overrides, loading them on first use."""
+    if (overrides := hass.data.get(DATA_OVERRIDES)) is not None:
+        return overrides
+    stored = await _async_get_overrides_store(hass).async_load() or {}
+    overrides = OverrideIndex()
+    for item in stored.get("overrides", []):
+        try:
+            overrides.set(RegionOverride.from_dict(item))
+        except (KeyError, TypeError, ValueError) as err:
+            _LOGGER.warning("Skipping a saved override that could not be read: %s", err)
+    # Another caller may have finished loading first
+    return hass.data.setdefault(DATA_OVERRIDES, overrides)
+
+
+@callback
+def _async_get_overrides_store(hass: HomeAssistant) -> Store:
+    """Return the store holding the timezone overrides."""
+    return Store(hass, STORAGE_VERSION, OVERRIDES_STORAGE_KEY)
+
+
+async def _async_save_overrides(hass: HomeAssistant, overrides: OverrideIndex) -> None:
+    """Save the overrides and recheck every vehicle's position against them."""
+    await _async_get_overrides_store(hass).async_save({
+        "overrides": [
+            override.as_dict() for override in overrides.overrides.values()
+        ]
+    })
+    for data in hass.data.get(DOMAIN, {}).values():
+        if (scheduler := data.get("scheduler")) is not None:
+            scheduler.async_schedule()
 
 
 async def _async_register_services(hass: HomeAssistant) -> None:
@@ -112,11 +443,12 @@ async def _async_register_services(hass: HomeAssistant) -> None:
         latitude = call.data[ATTR_LATITUDE]
         longitude = call.data[ATTR_LONGITUDE]
 
-        if not TZFPY_AVAILABLE:
+        resolver = _async_get_resolver(hass)
+        if not await resolver.async_ready():
             _LOGGER.error("tzfpy not available, cannot look up timezone")
             return
 
-        timezone = await hass.async_add_executor_job(get_tz, longitude, latitude)
+        timezone = await resolver.async_get_timezone(latitude, longitude)
 
         if timezone is None:
             _LOGGER.error(
@@ -126,11 +458,10 @@ async def _async_register_services(hass: HomeAssistant) -> None:
             )
             return
 
-        await hass.config.async_update(
-            latitude=latitude,
-            longitude=longitude,
-            time_zone=timezone,
-        )
+        update: dict[str, Any] = {"latitude": latitude, "longitude": longitude}
+        if timezone != hass.config.time_zone:
+            update["time_zone"] = timezone
+        await hass.config.async_update(**update)
         _LOGGER.info(
             "Location updated to: %s, %s (timezone: %s)",
             latitude,
@@ -138,6 +469,275 @@ async def _async_register_services(hass: HomeAssistant) -> None:
             timezone,
         )
 
+    async def async_lookup_timezones(call: ServiceCall) -> ServiceResponse:
+        """Service to look up the timezones along a list of coordinates."""
+        coordinates = [
+            (point[ATTR_LATITUDE], point[ATTR_LONGITUDE])
+            for point in call.data[ATTR_COORDINATES]
+        ]
+
+        resolver = _async_get_resolver(hass)
+        if not await resolver.async_ready():
+            raise HomeAssistantError("tzfpy not available, cannot look up timezones")
+
+        timezones = await resolver.async_get_timezones(coordinates)
+        distances = consecutive_miles(
+            [lat for lat, _ in coordinates], [lon for _, lon in coordinates]
+        )
+
+        points = []
+        transitions = []
+        total = 0.0
+        current = None
+        for index, ((lat, lon), timezone, distance) in enumerate(
+            zip(coordinates, timezones, distances)
+        ):
+            total += distance
+            points.append({
+                ATTR_LATITUDE: lat,
+                ATTR_LONGITUDE: lon,
+                ATTR_TIMEZONE: timezone,
+                "distance": round(distance, 3),
+            })
+            if timezone is None or timezone == current:
+                continue
+            if current is not None:
+                transitions.append({
+                    "index": index,
+                    "from": current,
+                    "to": timezone,
+                    ATTR_LATITUDE: lat,
+                    ATTR_LONGITUDE: lon,
+                    "distance": round(total, 3),
+                })
+            current = timezone
+
+        return {
+            "points": points,
+            "transitions": transitions,
+            "total_distance": round(total, 3),
+        }
+
+    async def async_load_route(call: ServiceCall) -> ServiceResponse:
+        """Service to load a planned route and find its timezone transitions."""
+        try:
+            if ATTR_GPX in call.data:
+                points = parse_gpx(call.data[ATTR_GPX])
+            elif ATTR_POLYLINE in call.data:
+                points = decode_polyline(call.data[ATTR_POLYLINE])
+            else:
+                points = [
+                    (point[ATTR_LATITUDE], point[ATTR_LONGITUDE])
+                    for point in call.data[ATTR_COORDINATES]
+                ]
+        except ValueError as err:
+            raise HomeAssistantError(f"Could not read the route: {err}") from err
+        if not 2 <= len(points) <= MAX_ROUTE_POINTS:
+            raise HomeAssistantError(
+                f"A route needs between 2 and {MAX_ROUTE_POINTS} points, got {len(points)}"
+            )
+
+        resolver = _async_get_resolver(hass)
+        if not await resolver.async_ready():
+            raise HomeAssistantError("tzfpy not available, cannot load a route")
+
+        route = await resolver.async_build_route(points)
+        hass.data[DATA_ROUTE] = route
+        for data in hass.data.get(DOMAIN, {}).values():
+            data["route_distance"] = None
+        _LOGGER.info(
+            "Loaded a %.0f mile route with %d timezone transitions",
+            route.total_distance,
+            len(route.transitions),
+        )
+
+        return {
+            "transitions": [
+                {
+                    "from": transition.previous,
+                    "to": transition.timezone,
+                    ATTR_LATITUDE: round(transition.latitude, 6),
+                    ATTR_LONGITUDE: round(transition.longitude, 6),
+                    "distance": round(transition.distance, 3),
+                }
+                for transition in route.transitions
+            ],
+            "total_distance": round(route.total_distance, 3),
+        }
+
+    async def async_get_track(call: ServiceCall) -> ServiceResponse:
+        """Service to return the trip history between two times."""
+        track: TripLog | None = next(
+            (
+                data["track"]
+                for data in hass.data.get(DOMAIN, {}).values()
+                if data.get("track") is not None
+            ),
+            None,
+        )
+        if track is None:
+            raise HomeAssistantError("No vehicle is set up to keep a trip history")
+
+        start = call.data.get(ATTR_START)
+        end = call.data.get(ATTR_END)
+        points = track.points(
+            dt_util.as_timestamp(start) if start else None,
+            dt_util.as_timestamp(end) if end else None,
+        )
+        distances = consecutive_miles(
+            [point.latitude for point in points], [point.longitude for point in points]
+        )
+        return {
+            "points": [
+                {
+                    "time": dt_util.utc_from_timestamp(point.time).isoformat(),
+                    ATTR_LATITUDE: round(point.latitude, 6),
+                    ATTR_LONGITUDE: round(point.longitude, 6),
+                    ATTR_TIMEZONE: point.timezone,
+                }
+                for point in points
+            ],
+            "total_distance": round(sum(distances), 3),
+        }
+
+    async def async_clear_route(call: ServiceCall) -> None:
+        """Service to forget the loaded route."""
+        hass.data.pop(DATA_ROUTE, None)
+        for data in hass.data.get(DOMAIN, {}).values():
+            data["route_distance"] = None
+
+    async def async_simulate(call: ServiceCall) -> ServiceResponse:
+        """Service to replay fixes through the update pipeline without applying them."""
+        try:
+            if ATTR_GPX in call.data:
+                points = [
+                    (lat, lon, None, None) for lat, lon in parse_gpx(call.data[ATTR_GPX])
+                ]
+            elif ATTR_POLYLINE in call.data:
+                points = [
+                    (lat, lon, None, None)
+                    for lat, lon in decode_polyline(call.data[ATTR_POLYLINE])
+                ]
+            else:
+                points = [
+                    (
+                        point[ATTR_LATITUDE],
+                        point[ATTR_LONGITUDE],
+                        point.get(ATTR_TIME),
+                        point.get(ATTR_ACCURACY),
+                    )
+                    for point in call.data[ATTR_COORDINATES]
+                ]
+        except ValueError as err:
+            raise HomeAssistantError(f"Could not read the fixes: {err}") from err
+        if not 1 <= len(points) <= MAX_SIMULATION_FIXES:
+            raise HomeAssistantError(
+                f"A simulation needs between 1 and {MAX_SIMULATION_FIXES} fixes, got {len(points)}"
+            )
+
+        # Fixes without a time follow the one before at the given interval
+        interval = call.data[ATTR_INTERVAL]
+        fix_time = dt_util.utcnow().timestamp() - interval
+        fixes = []
+        for lat, lon, when, accuracy in points:
+            fix_time = dt_util.as_timestamp(when) if when else fix_time + interval
+            fixes.append(SimulatedFix(fix_time, lat, lon, accuracy))
+
+        path = None
+        if output := call.data.get(ATTR_OUTPUT):
+            path = hass.config.path(output)
+            if not hass.config.is_allowed_path(path):
+                raise HomeAssistantError(f"Writing to {output} is not allowed")
+
+        resolver = _async_get_resolver(hass)
+        if not await resolver.async_ready():
+            raise HomeAssistantError("tzfpy not available, cannot run a simulation")
+
+        # The vehicle's options, unless the call tries others
+        config = next(
+            (
+                {**entry.data, **entry.options}
+                for entry in hass.config_entries.async_entries(DOMAIN)
+                if entry.data.get(CONF_MODE) != MODE_FLEET
+            ),
+            {},
+        )
+        config.update(call.data)
+        overrides = hass.data.get(DATA_OVERRIDES)
+        # Lookups go to the worker like live ones, without a key, so the
+        # vehicle's own lookups never supersede them
+        simulation = Simulation(
+            resolver.async_get_timezone,
+            resolver.async_get_safe_zone,
+            config.get(CONF_UPDATE_THRESHOLD, DEFAULT_UPDATE_THRESHOLD),
+            config.get(CONF_LOCATION_THRESHOLD, DEFAULT_LOCATION_THRESHOLD),
+            config.get(CONF_LOCATION_INTERVAL, DEFAULT_LOCATION_INTERVAL) * 60,
+            config.get(CONF_SMOOTHING, DEFAULT_SMOOTHING),
+            hass.data.get(DATA_ROUTE),
+            # A copy, as overrides may be edited while the replay runs
+            OverrideIndex(overrides.overrides.values()) if overrides else None,
+            (hass.config.latitude, hass.config.longitude),
+            hass.config.time_zone,
+        )
+
+        if path is None:
+            return await simulation.async_run(fixes)
+
+        try:
+            output = await hass.async_add_executor_job(
+                partial(open, path, "w", encoding="utf-8")
+            )
+            try:
+                return await simulation.async_run(
+                    fixes, partial(hass.async_add_executor_job, output.writelines)
+                )
+            finally:
+                await hass.async_add_executor_job(output.close)
+        except OSError as err:
+            raise HomeAssistantError(f"Could not write the results: {err}") from err
+
+    async def async_set_override(call: ServiceCall) -> None:
+        """Service to add or replace a timezone override."""
+        name = call.data[ATTR_NAME]
+        try:
+            if ATTR_COORDINATES in call.data:
+                override = RegionOverride.from_polygon(
+                    name,
+                    call.data[ATTR_TIMEZONE],
+                    [
+                        (point[ATTR_LATITUDE], point[ATTR_LONGITUDE])
+                        for point in call.data[ATTR_COORDINATES]
+                    ],
+                    call.data[ATTR_LOCATION],
+                )
+            elif ATTR_LATITUDE in call.data and ATTR_LONGITUDE in call.data:
+                override = RegionOverride.circle(
+                    name,
+                    call.data[ATTR_TIMEZONE],
+                    call.data[ATTR_LATITUDE],
+                    call.data[ATTR_LONGITUDE],
+                    call.data[ATTR_RADIUS],
+                    call.data[ATTR_LOCATION],
+                )
+            else:
+                raise ValueError("A circle needs a latitude and longitude")
+        except ValueError as err:
+            raise HomeAssistantError(f"Could not read the override: {err}") from err
+
+        overrides = await _async_get_overrides(hass)
+        overrides.set(override)
+        await _async_save_overrides(hass, overrides)
+        _LOGGER.info("Saved timezone override %s (%s)", name, override.timezone)
+
+    async def async_remove_override(call: ServiceCall) -> None:
+        """Service to remove a timezone override."""
+        name = call.data[ATTR_NAME]
+        overrides = await _async_get_overrides(hass)
+        if not overrides.remove(name):
+            raise HomeAssistantError(f"There is no override named {name}")
+        await _async_save_overrides(hass, overrides)
+        _LOGGER.info("Removed timezone override %s", name)
+
     hass.services.async_register(
         DOMAIN,
         SERVICE_SET_TIMEZONE,
@@ -155,131 +755,532 @@ async def _async_register_services(hass: HomeAssistant) -> None:
         }),
     )
 
+    hass.services.async_register(
+        DOMAIN,
+        SERVICE_LOOKUP_TIMEZONES,
+        async_lookup_timezones,
+        schema=vol.Schema({
+            vol.Required(ATTR_COORDINATES): vol.All(
+                cv.ensure_list,
+                vol.Length(min=1, max=MAX_LOOKUP_COORDINATES),
+                [vol.Schema({
+                    vol.Required(ATTR_LATITUDE): cv.latitude,
+                    vol.Required(ATTR_LONGITUDE): cv.longitude,
+                })],
+            ),
+        }),
+        supports_response=SupportsResponse.ONLY,
+    )
+
+    hass.services.async_register(
+        DOMAIN,
+        SERVICE_LOAD_ROUTE,
+        async_load_route,
+        schema=vol.All(
+            vol.Schema({
+                vol.Exclusive(ATTR_GPX, "route"): cv.string,
+                vol.Exclusive(ATTR_POLYLINE, "route"): cv.string,
+                vol.Exclusive(ATTR_COORDINATES, "route"): vol.All(
+                    cv.ensure_list,
+                    [vol.Schema({
+                        vol.Required(ATTR_LATITUDE): cv.latitude,
+                        vol.Required(ATTR_LONGITUDE): cv.longitude,
+                    })],
+                ),
+            }),
+            cv.has_at_least_one_key(ATTR_GPX, ATTR_POLYLINE, ATTR_COORDINATES),
+        ),
+        supports_response=SupportsResponse.OPTIONAL,
+    )
+
+    hass.services.async_register(DOMAIN, SERVICE_CLEAR_ROUTE, async_clear_route)
+
+    hass.services.async_register(
+        DOMAIN,
+        SERVICE_GET_TRACK,
+        async_get_track,
+        schema=vol.Schema({
+            vol.Optional(ATTR_START): cv.datetime,
+            vol.Optional(ATTR_END): cv.datetime,
+        }),
+        supports_response=SupportsResponse.ONLY,
+    )
+
+    hass.services.async_register(
+        DOMAIN,
+        SERVICE_SIMULATE,
+        async_simulate,
+        schema=vol.All(
+            vol.Schema({
+                vol.Exclusive(ATTR_GPX, "fixes"): cv.string,
+                vol.Exclusive(ATTR_POLYLINE, "fixes"): cv.string,
+                # Points returned by get_track can be passed back as they are
+                vol.Exclusive(ATTR_COORDINATES, "fixes"): vol.All(
+                    cv.ensure_list,
+                    [vol.Schema(
+                        {
+                            vol.Required(ATTR_LATITUDE): cv.latitude,
+                            vol.Required(ATTR_LONGITUDE): cv.longitude,
+                            vol.Optional(ATTR_TIME): cv.datetime,
+                            vol.Optional(ATTR_ACCURACY): vol.All(
+                                vol.Coerce(float), vol.Range(min=0)
+                            ),
+                        },
+                        extra=vol.ALLOW_EXTRA,
+                    )],
+                ),
+                vol.Optional(
+                    ATTR_INTERVAL, default=DEFAULT_SIMULATION_INTERVAL
+                ): vol.All(vol.Coerce(float), vol.Range(min=0.1, max=86400)),
+                vol.Optional(CONF_UPDATE_THRESHOLD): vol.All(
+                    vol.Coerce(float), vol.Range(min=0.1, max=100)
+                ),
+                vol.Optional(CONF_LOCATION_THRESHOLD): vol.All(
+                    vol.Coerce(float), vol.Range(min=0.1, max=100)
+                ),
+                vol.Optional(CONF_LOCATION_INTERVAL): vol.All(
+                    vol.Coerce(float), vol.Range(min=0, max=1440)
+                ),
+                vol.Optional(CONF_SMOOTHING): cv.boolean,
+                vol.Optional(ATTR_OUTPUT): cv.string,
+            }),
+            cv.has_at_least_one_key(ATTR_GPX, ATTR_POLYLINE, ATTR_COORDINATES),
+        ),
+        supports_response=SupportsResponse.ONLY,
+    )
+
+    hass.services.async_register(
+        DOMAIN,
+        SERVICE_SET_OVERRIDE,
+        async_set_override,
+        schema=vol.All(
+            vol.Schema({
+                vol.Required(ATTR_NAME): cv.string,
+                vol.Required(ATTR_TIMEZONE): cv.time_zone,
+                vol.Optional(ATTR_LOCATION, default=LOCATION_FOLLOW): vol.In(
+                    LOCATION_BEHAVIOURS
+                ),
+                vol.Optional(ATTR_LATITUDE): cv.latitude,
+                vol.Optional(ATTR_LONGITUDE): cv.longitude,
+                vol.Exclusive(ATTR_RADIUS, "shape"): vol.All(
+                    vol.Coerce(float), vol.Range(min=0.01, max=MAX_OVERRIDE_RADIUS)
+                ),
+                vol.Exclusive(ATTR_COORDINATES, "shape"): vol.All(
+                    cv.ensure_list,
+                    vol.Length(min=3, max=MAX_OVERRIDE_POINTS),
+                    [vol.Schema({
+                        vol.Required(ATTR_LATITUDE): cv.latitude,
+                        vol.Required(ATTR_LONGITUDE): cv.longitude,
+                    })],
+                ),
+            }),
+            cv.has_at_least_one_key(ATTR_RADIUS, ATTR_COORDINATES),
+        ),
+    )
+
+    hass.services.async_register(
+        DOMAIN,
+        SERVICE_REMOVE_OVERRIDE,
+        async_remove_override,
+        schema=vol.Schema({vol.Required(ATTR_NAME): cv.string}),
+    )
+
 
 async def _async_setup_listeners(hass: HomeAssistant, entry: ConfigEntry) -> None:
     """Set up state change listeners for GPS entities."""
     config = {**entry.data, **entry.options}
-    lat_entity = config[CONF_LATITUDE_ENTITY]
-    lon_entity = config[CONF_LONGITUDE_ENTITY]
     threshold = config.get(CONF_UPDATE_THRESHOLD, DEFAULT_UPDATE_THRESHOLD)
 
     data = hass.data[DOMAIN][entry.entry_id]
 
-    # Initialize with current HA config
-    data["last_lat"] = hass.config.latitude
-    data["last_lon"] = hass.config.longitude
+    # Load tzfpy and the timezone grid in the background now that we need them
+    resolver = _async_get_resolver(hass)
+    if data_file := config.get(CONF_DATA_FILE):
+        # Only read by the warm-up, so a change takes a restart
+        resolver.data_file = hass.config.path(data_file)
+    if region_file := config.get(CONF_REGION_FILE):
+        resolver.region_file = hass.config.path(region_file)
+    resolver.async_start_warmup()
+    resolver.async_start_grid(
+        config.get(CONF_GRID_RESOLUTION, DEFAULT_GRID_RESOLUTION)
+    )
+
+    # Initialize with current HA config unless a stored fix was restored
+    if data["last_lat"] is None or data["last_lon"] is None:
+        data["last_lat"] = hass.config.latitude
+        data["last_lon"] = hass.config.longitude
+
+    gate = MovementGate(threshold)
+    gate.set_anchor(data["last_lat"], data["last_lon"])
+    gate.set_safe_zone(data["safe_zone"])
+    data["gate"] = gate
+
+    selector = FixSelector.from_config(hass, config)
+    selector.refresh(hass.loop.time())
+    data["selector"] = selector
+    data["source_options"] = _source_options(config)
+
+    async def async_update() -> None:
+        """Process the latest GPS fix."""
+        await _async_process_location_update(hass, entry)
+        await _async_update_region(hass, entry)
+        if (fix := data["selector"].current()) is not None:
+            # Logged at the time the source reported it, not when it arrived
+            data["track"].add(
+                fix.updated or dt_util.utcnow().timestamp(),
+                fix.latitude,
+                fix.longitude,
+                data["timezone"],
+            )
+        _async_signal_metrics(hass, entry, data)
+
+    scheduler = LocationUpdateScheduler(hass, async_update, UPDATE_SETTLE_TIME)
+    data["scheduler"] = scheduler
+
+    # Track the source entities
+    _async_track_sources(hass, entry)
+
+    # Reconcile with the current fix without holding up entry setup
+    async def async_initial_update() -> None:
+        """Run the initial update and record how long it took."""
+        start = hass.loop.time()
+        await scheduler.async_refresh()
+        # Write a location that was still pending before a restart
+        await _async_flush_location(hass, entry)
+        data["initial_update_time"] = hass.loop.time() - start
+        _LOGGER.debug(
+            "Initial location update finished in %.3fs", data["initial_update_time"]
+        )
+
+    data["initial_update"] = entry.async_create_task(
+        hass, async_initial_update(), "arvee initial location update"
+    )
+
+
+@callback
+def _async_track_sources(hass: HomeAssistant, entry: ConfigEntry) -> None:
+    """Follow the current selector's entities and GPS stream."""
+    data = hass.data[DOMAIN][entry.entry_id]
+    if unsub := data.get("unsub"):
+        unsub()
+    if stream := data.get("stream"):
+        stream.async_stop()
+        data["stream"] = None
+
+    selector: FixSelector = data["selector"]
+    scheduler: LocationUpdateScheduler = data["scheduler"]
+    metrics: ArveeMetrics = data["metrics"]
 
     @callback
     def async_handle_state_change(event: Event) -> None:
         """Handle state changes of GPS entities."""
-        hass.async_create_task(_async_process_location_update(hass, entry, threshold))
+        metrics.events_received += 1
 
-    # Track both entities
-    unsub = async_track_state_change_event(
+        # Only a change of the selected fix moves us. Attribute-only
+        # changes, unusable states and other sources changing don't.
+        if not selector.update(event.data["entity_id"], hass.loop.time()):
+            metrics.events_dropped += 1
+            return
+
+        if data["fix_received"] is None:
+            data["fix_received"] = hass.loop.time()
+        scheduler.async_schedule()
+
+    data["unsub"] = async_track_state_change_event(
         hass,
-        [lat_entity, lon_entity],
+        selector.entities,
         async_handle_state_change,
     )
-    data["unsub"] = unsub
 
-    # Do an initial update
-    await _async_process_location_update(hass, entry, threshold)
+    if not (url := {**entry.data, **entry.options}.get(CONF_STREAM)):
+        return
+
+    @callback
+    def async_handle_stream_fix(fix: GpsFix) -> None:
+        """Handle a fix read from the GPS stream."""
+        metrics.events_received += 1
+        if not selector.push(url, fix, hass.loop.time()):
+            metrics.events_dropped += 1
+            return
+
+        if data["fix_received"] is None:
+            data["fix_received"] = hass.loop.time()
+        scheduler.async_schedule()
+
+    try:
+        stream = GpsStream(hass, url, async_handle_stream_fix)
+    except ValueError as err:
+        _LOGGER.error("Not reading GPS stream: %s", err)
+        return
+    stream.async_start()
+    data["stream"] = stream
 
 
 async def _async_process_location_update(
+    hass: HomeAssistant, entry: ConfigEntry
+) -> None:
+    """Process a location update from GPS entities."""
+    data = hass.data[DOMAIN][entry.entry_id]
+
+    # When the fix that triggered this update arrived
+    received = data["fix_received"] or hass.loop.time()
+    data["fix_received"] = None
+
+    resolver = _async_get_resolver(hass)
+
+    async def async_lookup(lat: float, lon: float) -> str | None:
+        """Look up a timezone once the timezone data has loaded."""
+        if not await resolver.async_ready():
+            _LOGGER.error("tzfpy not available, cannot look up timezone")
+            return None
+        return await resolver.async_get_timezone(lat, lon, key=entry.entry_id)
+
+    async def async_safe_zone(lat: float, lon: float, timezone: str) -> SafeZone | None:
+        """Find the safe zone around a fix."""
+        return await resolver.async_get_safe_zone(lat, lon, timezone, key=entry.entry_id)
+
+    result = await async_process_fix(
+        data,
+        received,
+        hass.config.time_zone,
+        async_lookup,
+        async_safe_zone,
+        partial(_async_write_config, hass, entry),
+        hass.data.get(DATA_ROUTE),
+        hass.data.get(DATA_OVERRIDES),
+    )
+    if result in ACCEPTED_RESULTS:
+        data["fix_time"] = dt_util.utcnow().isoformat()
+        _async_schedule_save(data)
+
+
+async def _async_write_config(
     hass: HomeAssistant,
     entry: ConfigEntry,
-    threshold: float,
+    received: float,
+    location: tuple[float, float] | None,
+    timezone: str | None,
 ) -> None:
-    """Process a location update from GPS entities."""
-    config = {**entry.data, **entry.options}
-    lat_entity = config[CONF_LATITUDE_ENTITY]
-    lon_entity = config[CONF_LONGITUDE_ENTITY]
+    """Write a timezone change now, or a location under its write policy."""
+    data = hass.data[DOMAIN][entry.entry_id]
+    if timezone is None:
+        data["pending_location"] = location
+        if location is None:
+            return
+        data["pending_received"] = received
+        await _async_flush_location(hass, entry)
+        return
+
+    data["pending_location"] = None
+    if location is None:
+        await hass.config.async_update(time_zone=timezone)
+        _LOGGER.info("Arvee updated timezone to: %s", timezone)
+    else:
+        data["location_updated"] = hass.loop.time()
+        await hass.config.async_update(
+            latitude=location[0],
+            longitude=location[1],
+            time_zone=timezone,
+        )
+        _LOGGER.info(
+            "Arvee updated location to: %s, %s (timezone: %s)",
+            *location,
+            timezone,
+        )
+    metrics: ArveeMetrics = data["metrics"]
+    metrics.config_updates += 1
+    metrics.fix_to_config.add(hass.loop.time() - received)
+
 
+async def _async_update_region(hass: HomeAssistant, entry: ConfigEntry) -> None:
+    """Follow the country and region of the last accepted position.
+
+    The country comes with the timezone. The region is looked up only
+    when the accepted position moved, and the sensors are only told when
+    either one changed.
+    """
     data = hass.data[DOMAIN][entry.entry_id]
+    resolver = _async_get_resolver(hass)
+    if data["last_lat"] is None or not await resolver.async_ready():
+        return
 
-    # Get current values
-    lat_state = hass.states.get(lat_entity)
-    lon_state = hass.states.get(lon_entity)
+    country = data["country"]
+    if (timezone := data["timezone"]) is not None:
+        country = resolver.country(timezone)
 
-    if lat_state is None or lon_state is None:
-        _LOGGER.debug("GPS entities not available yet")
+    region = data["region"]
+    position = (data["last_lat"], data["last_lon"])
+    if resolver.regions is not None and position != data["region_position"]:
+        try:
+            region = await resolver.async_get_region(
+                *position, key=(entry.entry_id, "region")
+            )
+        except LookupSuperseded:
+            return
+        data["region_position"] = position
+
+    if (country, region) == (data["country"], data["region"]):
         return
+    data["country"] = country
+    data["region"] = region
+    _async_schedule_save(data)
+    async_dispatcher_send(hass, SIGNAL_REGION_UPDATED.format(entry.entry_id))
 
-    try:
-        new_lat = float(lat_state.state)
-        new_lon = float(lon_state.state)
-    except (ValueError, TypeError):
+
+async def _async_flush_location(
+    hass: HomeAssistant, entry: ConfigEntry, interval_elapsed: bool = False
+) -> None:
+    """Write the pending location if the location write policy allows it."""
+    config = {**entry.data, **entry.options}
+    min_distance = config.get(CONF_LOCATION_THRESHOLD, DEFAULT_LOCATION_THRESHOLD)
+    min_interval = config.get(CONF_LOCATION_INTERVAL, DEFAULT_LOCATION_INTERVAL) * 60
+
+    data = hass.data[DOMAIN][entry.entry_id]
+    if (pending := data.get("pending_location")) is None:
+        return
+    new_lat, new_lon = pending
+
+    distance = _haversine_miles(
+        hass.config.latitude, hass.config.longitude, new_lat, new_lon
+    )
+    if distance < min_distance:
         _LOGGER.debug(
-            "Invalid GPS values: lat=%s, lon=%s",
-            lat_state.state,
-            lon_state.state,
+            "Location is %.2f miles from the configured home, below %.2f miles",
+            distance,
+            min_distance,
         )
+        data["pending_location"] = None
         return
 
-    # Check if we've moved enough
-    last_lat = data.get("last_lat")
-    last_lon = data.get("last_lon")
-
-    if last_lat is not None and last_lon is not None:
-        distance = _haversine_miles(last_lat, last_lon, new_lat, new_lon)
-        if distance < threshold:
-            _LOGGER.debug(
-                "Movement of %.2f miles is below threshold of %.2f miles",
-                distance,
-                threshold,
-            )
-            return
-        _LOGGER.debug("Movement of %.2f miles exceeds threshold", distance)
+    now = hass.loop.time()
+    last_update = data.get("location_updated")
+    if (
+        not interval_elapsed
+        and last_update is not None
+        and now - last_update < min_interval
+    ):
+        # Too soon, write the latest location once the interval has passed
+        if data.get("location_flush") is None:
 
-    # Update stored position
-    data["last_lat"] = new_lat
-    data["last_lon"] = new_lon
+            async def async_flush(_now: datetime) -> None:
+                """Write the deferred location."""
+                data["location_flush"] = None
+                await _async_flush_location(hass, entry, interval_elapsed=True)
 
-    # Look up timezone
-    if not TZFPY_AVAILABLE:
-        _LOGGER.error("tzfpy not available, cannot look up timezone")
+            data["location_flush"] = async_call_later(
+                hass, min_interval - (now - last_update), async_flush
+            )
         return
 
-    timezone = await hass.async_add_executor_job(get_tz, new_lon, new_lat)
+    data["pending_location"] = None
+    data["location_updated"] = now
+    _async_schedule_save(data)
+    await hass.config.async_update(latitude=new_lat, longitude=new_lon)
 
-    if timezone is None:
-        _LOGGER.warning(
-            "Could not determine timezone for coordinates: %s, %s",
-            new_lat,
-            new_lon,
-        )
-        # Still update location even if timezone lookup fails
-        await hass.config.async_update(latitude=new_lat, longitude=new_lon)
+    metrics: ArveeMetrics = data["metrics"]
+    metrics.config_updates += 1
+    metrics.fix_to_config.add(hass.loop.time() - (data["pending_received"] or now))
+    _async_signal_metrics(hass, entry, data)
+    _LOGGER.info("Arvee updated location to: %s, %s", new_lat, new_lon)
+
+
+async def _async_flush_track(
+    hass: HomeAssistant, entry: ConfigEntry, data: dict[str, Any] | None = None
+) -> None:
+    """Write an entry's trip log if it changed since the last write."""
+    if data is None:
+        data = hass.data[DOMAIN][entry.entry_id]
+    track: TripLog = data["track"]
+    if not track.dirty:
         return
+    track.dirty = False
+    try:
+        await hass.async_add_executor_job(
+            save_trip_log, _track_path(hass, entry), track.to_bytes()
+        )
+    except OSError as err:
+        track.dirty = True
+        _LOGGER.warning("Could not write the trip log: %s", err)
 
-    # Update Home Assistant config
-    await hass.config.async_update(
-        latitude=new_lat,
-        longitude=new_lon,
-        time_zone=timezone,
-    )
-    _LOGGER.info(
-        "Arvee updated location to: %s, %s (timezone: %s)",
-        new_lat,
-        new_lon,
-        timezone,
-    )
 
+@callback
+def _track_path(hass: HomeAssistant, entry: ConfigEntry) -> str:
+    """Return the path of an entry's trip log."""
+    return hass.config.path(".storage", f"{TRACK_STORAGE_KEY}.{entry.entry_id}")
 
-def _haversine_miles(lat1: float, lon1: float, lat2: float, lon2: float) -> float:
-    """Calculate the distance between two points in miles using Haversine formula."""
-    R = 3959  # Earth's radius in miles
 
-    lat1_rad = math.radians(lat1)
-    lat2_rad = math.radians(lat2)
-    delta_lat = math.radians(lat2 - lat1)
-    delta_lon = math.radians(lon2 - lon1)
+def _remove_file(path: str) -> None:
+    """Delete a file if it exists."""
+    with suppress(FileNotFoundError):
+        os.remove(path)
 
-    a = (
-        math.sin(delta_lat / 2) ** 2
-        + math.cos(lat1_rad) * math.cos(lat2_rad) * math.sin(delta_lon / 2) ** 2
-    )
-    c = 2 * math.atan2(math.sqrt(a), math.sqrt(1 - a))
 
-    return R * c
+@callback
+def _async_get_store(hass: HomeAssistant, entry: ConfigEntry) -> Store:
+    """Return the store holding an entry's last accepted fix."""
+    return Store(hass, STORAGE_VERSION, f"{STORAGE_KEY}.{entry.entry_id}")
+
+
+@callback
+def _async_restore_fix(data: dict[str, Any], stored: dict[str, Any]) -> None:
+    """Restore the last accepted fix from storage."""
+    data["last_lat"] = stored.get("latitude")
+    data["last_lon"] = stored.get("longitude")
+    data["timezone"] = stored.get("timezone")
+    data["fix_time"] = stored.get("updated")
+    if pending := stored.get("pending_location"):
+        data["pending_location"] = tuple(pending)
+    if safe_zone := stored.get("safe_zone"):
+        data["safe_zone"] = SafeZone(**safe_zone)
+    if region := stored.get("region"):
+        # Looked up at the stored position
+        data["region"] = region
+        data["region_position"] = (data["last_lat"], data["last_lon"])
+
+
+@callback
+def _async_stored_fix(data: dict[str, Any]) -> dict[str, Any]:
+    """Return the last accepted fix in its stored form."""
+    data["store_dirty"] = False
+    safe_zone = data.get("safe_zone")
+    pending = data.get("pending_location")
+    return {
+        "latitude": data.get("last_lat"),
+        "longitude": data.get("last_lon"),
+        "timezone": data.get("timezone"),
+        "updated": data.get("fix_time"),
+        "pending_location": list(pending) if pending else None,
+        "safe_zone": asdict(safe_zone) if safe_zone else None,
+        "region": data.get("region"),
+    }
+
+
+@callback
+def _async_signal_metrics(
+    hass: HomeAssistant, entry: ConfigEntry, data: dict[str, Any]
+) -> None:
+    """Tell the diagnostic sensors the metrics changed, at most once an interval."""
+    if data["metrics_signal"] is not None:
+        return  # Already on its way
+
+    @callback
+    def async_send(_now: datetime | None = None) -> None:
+        """Send the signal."""
+        data["metrics_signal"] = None
+        data["metrics_signalled"] = hass.loop.time()
+        async_dispatcher_send(hass, SIGNAL_METRICS_UPDATED.format(entry.entry_id))
+
+    last = data["metrics_signalled"]
+    if last is None or (wait := last + METRICS_SIGNAL_INTERVAL - hass.loop.time()) <= 0:
+        async_send()
+        return
+    data["metrics_signal"] = async_call_later(hass, wait, async_send)
+
+
+@callback
+def _async_schedule_save(data: dict[str, Any]) -> None:
+    """Schedule a delayed save of the last accepted fix."""
+    data["store_dirty"] = True
+    data["store"].async_delay_save(
+        lambda: _async_stored_fix(data), STORAGE_SAVE_DELAY
+    )
@@ -0,0 +1,83 @@
+"""Distance to timezone boundaries for Arvee."""
+from __future__ import annotations
+
+from array import array
+from dataclasses import dataclass
+import json
+import math
+
+from .geo import EARTH_RADIUS_MILES
+
+MILES_PER_DEGREE = EARTH_RADIUS_MILES * math.pi / 180
+
+# Shrink computed radii to cover the flat-earth approximation below
+SAFETY_FACTOR = 0.9
+
+
+@dataclass(frozen=True)
+class SafeZone:
+    """Disc around a fix that lies entirely inside one timezone."""
+
+    latitude: float
+    longitude: float
+    radius: float  # miles
+    timezone: str
+
+
+def parse_rings(geojson: str) -> list[array]:
+    """Return the rings of a timezone polygon as flat lon/lat arrays."""
+    rings: list[array] = []
+    for feature in json.loads(geojson).get("features", []):
+        geometry = feature.get("geometry") or {}
+        if geometry.get("type") == "Polygon":
+            polygons = [geometry["coordinates"]]
+        elif geometry.get("type") == "MultiPolygon":
+            polygons = geometry["coordinates"]
+        else:
+            continue
+        for polygon in polygons:
+            for ring in polygon:
+                rings.append(array("d", (value for point in ring for value in point[:2])))
+    return rings
+
+
+def distance_to_rings(rings: list[array], lat: float, lon: float) -> float | None:
+    """Return the distance in miles from a coordinate to the nearest ring edge.
+
+    Edges are projected onto a plane tangent at the coordinate, which is
+    accurate for the nearby edges that decide the result.
+    """
+    kx = math.cos(math.radians(lat)) * MILES_PER_DEGREE
+    ky = MILES_PER_DEGREE
+    best = math.inf
+
+    for ring in rings:
+        if len(ring) < 4:
+            continue
+        px = ((ring[0] - lon + 180) % 360 - 180) * kx
+        py = (ring[1] - lat) * ky
+        for i in range(2, len(ring), 2):
+            qx = ((ring[i] - lon + 180) % 360 - 180) * kx
+            qy = (ring[i + 1] - lat) * ky
+            dx = qx - px
+            dy = qy - py
+            length = dx * dx + dy * dy
+            t = 0.0
+            if length:
+                t = min(max(-(px * dx + py * dy) / length, 0.0), 1.0)
+            x = px + t * dx
+            y = py + t * dy
+            if (distance := x * x + y * y) < best:
+                best = distance
+            px, py = qx, qy
+
+    if best == math.inf:
+        return None
+    return math.sqrt(best)
+
+
+def safe_radius(rings: list[array], lat: float, lon: float) -> float | None:
+    """Return how far a coordinate can move without leaving its timezone."""
+    if (distance := distance_to_rings(rings, lat, lon)) is None:
+        return None
+    return distance * SAFETY_FACTOR
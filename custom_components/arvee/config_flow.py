@@ -3,6 +3,7 @@ from __future__ import annotations
 
 import logging
 from typing import Any
+from urllib.parse import urlsplit
 
 import voluptuous as vol
 
@@ -15,32 +16,125 @@ from .const import (
     DOMAIN,
     CONF_LATITUDE_ENTITY,
     CONF_LONGITUDE_ENTITY,
+    CONF_TRACKER_ENTITY,
     CONF_UPDATE_THRESHOLD,
+    CONF_LOCATION_THRESHOLD,
+    CONF_LOCATION_INTERVAL,
+    CONF_CACHE_CELL_SIZE,
+    CONF_CACHE_SIZE,
+    CONF_GRID_RESOLUTION,
+    CONF_DATA_FILE,
+    CONF_REGION_FILE,
+    CONF_SOURCES,
+    CONF_SOURCE_MAX_AGE,
+    CONF_SMOOTHING,
+    CONF_STREAM,
+    CONF_MODE,
+    CONF_FLEET_TRACKERS,
+    MODE_FLEET,
+    FLEET_UNIQUE_ID,
     DEFAULT_UPDATE_THRESHOLD,
+    DEFAULT_LOCATION_THRESHOLD,
+    DEFAULT_LOCATION_INTERVAL,
+    DEFAULT_CACHE_CELL_SIZE,
+    DEFAULT_CACHE_SIZE,
+    DEFAULT_GRID_RESOLUTION,
+    DEFAULT_SOURCE_MAX_AGE,
+    DEFAULT_SMOOTHING,
 )
+from .source import tracker_fix
+from .stream import STREAM_SCHEMES
 
 _LOGGER = logging.getLogger(__name__)
 
 
-def get_schema(defaults: dict[str, Any] | None = None) -> vol.Schema:
-    """Get the config schema with optional defaults."""
+def get_schema(
+    defaults: dict[str, Any] | None = None,
+    tuning: bool = False,
+    tracker: bool = False,
+) -> vol.Schema:
+    """Get the config schema with optional defaults.
+
+    Tuning fields are only offered in the options flow. Tracker schemas
+    read both coordinates from a single device tracker's attributes.
+    """
     defaults = defaults or {}
-    return vol.Schema({
-        vol.Required(
-            CONF_LATITUDE_ENTITY,
-            default=defaults.get(CONF_LATITUDE_ENTITY, ""),
-        ): selector.EntitySelector(
-            selector.EntitySelectorConfig(domain=["sensor", "device_tracker", "input_number"]),
+    if tracker:
+        source = {
+            vol.Required(
+                CONF_TRACKER_ENTITY,
+                default=defaults.get(CONF_TRACKER_ENTITY, ""),
+            ): selector.EntitySelector(
+                selector.EntitySelectorConfig(domain=["device_tracker", "person"]),
+            ),
+        }
+    else:
+        source = {
+            vol.Required(
+                CONF_LATITUDE_ENTITY,
+                default=defaults.get(CONF_LATITUDE_ENTITY, ""),
+            ): selector.EntitySelector(
+                selector.EntitySelectorConfig(domain=["sensor", "device_tracker", "input_number"]),
+            ),
+            vol.Required(
+                CONF_LONGITUDE_ENTITY,
+                default=defaults.get(CONF_LONGITUDE_ENTITY, ""),
+            ): selector.EntitySelector(
+                selector.EntitySelectorConfig(domain=["sensor", "device_tracker", "input_number"]),
+            ),
+        }
+
+    schema = vol.Schema({
+        **source,
+        vol.Optional(
+            CONF_UPDATE_THRESHOLD,
+            default=defaults.get(CONF_UPDATE_THRESHOLD, DEFAULT_UPDATE_THRESHOLD),
+        ): selector.NumberSelector(
+            selector.NumberSelectorConfig(
+                min=0.1,
+                max=100,
+                step=0.1,
+                unit_of_measurement="miles",
+                mode=selector.NumberSelectorMode.BOX,
+            ),
         ),
-        vol.Required(
-            CONF_LONGITUDE_ENTITY,
-            default=defaults.get(CONF_LONGITUDE_ENTITY, ""),
+    })
+
+    if not tuning:
+        return schema
+
+    return schema.extend({
+        vol.Optional(
+            CONF_SOURCES,
+            default=defaults.get(CONF_SOURCES, []),
         ): selector.EntitySelector(
-            selector.EntitySelectorConfig(domain=["sensor", "device_tracker", "input_number"]),
+            selector.EntitySelectorConfig(
+                domain=["device_tracker", "person"], multiple=True
+            ),
         ),
         vol.Optional(
-            CONF_UPDATE_THRESHOLD,
-            default=defaults.get(CONF_UPDATE_THRESHOLD, DEFAULT_UPDATE_THRESHOLD),
+            CONF_SOURCE_MAX_AGE,
+            default=defaults.get(CONF_SOURCE_MAX_AGE, DEFAULT_SOURCE_MAX_AGE),
+        ): selector.NumberSelector(
+            selector.NumberSelectorConfig(
+                min=1,
+                max=1440,
+                step=1,
+                unit_of_measurement="minutes",
+                mode=selector.NumberSelectorMode.BOX,
+            ),
+        ),
+        vol.Optional(
+            CONF_SMOOTHING,
+            default=defaults.get(CONF_SMOOTHING, DEFAULT_SMOOTHING),
+        ): selector.BooleanSelector(),
+        vol.Optional(
+            CONF_STREAM,
+            default=defaults.get(CONF_STREAM, ""),
+        ): selector.TextSelector(),
+        vol.Optional(
+            CONF_LOCATION_THRESHOLD,
+            default=defaults.get(CONF_LOCATION_THRESHOLD, DEFAULT_LOCATION_THRESHOLD),
         ): selector.NumberSelector(
             selector.NumberSelectorConfig(
                 min=0.1,
@@ -50,6 +144,76 @@ def get_schema(defaults: dict[str, Any] | None = None) -> vol.Schema:
                 mode=selector.NumberSelectorMode.BOX,
             ),
         ),
+        vol.Optional(
+            CONF_LOCATION_INTERVAL,
+            default=defaults.get(CONF_LOCATION_INTERVAL, DEFAULT_LOCATION_INTERVAL),
+        ): selector.NumberSelector(
+            selector.NumberSelectorConfig(
+                min=0,
+                max=1440,
+                step=1,
+                unit_of_measurement="minutes",
+                mode=selector.NumberSelectorMode.BOX,
+            ),
+        ),
+        vol.Optional(
+            CONF_CACHE_CELL_SIZE,
+            default=defaults.get(CONF_CACHE_CELL_SIZE, DEFAULT_CACHE_CELL_SIZE),
+        ): selector.NumberSelector(
+            selector.NumberSelectorConfig(
+                min=0.01,
+                max=1,
+                step=0.01,
+                unit_of_measurement="°",
+                mode=selector.NumberSelectorMode.BOX,
+            ),
+        ),
+        vol.Optional(
+            CONF_CACHE_SIZE,
+            default=defaults.get(CONF_CACHE_SIZE, DEFAULT_CACHE_SIZE),
+        ): selector.NumberSelector(
+            selector.NumberSelectorConfig(
+                min=16,
+                max=65536,
+                step=1,
+                mode=selector.NumberSelectorMode.BOX,
+            ),
+        ),
+        vol.Optional(
+            CONF_GRID_RESOLUTION,
+            default=defaults.get(CONF_GRID_RESOLUTION, DEFAULT_GRID_RESOLUTION),
+        ): selector.NumberSelector(
+            selector.NumberSelectorConfig(
+                min=0,
+                max=1,
+                step=0.05,
+                unit_of_measurement="°",
+                mode=selector.NumberSelectorMode.BOX,
+            ),
+        ),
+        vol.Optional(
+            CONF_DATA_FILE,
+            default=defaults.get(CONF_DATA_FILE, ""),
+        ): selector.TextSelector(),
+        vol.Optional(
+            CONF_REGION_FILE,
+            default=defaults.get(CONF_REGION_FILE, ""),
+        ): selector.TextSelector(),
+    })
+
+
+def get_fleet_schema(defaults: dict[str, Any] | None = None) -> vol.Schema:
+    """Get the schema of a fleet's trackers."""
+    defaults = defaults or {}
+    return vol.Schema({
+        vol.Required(
+            CONF_FLEET_TRACKERS,
+            default=defaults.get(CONF_FLEET_TRACKERS, []),
+        ): selector.EntitySelector(
+            selector.EntitySelectorConfig(
+                domain=["device_tracker", "person"], multiple=True
+            ),
+        ),
     })
 
 
@@ -62,36 +226,68 @@ class ConfigFlow(config_entries.ConfigFlow, domain=DOMAIN):
         self, user_input: dict[str, Any] | None = None
     ) -> FlowResult:
         """Handle the initial step."""
-        errors: dict[str, str] = {}
+        return self.async_show_menu(
+            step_id="user",
+            menu_options=["entities", "tracker", "fleet"],
+        )
 
-        # Only allow one instance
+    async def async_step_entities(
+        self, user_input: dict[str, Any] | None = None
+    ) -> FlowResult:
+        """Configure separate latitude and longitude entities."""
+        # Only one entry can drive Home Assistant's own location
         await self.async_set_unique_id(DOMAIN)
         self._abort_if_unique_id_configured()
+        errors: dict[str, str] = {}
 
         if user_input is not None:
-            # Validate that entities exist and have numeric values
-            lat_entity = user_input[CONF_LATITUDE_ENTITY]
-            lon_entity = user_input[CONF_LONGITUDE_ENTITY]
-
-            lat_state = self.hass.states.get(lat_entity)
-            lon_state = self.hass.states.get(lon_entity)
+            errors = _validate_source(self.hass, user_input)
+            if not errors:
+                return self.async_create_entry(title="Arvee", data=user_input)
 
-            if lat_state is None:
-                errors[CONF_LATITUDE_ENTITY] = "entity_not_found"
-            elif not _is_numeric(lat_state.state):
-                errors[CONF_LATITUDE_ENTITY] = "invalid_latitude"
+        return self.async_show_form(
+            step_id="entities",
+            data_schema=get_schema(),
+            errors=errors,
+        )
 
-            if lon_state is None:
-                errors[CONF_LONGITUDE_ENTITY] = "entity_not_found"
-            elif not _is_numeric(lon_state.state):
-                errors[CONF_LONGITUDE_ENTITY] = "invalid_longitude"
+    async def async_step_tracker(
+        self, user_input: dict[str, Any] | None = None
+    ) -> FlowResult:
+        """Configure a single device tracker."""
+        await self.async_set_unique_id(DOMAIN)
+        self._abort_if_unique_id_configured()
+        errors: dict[str, str] = {}
 
+        if user_input is not None:
+            errors = _validate_source(self.hass, user_input)
             if not errors:
                 return self.async_create_entry(title="Arvee", data=user_input)
 
         return self.async_show_form(
-            step_id="user",
-            data_schema=get_schema(),
+            step_id="tracker",
+            data_schema=get_schema(tracker=True),
+            errors=errors,
+        )
+
+    async def async_step_fleet(
+        self, user_input: dict[str, Any] | None = None
+    ) -> FlowResult:
+        """Configure the device trackers of a fleet."""
+        await self.async_set_unique_id(FLEET_UNIQUE_ID)
+        self._abort_if_unique_id_configured()
+        errors: dict[str, str] = {}
+
+        if user_input is not None:
+            errors = _validate_fleet(self.hass, user_input)
+            if not errors:
+                return self.async_create_entry(
+                    title="Arvee Fleet", data={CONF_MODE: MODE_FLEET, **user_input}
+                )
+
+        return self.async_show_form(
+            step_id="fleet",
+            data_schema=get_fleet_schema(),
             errors=errors,
         )
 
@@ -112,37 +308,85 @@ class OptionsFlowHandler(config_entries.OptionsFlow):
     ) -> FlowResult:
         """Manage the options."""
         errors: dict[str, str] = {}
+        fleet = self.config_entry.data.get(CONF_MODE) == MODE_FLEET
 
         if user_input is not None:
-            lat_entity = user_input[CONF_LATITUDE_ENTITY]
-            lon_entity = user_input[CONF_LONGITUDE_ENTITY]
-
-            lat_state = self.hass.states.get(lat_entity)
-            lon_state = self.hass.states.get(lon_entity)
-
-            if lat_state is None:
-                errors[CONF_LATITUDE_ENTITY] = "entity_not_found"
-            elif not _is_numeric(lat_state.state):
-                errors[CONF_LATITUDE_ENTITY] = "invalid_latitude"
-
-            if lon_state is None:
-                errors[CONF_LONGITUDE_ENTITY] = "entity_not_found"
-            elif not _is_numeric(lon_state.state):
-                errors[CONF_LONGITUDE_ENTITY] = "invalid_longitude"
-
+            if fleet:
+                errors = _validate_fleet(self.hass, user_input)
+            else:
+                errors = _validate_source(self.hass, user_input)
             if not errors:
                 return self.async_create_entry(title="", data=user_input)
 
         # Use current config as defaults
         current_config = {**self.config_entry.data, **self.config_entry.options}
 
+        if fleet:
+            return self.async_show_form(
+                step_id="init",
+                data_schema=get_fleet_schema(current_config),
+                errors=errors,
+            )
+
         return self.async_show_form(
             step_id="init",
-            data_schema=get_schema(current_config),
+            data_schema=get_schema(
+                current_config,
+                tuning=True,
+                tracker=CONF_TRACKER_ENTITY in current_config,
+            ),
             errors=errors,
         )
 
 
+def _validate_source(hass: HomeAssistant, user_input: dict[str, Any]) -> dict[str, str]:
+    """Check that the GPS source entities exist and hold coordinates."""
+    errors: dict[str, str] = {}
+
+    # Additional sources may be unavailable for now, but must exist
+    for entity_id in user_input.get(CONF_SOURCES, []):
+        if hass.states.get(entity_id) is None:
+            errors[CONF_SOURCES] = "entity_not_found"
+
+    stream = user_input.get(CONF_STREAM)
+    if stream and urlsplit(stream).scheme not in STREAM_SCHEMES:
+        errors[CONF_STREAM] = "invalid_stream"
+
+    if CONF_TRACKER_ENTITY in user_input:
+        tracker_state = hass.states.get(user_input[CONF_TRACKER_ENTITY])
+        if tracker_state is None:
+            errors[CONF_TRACKER_ENTITY] = "entity_not_found"
+        elif tracker_fix(tracker_state) is None:
+            errors[CONF_TRACKER_ENTITY] = "invalid_tracker"
+        return errors
+
+    lat_state = hass.states.get(user_input[CONF_LATITUDE_ENTITY])
+    lon_state = hass.states.get(user_input[CONF_LONGITUDE_ENTITY])
+
+    if lat_state is None:
+        errors[CONF_LATITUDE_ENTITY] = "entity_not_found"
+    elif not _is_numeric(lat_state.state):
+        errors[CONF_LATITUDE_ENTITY] = "invalid_latitude"
+
+    if lon_state is None:
+        errors[CONF_LONGITUDE_ENTITY] = "entity_not_found"
+    elif not _is_numeric(lon_state.state):
+        errors[CONF_LONGITUDE_ENTITY] = "invalid_longitude"
+
+    return errors
+
+
+def _validate_fleet(hass: HomeAssistant, user_input: dict[str, Any]) -> dict[str, str]:
+    """Check that a fleet has trackers and that they exist."""
+    trackers = user_input.get(CONF_FLEET_TRACKERS, [])
+    if not trackers:
+        return {CONF_FLEET_TRACKERS: "no_trackers"}
+    # Trackers may be unavailable for now, but must exist
+    if any(hass.states.get(entity_id) is None for entity_id in trackers):
+        return {CONF_FLEET_TRACKERS: "entity_not_found"}
+    return {}
+
+
 def _is_numeric(value: str) -> bool:
     """Check if a string value is numeric."""
     if value in ("unknown", "unavailable", None):
@@ -3,16 +3,121 @@ DOMAIN = "arvee"
 # Services
 SERVICE_SET_TIMEZONE = "set_timezone"
 SERVICE_SET_GEO_TIMEZONE = "set_geo_timezone"
+SERVICE_LOOKUP_TIMEZONES = "lookup_timezones"
+SERVICE_LOAD_ROUTE = "load_route"
+SERVICE_CLEAR_ROUTE = "clear_route"
+SERVICE_GET_TRACK = "get_track"
+SERVICE_SET_OVERRIDE = "set_override"
+SERVICE_REMOVE_OVERRIDE = "remove_override"
+SERVICE_SIMULATE = "simulate"
 
 # Config entry keys
 CONF_LATITUDE_ENTITY = "latitude_entity"
 CONF_LONGITUDE_ENTITY = "longitude_entity"
+CONF_TRACKER_ENTITY = "tracker_entity"
 CONF_UPDATE_THRESHOLD = "update_threshold"
+CONF_LOCATION_THRESHOLD = "location_threshold"
+CONF_LOCATION_INTERVAL = "location_interval"
+CONF_CACHE_CELL_SIZE = "cache_cell_size"
+CONF_CACHE_SIZE = "cache_size"
+CONF_SOURCES = "sources"
+CONF_SOURCE_MAX_AGE = "source_max_age"
+CONF_SMOOTHING = "smoothing"
+CONF_GRID_RESOLUTION = "grid_resolution"
+CONF_DATA_FILE = "data_file"
+CONF_REGION_FILE = "region_file"
+CONF_STREAM = "stream"
+CONF_MODE = "mode"
+CONF_FLEET_TRACKERS = "trackers"
+
+# Options that decide where fixes come from. Changing any of them
+# rebuilds the GPS sources, others are applied to the running entry.
+SOURCE_OPTIONS = (
+    CONF_LATITUDE_ENTITY,
+    CONF_LONGITUDE_ENTITY,
+    CONF_TRACKER_ENTITY,
+    CONF_SOURCES,
+    CONF_SOURCE_MAX_AGE,
+    CONF_SMOOTHING,
+    CONF_STREAM,
+)
+
+# Entry modes. Entries without a mode follow one vehicle.
+MODE_FLEET = "fleet"
+FLEET_UNIQUE_ID = f"{DOMAIN}_fleet"
 
 # Defaults
 DEFAULT_UPDATE_THRESHOLD = 10.0  # miles
+DEFAULT_LOCATION_THRESHOLD = 10.0  # miles
+DEFAULT_LOCATION_INTERVAL = 15  # minutes
+DEFAULT_CACHE_CELL_SIZE = 0.1  # degrees
+DEFAULT_CACHE_SIZE = 4096  # cells
+DEFAULT_SOURCE_MAX_AGE = 5  # minutes
+DEFAULT_GPS_ACCURACY = 100.0  # meters, for sources that don't report one
+DEFAULT_SMOOTHING = False
+DEFAULT_GRID_RESOLUTION = 0.0  # degrees, 0 disables the grid
+
+# Storage
+STORAGE_KEY = "arvee"
+STORAGE_VERSION = 1
+STORAGE_SAVE_DELAY = 60  # seconds
+GRID_STORAGE_KEY = f"{STORAGE_KEY}.timezone_grid"
+TRACK_STORAGE_KEY = f"{STORAGE_KEY}.track"
+TRACK_FLUSH_INTERVAL = 600  # seconds
+OVERRIDES_STORAGE_KEY = f"{STORAGE_KEY}.overrides"
+
+# hass.data keys
+DATA_RESOLVER = "arvee_resolver"
+DATA_ROUTE = "arvee_route"
+DATA_OVERRIDES = "arvee_overrides"
+
+# Dispatcher signal sent when an entry's metrics change, formatted with its ID
+SIGNAL_METRICS_UPDATED = "arvee_metrics_updated_{}"
+
+# Shortest time between metrics signals, so the diagnostic sensors aren't
+# written for every fix
+METRICS_SIGNAL_INTERVAL = 60  # seconds
+
+# Dispatcher signal sent when an entry's country or region changes
+SIGNAL_REGION_UPDATED = "arvee_region_updated_{}"
+
+# Window in which latitude/longitude changes are merged into one fix
+UPDATE_SETTLE_TIME = 0.5  # seconds
+
+# Shortest time between fixes from a GPS stream being passed on
+STREAM_INTERVAL = 1.0  # seconds
+
+# Window in which fleet tracker fixes are gathered into one batch
+FLEET_BATCH_WINDOW = 1.0  # seconds
 
 # Attributes
 ATTR_LATITUDE = "latitude"
 ATTR_LONGITUDE = "longitude"
 ATTR_TIMEZONE = "timezone"
+ATTR_COORDINATES = "coordinates"
+ATTR_GPX = "gpx"
+ATTR_POLYLINE = "polyline"
+ATTR_START = "start"
+ATTR_END = "end"
+ATTR_NAME = "name"
+ATTR_RADIUS = "radius"
+ATTR_LOCATION = "location"
+ATTR_TIME = "time"
+ATTR_ACCURACY = "accuracy"
+ATTR_INTERVAL = "interval"
+ATTR_OUTPUT = "output"
+
+# Largest batch accepted by the lookup_timezones service
+MAX_LOOKUP_COORDINATES = 10000
+
+# Most points accepted for a route by the load_route service
+MAX_ROUTE_POINTS = 100000
+
+# Largest circle and most polygon points accepted for an override
+MAX_OVERRIDE_RADIUS = 50.0  # miles
+MAX_OVERRIDE_POINTS = 1000
+
+# Most fixes accepted for a replay by the simulate service, and the
+# spacing of fixes given without a time
+MAX_SIMULATION_FIXES = 100000
+DEFAULT_SIMULATION_INTERVAL = 1.0  # seconds
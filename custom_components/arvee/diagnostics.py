@@ -0,0 +1,78 @@
+"""Diagnostics support for Arvee."""
+from __future__ import annotations
+
+from typing import Any
+
+from homeassistant.components.diagnostics import REDACTED, async_redact_data
+from homeassistant.config_entries import ConfigEntry
+from homeassistant.core import HomeAssistant
+
+from .const import CONF_STREAM, DATA_OVERRIDES, DATA_RESOLVER, DATA_ROUTE, DOMAIN
+from .source import is_stream
+
+TO_REDACT = {
+    "last_lat",
+    "last_lon",
+    "latitude",
+    "longitude",
+    "pending_location",
+    "region",
+    "override",
+}
+
+# The stream URL may name a host or hold credentials
+TO_REDACT_CONFIG = {CONF_STREAM}
+
+
+async def async_get_config_entry_diagnostics(
+    hass: HomeAssistant, entry: ConfigEntry
+) -> dict[str, Any]:
+    """Return diagnostics for a config entry."""
+    data = hass.data[DOMAIN][entry.entry_id]
+    resolver = hass.data.get(DATA_RESOLVER)
+    route = hass.data.get(DATA_ROUTE)
+    overrides = hass.data.get(DATA_OVERRIDES)
+    safe_zone = data.get("safe_zone")
+    selector = data.get("selector")
+    gate = data.get("gate")
+    fleet = data.get("fleet")
+    stream = data.get("stream")
+    track = data.get("track")
+    override = data.get("override")
+
+    return {
+        "config": async_redact_data({**entry.data, **entry.options}, TO_REDACT_CONFIG),
+        "state": async_redact_data(
+            {
+                "last_lat": data.get("last_lat"),
+                "last_lon": data.get("last_lon"),
+                "timezone": data.get("timezone"),
+                "country": data.get("country"),
+                "region": data.get("region"),
+                "override": override.name if override else None,
+                "fix_time": data.get("fix_time"),
+                "pending_location": data.get("pending_location"),
+                "safe_zone_radius": safe_zone.radius if safe_zone else None,
+                "initial_update_time": data.get("initial_update_time"),
+                "route_distance": data.get("route_distance"),
+            },
+            TO_REDACT,
+        ),
+        "movement": gate.as_dict() if gate else None,
+        "sources": [
+            {**source, "entities": REDACTED}
+            if is_stream(tuple(source["entities"]))
+            else source
+            for source in selector.as_dict()
+        ]
+        if selector
+        else None,
+        "source_switches": selector.switches if selector else None,
+        "stream": stream.as_dict() if stream else None,
+        "route": route.as_dict() if route else None,
+        "overrides": overrides.as_dict() if overrides else None,
+        "track": track.as_dict() if track else None,
+        "fleet": fleet.as_dict() if fleet else None,
+        "metrics": data["metrics"].as_dict(),
+        "resolver": resolver.as_dict() if resolver else None,
+    }
@@ -0,0 +1,135 @@
+"""Fleet mode for Arvee."""
+from __future__ import annotations
+
+from collections.abc import Callable
+import logging
+from typing import Any
+
+from homeassistant.core import Event, HomeAssistant, State, callback
+from homeassistant.helpers.event import async_track_state_change_event
+
+from .const import FLEET_BATCH_WINDOW
+from .metrics import ArveeMetrics
+from .resolver import TimezoneResolver
+from .scheduler import LocationUpdateScheduler
+from .source import tracker_fix
+
+_LOGGER = logging.getLogger(__name__)
+
+
+class FleetTracker:
+    """Follow the timezones of many device trackers.
+
+    Fixes are gathered for a short window and resolved together, with
+    only the latest fix of each tracker kept, duplicate positions looked
+    up once and the whole batch sent to the lookup worker as one job.
+    Only the sensors of trackers whose timezone changed are written, and
+    Home Assistant's own location and timezone are never touched.
+    """
+
+    def __init__(
+        self,
+        hass: HomeAssistant,
+        resolver: TimezoneResolver,
+        trackers: list[str],
+        batch_window: float = FLEET_BATCH_WINDOW,
+    ) -> None:
+        """Initialize the fleet."""
+        self.hass = hass
+        self.resolver = resolver
+        self.trackers = list(dict.fromkeys(trackers))
+        self.metrics = ArveeMetrics()
+        self.timezones: dict[str, str | None] = {}
+        self.largest_batch = 0
+        self.timezone_changes = 0
+        self._positions: dict[str, tuple[float, float]] = {}
+        self._pending: dict[str, tuple[float, float]] = {}
+        self._listeners: dict[str, Callable[[], None]] = {}
+        self._scheduler = LocationUpdateScheduler(hass, self._async_resolve, batch_window)
+        self._unsub: Callable[[], None] | None = None
+
+    @callback
+    def async_start(self) -> None:
+        """Start following the trackers from their current states."""
+        for entity_id in self.trackers:
+            self._async_queue(entity_id, self.hass.states.get(entity_id))
+        self._unsub = async_track_state_change_event(
+            self.hass, self.trackers, self._async_state_changed
+        )
+        if self._pending:
+            self._scheduler.async_schedule()
+
+    async def async_stop(self) -> None:
+        """Stop following the trackers and drop any queued batch."""
+        if self._unsub is not None:
+            self._unsub()
+            self._unsub = None
+        await self._scheduler.async_shutdown()
+
+    @callback
+    def async_add_listener(
+        self, entity_id: str, update: Callable[[], None]
+    ) -> Callable[[], None]:
+        """Call update when a tracker's timezone changes."""
+        self._listeners[entity_id] = update
+
+        @callback
+        def remove_listener() -> None:
+            self._listeners.pop(entity_id, None)
+
+        return remove_listener
+
+    @callback
+    def _async_state_changed(self, event: Event) -> None:
+        """Queue the new fix of a tracker."""
+        self.metrics.events_received += 1
+        if self._async_queue(event.data["entity_id"], event.data["new_state"]):
+            self._scheduler.async_schedule()
+        else:
+            self.metrics.events_dropped += 1
+
+    @callback
+    def _async_queue(self, entity_id: str, state: State | None) -> bool:
+        """Queue a tracker's fix, returning False if there's nothing to look up."""
+        if (fix := tracker_fix(state)) is None:
+            return False
+        position = (fix.latitude, fix.longitude)
+        if entity_id not in self._pending and position == self._positions.get(entity_id):
+            # Attribute-only change, such as the battery level
+            return False
+        self._pending[entity_id] = position
+        return True
+
+    async def _async_resolve(self) -> None:
+        """Look up the timezones of every queued fix in one batch."""
+        pending, self._pending = self._pending, {}
+        if not pending:
+            return
+        if not await self.resolver.async_ready():
+            _LOGGER.error("tzfpy not available, cannot look up fleet timezones")
+            return
+
+        self.metrics.updates += 1
+        self.metrics.lookups += len(pending)
+        self.largest_batch = max(self.largest_batch, len(pending))
+        timezones = await self.resolver.async_get_timezones(list(pending.values()))
+
+        for (entity_id, position), timezone in zip(pending.items(), timezones):
+            self._positions[entity_id] = position
+            if entity_id in self.timezones and timezone == self.timezones[entity_id]:
+                continue
+            self.timezones[entity_id] = timezone
+            self.timezone_changes += 1
+            if (update := self._listeners.get(entity_id)) is not None:
+                update()
+
+    def as_dict(self) -> dict[str, Any]:
+        """Return fleet state for diagnostics, without positions."""
+        return {
+            "trackers": len(self.trackers),
+            "resolved": len(self.timezones),
+            "timezones": len(set(self.timezones.values()) - {None}),
+            "pending": len(self._pending),
+            "largest_batch": self.largest_batch,
+            "timezone_changes": self.timezone_changes,
+        }
@@ -0,0 +1,164 @@
+"""Movement gate deciding which GPS fixes are worth processing."""
+from __future__ import annotations
+
+from dataclasses import dataclass
+import math
+from typing import Any
+
+from .boundary import MILES_PER_DEGREE, SafeZone
+from .geo import haversine_miles
+
+# Time constant of the velocity estimate
+VELOCITY_TIME_CONSTANT = 60.0  # seconds
+
+# Speed hysteresis between the parked and moving states
+MOVING_SPEED = 5.0  # mph
+PARKED_SPEED = 2.0  # mph
+
+# Speed at which the base threshold applies, and the most it is scaled up
+REFERENCE_SPEED = 30.0  # mph
+MAX_THRESHOLD_SCALE = 3.0
+
+# Drift while parked must add up to three times the threshold before it
+# counts as movement, but never more than this past the threshold, so a
+# short drive across a nearby border still wakes the gate
+PARKED_MARGIN = 0.5  # miles
+
+# How far past a timezone border a fix must be before the change is made
+BORDER_HYSTERESIS = 0.5  # miles
+
+# How long a fix may stay within that distance of where it crossed before
+# the change is made anyway, for a vehicle parked just past the border
+BORDER_DWELL = 300.0  # seconds
+
+
+@dataclass(frozen=True, slots=True)
+class BorderCrossing:
+    """Where a fix was first seen past a timezone border, held until it's clear."""
+
+    latitude: float
+    longitude: float
+    timezone: str
+    since: float  # seconds
+
+    @property
+    def zone(self) -> SafeZone:
+        """Return the disc the vehicle must leave for the change to be made."""
+        return SafeZone(self.latitude, self.longitude, BORDER_HYSTERESIS, self.timezone)
+
+    def settled(self, now: float) -> bool:
+        """Return True if the vehicle has stayed past the border long enough."""
+        return now - self.since >= BORDER_DWELL
+
+    def passed(self, lat: float, lon: float, now: float) -> bool:
+        """Return True if a fix is far enough past the crossing, or late enough."""
+        return (
+            self.settled(now)
+            or haversine_miles(self.latitude, self.longitude, lat, lon)
+            >= BORDER_HYSTERESIS
+        )
+
+
+class MovementGate:
+    """Accept fixes based on distance from an anchor, adapted to speed.
+
+    Distances are measured on a plane tangent at the anchor, with the
+    scale factors computed once when the anchor moves, so each decision
+    is a handful of multiplications.
+    """
+
+    def __init__(self, threshold: float) -> None:
+        """Initialize the gate with the base threshold in miles."""
+        self.base_threshold = threshold
+        self.moving = False
+        self.speed = 0.0  # mph
+        self._anchor: tuple[float, float] | None = None
+        self._kx = MILES_PER_DEGREE
+        self._zone: tuple[float, float, float, float] | None = None
+        self._last: tuple[float, float, float] | None = None
+        self._tracking = False
+        self._vx = 0.0  # miles per second, east
+        self._vy = 0.0  # miles per second, north
+
+    @property
+    def threshold(self) -> float:
+        """Return the distance threshold for the current speed."""
+        if not self.moving:
+            return self.base_threshold
+        scale = min(max(self.speed / REFERENCE_SPEED, 1.0), MAX_THRESHOLD_SCALE)
+        return self.base_threshold * scale
+
+    def set_anchor(self, lat: float, lon: float) -> None:
+        """Measure movement from a newly accepted fix."""
+        self._anchor = (lat, lon)
+        self._kx = math.cos(math.radians(lat)) * MILES_PER_DEGREE
+
+    def set_safe_zone(self, zone: SafeZone | None) -> None:
+        """Open the gate whenever a fix leaves a safe zone."""
+        if zone is None:
+            self._zone = None
+            return
+        kx = math.cos(math.radians(zone.latitude)) * MILES_PER_DEGREE
+        self._zone = (zone.latitude, zone.longitude, kx, zone.radius * zone.radius)
+
+    def in_safe_zone(self, lat: float, lon: float) -> bool:
+        """Return True if a coordinate is inside the current safe zone."""
+        if self._zone is None:
+            return False
+        zone_lat, zone_lon, kx, radius_sq = self._zone
+        dx = _wrap(lon - zone_lon) * kx
+        dy = (lat - zone_lat) * MILES_PER_DEGREE
+        return dx * dx + dy * dy < radius_sq
+
+    def observe(self, lat: float, lon: float, now: float) -> None:
+        """Update the speed estimate with a fix."""
+        last = self._last
+        self._last = (lat, lon, now)
+        if last is None or now <= last[2]:
+            return
+
+        dt = now - last[2]
+        self._tracking = True
+        alpha = 1 - math.exp(-dt / VELOCITY_TIME_CONSTANT)
+        # Averaging the velocity vector lets jitter around a parked
+        # position cancel out instead of adding up
+        self._vx += alpha * (_wrap(lon - last[1]) * self._kx / dt - self._vx)
+        self._vy += alpha * ((lat - last[0]) * MILES_PER_DEGREE / dt - self._vy)
+
+        self.speed = math.hypot(self._vx, self._vy) * 3600
+        if self.speed >= MOVING_SPEED:
+            self.moving = True
+        elif self.speed <= PARKED_SPEED:
+            self.moving = False
+
+    def accept(self, lat: float, lon: float) -> bool:
+        """Return True if a fix moved far enough from the anchor."""
+        if self._anchor is None:
+            return True
+
+        dx = _wrap(lon - self._anchor[1]) * self._kx
+        dy = (lat - self._anchor[0]) * MILES_PER_DEGREE
+        distance_sq = dx * dx + dy * dy
+        threshold = self.threshold
+
+        if distance_sq >= threshold * threshold:
+            # Drift while parked adds up without the vehicle moving, so
+            # parked fixes must clear a wider margin
+            parked = min(threshold * MAX_THRESHOLD_SCALE, threshold + PARKED_MARGIN)
+            return self.moving or not self._tracking or distance_sq >= parked * parked
+
+        # Crossing a timezone border can't wait for the threshold
+        return self._zone is not None and not self.in_safe_zone(lat, lon)
+
+    def as_dict(self) -> dict[str, Any]:
+        """Return the gate state for diagnostics."""
+        return {
+            "moving": self.moving,
+            "speed": round(self.speed, 1),
+            "threshold": round(self.threshold, 2),
+        }
+
+
+def _wrap(delta: float) -> float:
+    """Wrap a longitude difference into [-180, 180)."""
+    return (delta + 180) % 360 - 180
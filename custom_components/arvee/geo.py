@@ -0,0 +1,55 @@
+"""Distance helpers for Arvee."""
+from __future__ import annotations
+
+from collections.abc import Sequence
+import math
+
+# NumPy ships with Home Assistant but isn't required by Arvee
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+EARTH_RADIUS_MILES = 3959
+
+
+def haversine_miles(lat1: float, lon1: float, lat2: float, lon2: float) -> float:
+    """Calculate the distance between two points in miles using Haversine formula."""
+    lat1_rad = math.radians(lat1)
+    lat2_rad = math.radians(lat2)
+    delta_lat = math.radians(lat2 - lat1)
+    delta_lon = math.radians(lon2 - lon1)
+
+    a = (
+        math.sin(delta_lat / 2) ** 2
+        + math.cos(lat1_rad) * math.cos(lat2_rad) * math.sin(delta_lon / 2) ** 2
+    )
+    c = 2 * math.atan2(math.sqrt(a), math.sqrt(1 - a))
+
+    return EARTH_RADIUS_MILES * c
+
+
+def consecutive_miles(
+    latitudes: Sequence[float], longitudes: Sequence[float]
+) -> list[float]:
+    """Return the distance from each point to the one before it.
+
+    The first point has a distance of zero. Uses NumPy when available.
+    """
+    if len(latitudes) < 2:
+        return [0.0] * len(latitudes)
+
+    if np is None:
+        return [0.0] + [
+            haversine_miles(latitudes[i - 1], longitudes[i - 1], latitudes[i], longitudes[i])
+            for i in range(1, len(latitudes))
+        ]
+
+    lat = np.radians(np.asarray(latitudes, dtype=float))
+    lon = np.radians(np.asarray(longitudes, dtype=float))
+    a = (
+        np.sin(np.diff(lat) / 2) ** 2
+        + np.cos(lat[:-1]) * np.cos(lat[1:]) * np.sin(np.diff(lon) / 2) ** 2
+    )
+    distances = 2 * EARTH_RADIUS_MILES * np.arctan2(np.sqrt(a), np.sqrt(1 - a))
+    return [0.0, *distances.tolist()]
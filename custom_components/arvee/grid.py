@@ -0,0 +1,291 @@
+"""Precomputed timezone grid for Arvee."""
+from __future__ import annotations
+
+from array import array
+import base64
+from collections.abc import Callable, Iterable
+import sys
+from typing import Any
+import zlib
+
+# Cell value for cells a timezone border crosses, which are looked up exactly
+BORDER_CELL = 0
+
+# South, west, north and east edges of a grid covering the whole world
+WORLD = (-90.0, -180.0, 90.0, 180.0)
+
+# Polygon edges closer than this to a cell edge mark the cells on both sides
+_EDGE_MARGIN = 1e-9
+
+# Work done by each build step, so lookups can run between steps
+_ZONES_PER_STEP = 8
+_CELLS_PER_STEP = 20000
+
+
+class TimezoneGrid:
+    """Timezones over a regular latitude/longitude grid, stored as an array.
+
+    Cells entirely inside one timezone hold the index of its name plus one,
+    cells a border crosses hold BORDER_CELL, so answering a coordinate is
+    one array index.
+    """
+
+    __slots__ = (
+        "resolution", "bounds", "south", "west", "rows", "cols", "zones", "cells", "source"
+    )
+
+    def __init__(
+        self,
+        resolution: float,
+        bounds: tuple[float, float, float, float],
+        zones: list[str],
+        cells: array,
+        source: str = "",
+    ) -> None:
+        """Initialize the grid."""
+        self.resolution = resolution
+        self.bounds = tuple(bounds)
+        self.south, self.west = bounds[0], bounds[1]
+        self.rows, self.cols = grid_shape(resolution, bounds)
+        if len(cells) != self.rows * self.cols:
+            raise ValueError(
+                f"Expected {self.rows * self.cols} cells, got {len(cells)}"
+            )
+        self.zones = zones
+        self.cells = cells
+        self.source = source
+
+    @property
+    def nbytes(self) -> int:
+        """Return the memory used by the cell array."""
+        return self.cells.itemsize * len(self.cells)
+
+    @property
+    def border_cells(self) -> int:
+        """Return the number of cells that need an exact lookup."""
+        return self.cells.count(BORDER_CELL)
+
+    def lookup(self, lat: float, lon: float) -> str | None:
+        """Return the timezone of the cell containing a coordinate.
+
+        Returns an empty string for a border cell, and None outside the grid.
+        """
+        row = (lat - self.south) / self.resolution
+        col = (lon - self.west) / self.resolution
+        if not (0 <= row <= self.rows and 0 <= col <= self.cols):
+            return None
+        # The north and east edges belong to the last row and column
+        row = min(int(row), self.rows - 1)
+        value = self.cells[row * self.cols + min(int(col), self.cols - 1)]
+        return self.zones[value - 1] if value != BORDER_CELL else ""
+
+    def as_dict(self) -> dict[str, Any]:
+        """Return the grid in its stored form."""
+        cells = self.cells
+        if sys.byteorder == "big":
+            cells = array(cells.typecode, cells)
+            cells.byteswap()
+        return {
+            "resolution": self.resolution,
+            "bounds": list(self.bounds),
+            "source": self.source,
+            "zones": self.zones,
+            "cells": base64.b64encode(zlib.compress(cells.tobytes(), 9)).decode(),
+        }
+
+    @classmethod
+    def from_dict(cls, data: dict[str, Any]) -> TimezoneGrid:
+        """Restore a grid from its stored form."""
+        cells = array("H")
+        cells.frombytes(zlib.decompress(base64.b64decode(data["cells"])))
+        if sys.byteorder == "big":
+            cells.byteswap()
+        return cls(
+            data["resolution"],
+            tuple(data["bounds"]),
+            list(data["zones"]),
+            cells,
+            data.get("source", ""),
+        )
+
+
+class GridBuilder:
+    """Build a TimezoneGrid a step at a time.
+
+    Every cell that an edge of a timezone polygon passes through is marked
+    as a border cell, so an unmarked cell is known to lie inside a single
+    zone and the zone at its center is the zone of the whole cell. Cells
+    where polygons overlap are treated as border cells too, leaving tzfpy
+    to decide between them.
+    """
+
+    def __init__(
+        self,
+        resolution: float,
+        zone_names: Iterable[str],
+        zone_rings: Callable[[str], list[array]],
+        get_tzs: Callable[[float, float], list[str]],
+        bounds: tuple[float, float, float, float] = WORLD,
+        source: str = "",
+    ) -> None:
+        """Initialize the builder."""
+        self.resolution = resolution
+        self.bounds = tuple(bounds)
+        self.source = source
+        self.rows, self.cols = grid_shape(resolution, bounds)
+        self._zone_rings = zone_rings
+        self._get_tzs = get_tzs
+        self._pending = list(zone_names)
+        self._border = bytearray(self.rows * self.cols)
+        self._cells = array("H", bytes(2 * self.rows * self.cols))
+        self._zones: dict[str, int] = {}
+        self._row = 0
+
+    def step(self) -> bool:
+        """Do the next part of the build, returning True once it's done."""
+        if self._pending:
+            for name in self._pending[-_ZONES_PER_STEP:]:
+                for ring in self._zone_rings(name):
+                    self._mark_ring(ring)
+            del self._pending[-_ZONES_PER_STEP:]
+            return False
+
+        end = min(self._row + max(_CELLS_PER_STEP // self.cols, 1), self.rows)
+        self._fill_rows(self._row, end)
+        self._row = end
+        return end == self.rows
+
+    @property
+    def grid(self) -> TimezoneGrid:
+        """Return the finished grid."""
+        return TimezoneGrid(
+            self.resolution, self.bounds, list(self._zones), self._cells, self.source
+        )
+
+    def _mark_ring(self, ring: array) -> None:
+        """Mark the cells that the edges of a ring pass through."""
+        south, west = self.bounds[0], self.bounds[1]
+        size = self.resolution
+        rows, cols = self.rows, self.cols
+        border = self._border
+        margin = _EDGE_MARGIN
+
+        # Skip rings that don't reach the grid at all
+        south_edge = south - margin
+        north_edge = south + rows * size + margin
+        west_edge = west - margin
+        east_edge = west + cols * size + margin
+        if len(ring) < 4 or not (
+            min(ring[1::2]) <= north_edge
+            and max(ring[1::2]) >= south_edge
+            and min(ring[0::2]) <= east_edge
+            and max(ring[0::2]) >= west_edge
+        ):
+            return
+
+        x0, y0 = ring[0], ring[1]
+        for i in range(2, len(ring), 2):
+            x1, y1 = ring[i], ring[i + 1]
+            # Marking the edge's bounding box covers every cell it crosses
+            col0 = max(int((min(x0, x1) - margin - west) // size), 0)
+            col1 = min(int((max(x0, x1) + margin - west) // size), cols - 1)
+            row0 = max(int((min(y0, y1) - margin - south) // size), 0)
+            row1 = min(int((max(y0, y1) + margin - south) // size), rows - 1)
+            if col0 <= col1:
+                for row in range(row0, row1 + 1):
+                    start = row * cols
+                    border[start + col0 : start + col1 + 1] = b"\x01" * (col1 - col0 + 1)
+            x0, y0 = x1, y1
+
+    def _fill_rows(self, start: int, end: int) -> None:
+        """Set the zone of each unmarked cell in a band of rows."""
+        south, west = self.bounds[0], self.bounds[1]
+        size = self.resolution
+        cols = self.cols
+        for row in range(start, end):
+            lat = south + (row + 0.5) * size
+            offset = row * cols
+            for col in range(cols):
+                if self._border[offset + col]:
+                    continue
+                timezones = self._get_tzs(west + (col + 0.5) * size, lat)
+                if len(timezones) == 1:
+                    index = self._zones.setdefault(timezones[0], len(self._zones) + 1)
+                    self._cells[offset + col] = index
+
+
+def rings_cross_box(
+    rings: Iterable[array], south: float, west: float, north: float, east: float
+) -> bool:
+    """Return True if an edge of the rings may pass through a box.
+
+    An edge counts when its bounding box reaches the box, as when a
+    GridBuilder marks border cells, so a box this returns False for lies
+    entirely on one side of every ring.
+    """
+    margin = _EDGE_MARGIN
+    south -= margin
+    west -= margin
+    north += margin
+    east += margin
+    for ring in rings:
+        if len(ring) < 4 or not (
+            min(ring[1::2]) <= north
+            and max(ring[1::2]) >= south
+            and min(ring[0::2]) <= east
+            and max(ring[0::2]) >= west
+        ):
+            continue
+        x0, y0 = ring[0], ring[1]
+        for i in range(2, len(ring), 2):
+            x1, y1 = ring[i], ring[i + 1]
+            if (
+                min(x0, x1) <= east
+                and max(x0, x1) >= west
+                and min(y0, y1) <= north
+                and max(y0, y1) >= south
+            ):
+                return True
+            x0, y0 = x1, y1
+    return False
+
+
+def build_grid(
+    resolution: float,
+    zone_names: Iterable[str],
+    zone_rings: Callable[[str], list[array]],
+    get_tzs: Callable[[float, float], list[str]],
+    bounds: tuple[float, float, float, float] = WORLD,
+    source: str = "",
+) -> TimezoneGrid:
+    """Build a grid in one go."""
+    builder = GridBuilder(resolution, zone_names, zone_rings, get_tzs, bounds, source)
+    while not builder.step():
+        pass
+    return builder.grid
+
+
+def grid_shape(
+    resolution: float, bounds: tuple[float, float, float, float]
+) -> tuple[int, int]:
+    """Return the number of rows and columns covering some bounds."""
+    south, west, north, east = bounds
+    if resolution <= 0 or north <= south or east <= west:
+        raise ValueError("Grid bounds and resolution must be positive")
+    return (
+        max(round((north - south) / resolution), 1),
+        max(round((east - west) / resolution), 1),
+    )
+
+
+def tzfpy_version() -> str:
+    """Return the installed tzfpy version, which identifies its data."""
+    from importlib.metadata import (  # pylint: disable=import-outside-toplevel
+        PackageNotFoundError,
+        version,
+    )
+
+    try:
+        return version("tzfpy")
+    except PackageNotFoundError:
+        return ""
@@ -0,0 +1,413 @@
+"""Memory-mapped timezone data for Arvee.
+
+The data file holds a grid of cells over the world. Cells that lie inside
+one timezone hold it directly; the rest list, for each nearby zone,
+whether a reference point in the cell is inside it and the polygon edges
+that cross the cell. A coordinate in such a cell is inside a zone when it
+is reached from the reference point by crossing an odd number of the
+zone's edges, so a lookup only reads the few pages around the vehicle and
+the rest of the file stays on disk.
+"""
+from __future__ import annotations
+
+from array import array
+from collections.abc import Callable, Iterable
+import json
+import math
+import mmap
+import os
+import struct
+import sys
+
+from .boundary import MILES_PER_DEGREE, SAFETY_FACTOR, distance_to_rings
+from .grid import WORLD, grid_shape
+
+MAGIC = b"ARVT"
+FORMAT_VERSION = 1
+
+# Magic, version, reserved, metadata length, resolution, bounds, rows,
+# columns, edge count and the offsets of the cell, entry and edge sections
+_HEADER = struct.Struct("<4sHHId4dIIIQQQ")
+
+# Cell values with this bit set hold a zone number rather than an entry offset
+UNIFORM = 1 << 31
+
+# Coordinates are stored as integers in units of 1e-7 degrees
+SCALE = 10_000_000
+
+# Polygon edges closer than this to a cell edge are listed in both cells
+_EDGE_MARGIN = 1e-9
+
+# Position of each cell's reference point, in cells from its south-west
+# corner. It's kept off the center, which borders drawn along round
+# coordinates often pass straight through.
+_REFERENCE_ROW = 0.5138
+_REFERENCE_COL = 0.4873
+
+# Cells searched around a fix for the nearest edge of its zone
+MAX_SEARCH_CELLS = 16
+
+
+class MappedTimezoneData:
+    """Timezone lookups from a converted data file read through mmap."""
+
+    def __init__(self, path: str) -> None:
+        """Open a data file."""
+        if sys.byteorder != "little":
+            raise ValueError("Mapped timezone data needs a little-endian host")
+
+        self.path = os.path.realpath(path)
+        with open(self.path, "rb") as file:
+            self._mmap = mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ)
+
+        try:
+            (
+                magic,
+                version,
+                _,
+                meta_length,
+                self.resolution,
+                south,
+                west,
+                north,
+                east,
+                self.rows,
+                self.cols,
+                edge_count,
+                cells_offset,
+                entries_offset,
+                edges_offset,
+            ) = _HEADER.unpack_from(self._mmap)
+            if magic != MAGIC or version != FORMAT_VERSION:
+                raise ValueError(f"{path} isn't an Arvee timezone data file")
+            meta = json.loads(self._mmap[_HEADER.size : _HEADER.size + meta_length])
+        except (struct.error, ValueError):
+            self._mmap.close()
+            raise
+
+        self.bounds = (south, west, north, east)
+        self.zones: list[str] = meta["zones"]
+        self.source: str = meta.get("source", "")
+        self.resident: int | None = None
+
+        view = memoryview(self._mmap)
+        cells_end = cells_offset + 4 * self.rows * self.cols
+        self._cells = view[cells_offset:cells_end].cast("I")
+        self._entries = view[entries_offset:edges_offset].cast("I")
+        self._edges = view[edges_offset : edges_offset + 16 * edge_count].cast("i")
+
+    @property
+    def nbytes(self) -> int:
+        """Return the size of the data file."""
+        return len(self._mmap)
+
+    def close(self) -> None:
+        """Unmap the data file."""
+        for view in (self._cells, self._entries, self._edges):
+            view.release()
+        self._mmap.close()
+
+    def get_tz(self, lon: float, lat: float) -> str | None:
+        """Return the timezone at a coordinate, with tzfpy's argument order."""
+        if (cell := self._cell(lat, lon)) is None:
+            return None
+
+        value = self._cells[cell]
+        if value & UNIFORM:
+            zone = value & ~UNIFORM
+            return self.zones[zone - 1] if zone else None
+
+        south, west = self.bounds[0], self.bounds[1]
+        size = self.resolution
+        ref_lat = south + (cell // self.cols + _REFERENCE_ROW) * size
+        ref_lon = west + (cell % self.cols + _REFERENCE_COL) * size
+
+        for zone, inside, edges in self._cell_entries(value):
+            for edge in edges:
+                if _crosses(ref_lon, ref_lat, lon, lat, *self._edge(edge)):
+                    inside = not inside
+            if inside:
+                return self.zones[zone]
+        return None
+
+    def safe_radius(self, lat: float, lon: float, timezone: str) -> float | None:
+        """Return how far a coordinate can move without leaving its timezone.
+
+        The nearest edge of the zone is searched for in widening rings of
+        cells, stopping once no closer edge can be found further out.
+        """
+        try:
+            zone = self.zones.index(timezone)
+        except ValueError:
+            return None
+        if (cell := self._cell(lat, lon)) is None:
+            return None
+
+        row, col = divmod(cell, self.cols)
+        # Miles covered by one cell, on the narrower of its two sides
+        cell_miles = self.resolution * MILES_PER_DEGREE * min(
+            max(math.cos(math.radians(abs(lat) + self.resolution)), 0.01), 1.0
+        )
+
+        seen: set[int] = set()
+        rings: list[array] = []
+        best: float | None = None
+        for distance in range(MAX_SEARCH_CELLS + 1):
+            # Cells this many steps away are at least this far from the fix
+            if best is not None and best <= (distance - 1) * cell_miles:
+                break
+            found = False
+            for ring_row, ring_col in _square(row, col, distance):
+                if not (0 <= ring_row < self.rows and 0 <= ring_col < self.cols):
+                    continue
+                value = self._cells[ring_row * self.cols + ring_col]
+                if value & UNIFORM:
+                    continue
+                for entry_zone, _, edges in self._cell_entries(value):
+                    if entry_zone != zone:
+                        continue
+                    for edge in edges:
+                        if edge not in seen:
+                            seen.add(edge)
+                            rings.append(array("d", self._edge(edge)))
+                            found = True
+            if found:
+                best = distance_to_rings(rings, lat, lon)
+        else:
+            if best is None:
+                # No edge of the zone anywhere in the searched area
+                best = MAX_SEARCH_CELLS * cell_miles
+
+        return best * SAFETY_FACTOR
+
+    def zone_in_box(
+        self, south: float, west: float, north: float, east: float
+    ) -> str | None:
+        """Return the timezone covering the whole of a box.
+
+        Returns None if any cell the box overlaps is crossed by a border
+        or lies outside every zone.
+        """
+        size = self.resolution
+        row0 = math.floor((south - self.bounds[0]) / size)
+        row1 = math.ceil((north - self.bounds[0]) / size) - 1
+        col0 = math.floor((west - self.bounds[1]) / size)
+        col1 = math.ceil((east - self.bounds[1]) / size) - 1
+        if row0 < 0 or col0 < 0 or row1 >= self.rows or col1 >= self.cols:
+            return None
+
+        zones = {
+            self._cells[row * self.cols + col]
+            for row in range(row0, row1 + 1)
+            for col in range(col0, col1 + 1)
+        }
+        if len(zones) != 1 or not (value := zones.pop()) & UNIFORM:
+            return None
+        zone = value & ~UNIFORM
+        return self.zones[zone - 1] if zone else None
+
+    def update_resident(self) -> int | None:
+        """Measure how much of the data file is resident in memory."""
+        self.resident = mapping_resident_size(self.path)
+        return self.resident
+
+    def _cell(self, lat: float, lon: float) -> int | None:
+        """Return the index of the cell containing a coordinate."""
+        row = (lat - self.bounds[0]) / self.resolution
+        col = (lon - self.bounds[1]) / self.resolution
+        if not (0 <= row <= self.rows and 0 <= col <= self.cols):
+            return None
+        return min(int(row), self.rows - 1) * self.cols + min(int(col), self.cols - 1)
+
+    def _cell_entries(self, offset: int) -> Iterable[tuple[int, bool, Iterable[int]]]:
+        """Yield the zone, reference point flag and edges of each entry of a cell."""
+        entries = self._entries
+        count = entries[offset]
+        position = offset + 1
+        for _ in range(count):
+            zone_inside = entries[position]
+            edge_count = entries[position + 1]
+            start = position + 2
+            position = start + edge_count
+            yield zone_inside >> 1, bool(zone_inside & 1), entries[start:position]
+
+    def _edge(self, edge: int) -> tuple[float, float, float, float]:
+        """Return the endpoints of an edge in degrees."""
+        start = 4 * edge
+        ax, ay, bx, by = self._edges[start : start + 4]
+        return ax / SCALE, ay / SCALE, bx / SCALE, by / SCALE
+
+
+def write_timezone_data(
+    path: str,
+    resolution: float,
+    zone_names: Iterable[str],
+    zone_rings: Callable[[str], list[array]],
+    bounds: tuple[float, float, float, float] = WORLD,
+    source: str = "",
+) -> None:
+    """Convert timezone polygons to a data file for MappedTimezoneData."""
+    south, west = bounds[0], bounds[1]
+    rows, cols = grid_shape(resolution, bounds)
+    zones = list(zone_names)
+
+    edges = array("i")
+    edge_zones = array("H")
+    cell_edges: dict[int, array] = {}
+    # Where each zone's edges cross the line through each row's reference points
+    crossings: list[list[tuple[float, int]]] = [[] for _ in range(rows)]
+
+    for zone, name in enumerate(zones):
+        for ring in zone_rings(name):
+            points = [round(value * SCALE) for value in ring]
+            for i in range(0, len(points) - 3, 2):
+                ax, ay, bx, by = points[i : i + 4]
+                if (ax, ay) == (bx, by):
+                    continue
+                edge = len(edge_zones)
+                edges.extend((ax, ay, bx, by))
+                edge_zones.append(zone)
+
+                x0, y0, x1, y1 = ax / SCALE, ay / SCALE, bx / SCALE, by / SCALE
+                low_y, high_y = min(y0, y1), max(y0, y1)
+                col0 = max(int((min(x0, x1) - _EDGE_MARGIN - west) // resolution), 0)
+                col1 = min(int((max(x0, x1) + _EDGE_MARGIN - west) // resolution), cols - 1)
+                row0 = max(int((low_y - _EDGE_MARGIN - south) // resolution), 0)
+                row1 = min(int((high_y + _EDGE_MARGIN - south) // resolution), rows - 1)
+                for row in range(row0, row1 + 1):
+                    ref_lat = south + (row + _REFERENCE_ROW) * resolution
+                    # Half-open, so a vertex on the line is counted once
+                    if low_y <= ref_lat < high_y:
+                        x = x0 + (ref_lat - y0) * (x1 - x0) / (y1 - y0)
+                        crossings[row].append((x, zone))
+                    for col in range(col0, col1 + 1):
+                        cell_edges.setdefault(row * cols + col, array("I")).append(edge)
+
+    cells = array("I", bytes(4 * rows * cols))
+    entries = array("I")
+    for row in range(rows):
+        row_crossings = sorted(crossings[row])
+        crossings[row] = []
+        inside: set[int] = set()
+        position = 0
+        for col in range(cols):
+            ref_lon = west + (col + _REFERENCE_COL) * resolution
+            while position < len(row_crossings) and row_crossings[position][0] < ref_lon:
+                inside ^= {row_crossings[position][1]}
+                position += 1
+
+            cell = row * cols + col
+            edge_ids = cell_edges.pop(cell, None)
+            if edge_ids is None and len(inside) <= 1:
+                cells[cell] = UNIFORM | (next(iter(inside)) + 1 if inside else 0)
+                continue
+
+            by_zone: dict[int, list[int]] = {zone: [] for zone in sorted(inside)}
+            for edge in edge_ids or ():
+                by_zone.setdefault(edge_zones[edge], []).append(edge)
+            cells[cell] = len(entries)
+            entries.append(len(by_zone))
+            for zone in sorted(by_zone):
+                entries.extend((zone << 1 | (zone in inside), len(by_zone[zone])))
+                entries.extend(by_zone[zone])
+
+    meta = json.dumps({"source": source, "zones": zones}).encode()
+    cells_offset = _align(_HEADER.size + len(meta))
+    entries_offset = _align(cells_offset + cells.itemsize * len(cells))
+    edges_offset = _align(entries_offset + entries.itemsize * len(entries))
+    header = _HEADER.pack(
+        MAGIC,
+        FORMAT_VERSION,
+        0,
+        len(meta),
+        resolution,
+        *bounds,
+        rows,
+        cols,
+        len(edge_zones),
+        cells_offset,
+        entries_offset,
+        edges_offset,
+    )
+
+    if sys.byteorder != "little":
+        for section in (cells, entries, edges):
+            section.byteswap()
+    with open(path, "wb") as file:
+        for offset, data in (
+            (0, header + meta),
+            (cells_offset, cells.tobytes()),
+            (entries_offset, entries.tobytes()),
+            (edges_offset, edges.tobytes()),
+        ):
+            file.write(bytes(offset - file.tell()))
+            file.write(data)
+
+
+def resident_size() -> int | None:
+    """Return this process's resident memory in bytes, where it's known."""
+    try:
+        with open("/proc/self/statm", encoding="ascii") as statm:
+            pages = int(statm.read().split()[1])
+    except (OSError, IndexError, ValueError):
+        return None
+    return pages * mmap.PAGESIZE
+
+
+def mapping_resident_size(path: str) -> int | None:
+    """Return how much of a memory-mapped file is resident, where it's known."""
+    total = 0
+    in_mapping = False
+    try:
+        with open("/proc/self/smaps", encoding="utf-8") as smaps:
+            for line in smaps:
+                fields = line.split()
+                if len(fields) >= 5 and "-" in fields[0]:
+                    in_mapping = fields[-1] == path
+                elif in_mapping and fields[0] == "Rss:":
+                    total += int(fields[1]) * 1024
+    except (OSError, IndexError, ValueError):
+        return None
+    return total
+
+
+def _align(offset: int) -> int:
+    """Round an offset up to the next multiple of 8."""
+    return (offset + 7) & ~7
+
+
+def _square(row: int, col: int, distance: int) -> Iterable[tuple[int, int]]:
+    """Yield the cells exactly some number of steps from a cell."""
+    if distance == 0:
+        yield row, col
+        return
+    for offset in range(-distance, distance + 1):
+        yield row - distance, col + offset
+        yield row + distance, col + offset
+    for offset in range(-distance + 1, distance):
+        yield row + offset, col - distance
+        yield row + offset, col + distance
+
+
+def _crosses(
+    cx: float,
+    cy: float,
+    px: float,
+    py: float,
+    ax: float,
+    ay: float,
+    bx: float,
+    by: float,
+) -> bool:
+    """Return True if the segment c-p crosses the edge a-b.
+
+    Points exactly on a line are counted on one side, so a path through
+    a vertex crosses its two edges a consistent number of times.
+    """
+    if ((bx - ax) * (cy - ay) - (by - ay) * (cx - ax) > 0) == (
+        (bx - ax) * (py - ay) - (by - ay) * (px - ax) > 0
+    ):
+        return False
+    return ((px - cx) * (ay - cy) - (py - cy) * (ax - cx) > 0) != (
+        (px - cx) * (by - cy) - (py - cy) * (bx - cx) > 0
+    )
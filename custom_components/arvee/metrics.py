@@ -0,0 +1,92 @@
+"""Runtime metrics for Arvee."""
+from __future__ import annotations
+
+from bisect import bisect_left
+from dataclasses import dataclass, field
+import math
+from typing import Any
+
+# Upper bounds of the latency buckets, in milliseconds
+LATENCY_BUCKETS = (1, 5, 10, 50, 100, 500, 1000, 5000, 60000, 900000)
+
+
+class Histogram:
+    """Fixed-bucket latency histogram."""
+
+    def __init__(self, buckets: tuple[float, ...] = LATENCY_BUCKETS) -> None:
+        """Initialize the histogram."""
+        self.buckets = buckets
+        self.counts = [0] * (len(buckets) + 1)
+        self.count = 0
+        self.total = 0.0
+        self.max = 0.0
+
+    def add(self, seconds: float) -> None:
+        """Record a duration."""
+        value = seconds * 1000
+        self.counts[bisect_left(self.buckets, value)] += 1
+        self.count += 1
+        self.total += value
+        self.max = max(self.max, value)
+
+    @property
+    def mean(self) -> float | None:
+        """Return the mean duration in milliseconds."""
+        return self.total / self.count if self.count else None
+
+    def percentile(self, pct: float) -> float | None:
+        """Return the upper bucket bound holding a percentile, in milliseconds."""
+        if not self.count:
+            return None
+        target = math.ceil(self.count * pct / 100)
+        seen = 0
+        for index, count in enumerate(self.counts):
+            seen += count
+            if seen >= target:
+                return self.buckets[index] if index < len(self.buckets) else self.max
+        return self.max
+
+    def as_dict(self) -> dict[str, Any]:
+        """Return the histogram for diagnostics."""
+        bounds = [f"<={bound}" for bound in self.buckets] + [f">{self.buckets[-1]}"]
+        return {
+            "count": self.count,
+            "mean_ms": None if self.mean is None else round(self.mean, 3),
+            "max_ms": round(self.max, 3),
+            "p50_ms": self.percentile(50),
+            "p99_ms": self.percentile(99),
+            "buckets": dict(zip(bounds, self.counts)),
+        }
+
+
+@dataclass
+class ArveeMetrics:
+    """Counters for one Arvee entry."""
+
+    events_received: int = 0
+    events_dropped: int = 0
+    updates: int = 0
+    below_threshold: int = 0
+    safe_zone_hits: int = 0
+    route_hits: int = 0
+    override_hits: int = 0
+    border_holds: int = 0
+    lookups: int = 0
+    config_updates: int = 0
+    fix_to_config: Histogram = field(default_factory=Histogram)
+
+    def as_dict(self) -> dict[str, Any]:
+        """Return the metrics for diagnostics."""
+        return {
+            "events_received": self.events_received,
+            "events_dropped": self.events_dropped,
+            "updates": self.updates,
+            "below_threshold": self.below_threshold,
+            "safe_zone_hits": self.safe_zone_hits,
+            "route_hits": self.route_hits,
+            "override_hits": self.override_hits,
+            "border_holds": self.border_holds,
+            "lookups": self.lookups,
+            "config_updates": self.config_updates,
+            "fix_to_config": self.fix_to_config.as_dict(),
+        }
@@ -0,0 +1,221 @@
+"""User-defined timezone overrides for Arvee.
+
+Some campgrounds and marinas near a border keep the neighbouring zone's
+time. An override is a circle or polygon around such a site with the
+timezone to use inside it, and what to do with Home Assistant's location
+while there.
+"""
+from __future__ import annotations
+
+from collections.abc import Iterable
+from dataclasses import dataclass, field
+import math
+from typing import Any
+
+from .boundary import MILES_PER_DEGREE
+from .geo import haversine_miles
+
+# Location behaviours: update it as usual, keep the one set before
+# arriving, or set it to the site's position
+LOCATION_FOLLOW = "follow"
+LOCATION_HOLD = "hold"
+LOCATION_PIN = "pin"
+LOCATION_BEHAVIOURS = (LOCATION_FOLLOW, LOCATION_HOLD, LOCATION_PIN)
+
+# Size of the cells indexing overrides by position
+_INDEX_CELL = 0.1  # degrees
+_INDEX_COLUMNS = round(360 / _INDEX_CELL)
+
+
+@dataclass(frozen=True, slots=True)
+class RegionOverride:
+    """Circle or polygon with a forced timezone."""
+
+    name: str
+    timezone: str
+    latitude: float  # center of a circle, or the vertex average of a polygon
+    longitude: float
+    radius: float | None = None  # miles, for circles
+    polygon: tuple[tuple[float, float], ...] = field(default=())  # (lat, lon)
+    location: str = LOCATION_FOLLOW
+
+    @classmethod
+    def circle(
+        cls,
+        name: str,
+        timezone: str,
+        lat: float,
+        lon: float,
+        radius: float,
+        location: str = LOCATION_FOLLOW,
+    ) -> RegionOverride:
+        """Return a circular override."""
+        if radius <= 0:
+            raise ValueError("An override circle needs a positive radius")
+        return cls(name, timezone, lat, lon, radius, (), location)
+
+    @classmethod
+    def from_polygon(
+        cls,
+        name: str,
+        timezone: str,
+        points: Iterable[tuple[float, float]],
+        location: str = LOCATION_FOLLOW,
+    ) -> RegionOverride:
+        """Return a polygon override, centered on its vertex average."""
+        polygon = tuple((float(lat), float(lon)) for lat, lon in points)
+        if len(polygon) > 1 and polygon[0] == polygon[-1]:
+            polygon = polygon[:-1]
+        if len(polygon) < 3:
+            raise ValueError("An override polygon needs at least three points")
+        return cls(
+            name,
+            timezone,
+            sum(lat for lat, _ in polygon) / len(polygon),
+            sum(lon for _, lon in polygon) / len(polygon),
+            None,
+            polygon,
+            location,
+        )
+
+    @classmethod
+    def from_dict(cls, data: dict[str, Any]) -> RegionOverride:
+        """Restore an override from its stored form."""
+        location = data.get("location", LOCATION_FOLLOW)
+        if location not in LOCATION_BEHAVIOURS:
+            raise ValueError(f"Unknown location behaviour {location}")
+        if data.get("polygon"):
+            return cls.from_polygon(
+                data["name"], data["timezone"], data["polygon"], location
+            )
+        return cls.circle(
+            data["name"],
+            data["timezone"],
+            data["latitude"],
+            data["longitude"],
+            data["radius"],
+            location,
+        )
+
+    def as_dict(self) -> dict[str, Any]:
+        """Return the override in its stored form."""
+        if self.polygon:
+            shape: dict[str, Any] = {"polygon": [list(point) for point in self.polygon]}
+        else:
+            shape = {
+                "latitude": self.latitude,
+                "longitude": self.longitude,
+                "radius": self.radius,
+            }
+        return {
+            "name": self.name,
+            "timezone": self.timezone,
+            "location": self.location,
+            **shape,
+        }
+
+    @property
+    def area(self) -> float:
+        """Return the area in square miles, to prefer the smaller of two matches."""
+        if not self.polygon:
+            return math.pi * self.radius**2
+        kx = math.cos(math.radians(self.latitude)) * MILES_PER_DEGREE
+        total = 0.0
+        for (lat0, lon0), (lat1, lon1) in zip(
+            self.polygon, self.polygon[1:] + self.polygon[:1]
+        ):
+            total += (lon0 * kx) * (lat1 * MILES_PER_DEGREE) - (lon1 * kx) * (
+                lat0 * MILES_PER_DEGREE
+            )
+        return abs(total) / 2
+
+    def bounds(self) -> tuple[float, float, float, float]:
+        """Return the south, west, north and east edges of the override."""
+        if self.polygon:
+            lats = [lat for lat, _ in self.polygon]
+            lons = [lon for _, lon in self.polygon]
+            return min(lats), min(lons), max(lats), max(lons)
+        margin_lat = self.radius / MILES_PER_DEGREE
+        widest = min(abs(self.latitude) + margin_lat, 89.0)
+        margin_lon = margin_lat / math.cos(math.radians(widest))
+        return (
+            self.latitude - margin_lat,
+            self.longitude - margin_lon,
+            self.latitude + margin_lat,
+            self.longitude + margin_lon,
+        )
+
+    def contains(self, lat: float, lon: float) -> bool:
+        """Return True if a coordinate is inside the override."""
+        if not self.polygon:
+            return haversine_miles(self.latitude, self.longitude, lat, lon) <= self.radius
+        inside = False
+        lat0, lon0 = self.polygon[-1]
+        for lat1, lon1 in self.polygon:
+            if (lat0 > lat) != (lat1 > lat) and lon < lon0 + (lat - lat0) * (
+                lon1 - lon0
+            ) / (lat1 - lat0):
+                inside = not inside
+            lat0, lon0 = lat1, lon1
+        return inside
+
+
+class OverrideIndex:
+    """Overrides indexed by grid cell.
+
+    Each override is listed under the cells its bounds cover, so checking
+    a fix reads one cell however many overrides are saved. Setting or
+    removing an override only touches its own cells.
+    """
+
+    def __init__(self, overrides: Iterable[RegionOverride] = ()) -> None:
+        """Initialize the index."""
+        self.overrides: dict[str, RegionOverride] = {}
+        self._cells: dict[tuple[int, int], list[str]] = {}
+        for override in overrides:
+            self.set(override)
+
+    def __len__(self) -> int:
+        """Return the number of overrides."""
+        return len(self.overrides)
+
+    def set(self, override: RegionOverride) -> None:
+        """Add an override, replacing any with the same name."""
+        self.remove(override.name)
+        self.overrides[override.name] = override
+        for cell in _cells(override):
+            self._cells.setdefault(cell, []).append(override.name)
+
+    def remove(self, name: str) -> bool:
+        """Remove an override, returning False if there's none by that name."""
+        if (override := self.overrides.pop(name, None)) is None:
+            return False
+        for cell in _cells(override):
+            names = self._cells[cell]
+            names.remove(name)
+            if not names:
+                del self._cells[cell]
+        return True
+
+    def match(self, lat: float, lon: float) -> RegionOverride | None:
+        """Return the smallest override containing a coordinate."""
+        row = math.floor(lat / _INDEX_CELL)
+        col = math.floor(lon / _INDEX_CELL) % _INDEX_COLUMNS
+        best: RegionOverride | None = None
+        for name in self._cells.get((row, col), ()):
+            override = self.overrides[name]
+            if override.contains(lat, lon) and (best is None or override.area < best.area):
+                best = override
+        return best
+
+    def as_dict(self) -> dict[str, Any]:
+        """Return the size of the index for diagnostics."""
+        return {"overrides": len(self.overrides), "cells": len(self._cells)}
+
+
+def _cells(override: RegionOverride) -> Iterable[tuple[int, int]]:
+    """Return the index cells an override's bounds cover."""
+    south, west, north, east = override.bounds()
+    for row in range(math.floor(south / _INDEX_CELL), math.floor(north / _INDEX_CELL) + 1):
+        for col in range(math.floor(west / _INDEX_CELL), math.floor(east / _INDEX_CELL) + 1):
+            yield row, col % _INDEX_COLUMNS
@@ -0,0 +1,191 @@
+"""Location update pipeline for Arvee.
+
+Live updates and simulations run each fix through the same steps here.
+What differs between them is passed in: the timezone lookups, which
+block in a simulation, and the writer that applies a decision to Home
+Assistant's configuration, or only records it.
+"""
+from __future__ import annotations
+
+from collections.abc import Awaitable, Callable
+import logging
+from typing import Any
+
+from .boundary import SafeZone
+from .gate import BORDER_HYSTERESIS, BorderCrossing, MovementGate
+from .metrics import ArveeMetrics
+from .overrides import LOCATION_HOLD, LOCATION_PIN, OverrideIndex, RegionOverride
+from .route import Route
+from .worker import LookupSuperseded
+
+_LOGGER = logging.getLogger(__name__)
+
+# What happened to each fix
+RESULT_BELOW_THRESHOLD = "below_threshold"
+RESULT_OVERRIDE = "override"
+RESULT_SAFE_ZONE = "safe_zone"
+RESULT_ROUTE = "route"
+RESULT_LOOKUP = "lookup"
+RESULT_BORDER_HOLD = "border_hold"
+
+# Results of fixes that became the last accepted position
+ACCEPTED_RESULTS = (RESULT_OVERRIDE, RESULT_SAFE_ZONE, RESULT_ROUTE, RESULT_LOOKUP)
+
+Lookup = Callable[[float, float], Awaitable[str | None]]
+SafeZoneLookup = Callable[[float, float, str], Awaitable[SafeZone | None]]
+# Takes the time the fix arrived, the location to write and, for a
+# timezone change, the new timezone
+ConfigWriter = Callable[[float, tuple[float, float] | None, str | None], Awaitable[None]]
+
+
+async def async_process_fix(
+    data: dict[str, Any],
+    received: float,
+    time_zone: str | None,
+    lookup: Lookup,
+    safe_zone_lookup: SafeZoneLookup,
+    write: ConfigWriter,
+    route: Route | None = None,
+    overrides: OverrideIndex | None = None,
+) -> str | None:
+    """Run the best current fix through the location update pipeline.
+
+    data holds the vehicle's fix selector, movement gate, metrics and last
+    accepted position, laid out as an entry's data. time_zone is the one
+    Home Assistant is configured with. A timezone change is passed to the
+    writer right away; a location without one is left to its write policy.
+
+    Returns what was done with the fix, or None without one.
+    """
+    metrics: ArveeMetrics = data["metrics"]
+    metrics.updates += 1
+
+    # Get the best current fix
+    if (fix := data["selector"].current()) is None:
+        _LOGGER.debug("No GPS source has a usable fix")
+        return None
+    new_lat = fix.latitude
+    new_lon = fix.longitude
+
+    # Place the fix on the planned route, if there is one and it's on it
+    position = None
+    if route is not None:
+        position = route.locate(new_lat, new_lon, data["route_distance"])
+        data["route_distance"] = position.distance if position else None
+
+    # Sites the user has given their own timezone win over everything else
+    override: RegionOverride | None = None
+    if overrides is not None:
+        override = overrides.match(new_lat, new_lon)
+
+    # Check if we've moved enough. Passing or nearing a transition along
+    # the route, entering or leaving an override, or staying past a held
+    # border crossing can't wait for the threshold.
+    gate: MovementGate = data["gate"]
+    gate.observe(new_lat, new_lon, received)
+    crossing: BorderCrossing | None = data["border_crossing"]
+    if (
+        not gate.accept(new_lat, new_lon)
+        and override == data["override"]
+        and (position is None or position.timezone == data["timezone"])
+        and (crossing is None or not crossing.settled(received))
+    ):
+        metrics.below_threshold += 1
+        _LOGGER.debug(
+            "Movement is below the threshold of %.2f miles", gate.threshold
+        )
+        return RESULT_BELOW_THRESHOLD
+
+    # Skip the lookup while we're still inside the last safe zone
+    safe_zone = data.get("safe_zone")
+    if override is not None:
+        metrics.override_hits += 1
+        result = RESULT_OVERRIDE
+        timezone = override.timezone
+        # Look the timezone up afresh once we leave
+        data["safe_zone"] = None
+        gate.set_safe_zone(None)
+    elif crossing is None and gate.in_safe_zone(new_lat, new_lon):
+        metrics.safe_zone_hits += 1
+        result = RESULT_SAFE_ZONE
+        timezone = safe_zone.timezone
+    elif position is not None and position.timezone is not None:
+        metrics.route_hits += 1
+        result = RESULT_ROUTE
+        timezone = position.timezone
+        # The route answers until the fix nears a transition or leaves it
+        data["safe_zone"] = None
+        gate.set_safe_zone(None)
+    else:
+        metrics.lookups += 1
+        result = RESULT_LOOKUP
+        try:
+            timezone = await lookup(new_lat, new_lon)
+            if timezone is not None:
+                safe_zone = await safe_zone_lookup(new_lat, new_lon, timezone)
+        except LookupSuperseded:
+            # A newer fix is already on its way
+            _LOGGER.debug("Lookup for %s, %s was superseded", new_lat, new_lon)
+            return None
+
+        if timezone is not None:
+            # Don't flip timezones while driving along a border. The change
+            # is held until the vehicle is clear of where it first crossed,
+            # or has stayed past the border a while.
+            if (
+                timezone != time_zone
+                and safe_zone is not None
+                and safe_zone.radius < BORDER_HYSTERESIS
+            ):
+                if crossing is None or crossing.timezone != timezone:
+                    crossing = BorderCrossing(new_lat, new_lon, timezone, received)
+                    data["border_crossing"] = crossing
+                if not crossing.passed(new_lat, new_lon, received):
+                    metrics.border_holds += 1
+                    _LOGGER.debug(
+                        "Holding the change to %s until %.2f miles past the border",
+                        timezone,
+                        BORDER_HYSTERESIS,
+                    )
+                    # Measure movement from the held fix, so jitter while
+                    # parked isn't looked up again, and open the gate once
+                    # the vehicle is clear of the crossing
+                    gate.set_anchor(new_lat, new_lon)
+                    data["safe_zone"] = None
+                    gate.set_safe_zone(crossing.zone)
+                    return RESULT_BORDER_HOLD
+
+            data["safe_zone"] = safe_zone
+            gate.set_safe_zone(safe_zone)
+
+    # Update stored position
+    data["last_lat"] = new_lat
+    data["last_lon"] = new_lon
+    gate.set_anchor(new_lat, new_lon)
+    data["override"] = override
+    data["border_crossing"] = None
+    if timezone is not None:
+        data["timezone"] = timezone
+
+    # An override may keep Home Assistant's location where it was or pin
+    # it to the site
+    location: tuple[float, float] | None = (new_lat, new_lon)
+    if override is not None and override.location == LOCATION_HOLD:
+        location = None
+    elif override is not None and override.location == LOCATION_PIN:
+        location = (override.latitude, override.longitude)
+
+    if timezone is None:
+        _LOGGER.warning(
+            "Could not determine timezone for coordinates: %s, %s",
+            new_lat,
+            new_lon,
+        )
+    elif timezone != time_zone:
+        # Timezone changes are pushed right away, along with the location
+        await write(received, location, timezone)
+        return result
+
+    # Location-only changes are batched under their own policy
+    await write(received, location, None)
+    return result
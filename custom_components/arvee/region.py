@@ -0,0 +1,24 @@
+"""Offline country and region lookups for Arvee.
+
+Every timezone on land lies in exactly one country, so the country is
+read from a small bundled table once the timezone is known, with no
+lookup of its own. States and provinces need boundaries, which are read
+from a file converted with ``script/convert_regions.py`` in the same
+memory-mapped format as the timezone data.
+"""
+from __future__ import annotations
+
+import json
+import os
+
+COUNTRIES_FILE = os.path.join(os.path.dirname(__file__), "countries.json")
+
+
+def load_countries(path: str = COUNTRIES_FILE) -> dict[str, tuple[str, str]]:
+    """Return the country code and name of each timezone in the table."""
+    with open(path, encoding="utf-8") as file:
+        table = json.load(file)
+    names = table["countries"]
+    return {
+        zone: (code, names.get(code, code)) for zone, code in table["zones"].items()
+    }
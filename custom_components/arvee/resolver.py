@@ -0,0 +1,613 @@
+"""Timezone resolution for Arvee."""
+from __future__ import annotations
+
+from array import array
+import asyncio
+from collections import OrderedDict
+from collections.abc import Callable, Hashable
+from functools import lru_cache
+import logging
+import math
+import time
+from typing import Any
+
+from homeassistant.core import HomeAssistant, callback
+from homeassistant.helpers.storage import Store
+
+from .boundary import SafeZone, parse_rings, safe_radius
+from .const import (
+    DEFAULT_CACHE_CELL_SIZE,
+    DEFAULT_CACHE_SIZE,
+    GRID_STORAGE_KEY,
+    STORAGE_VERSION,
+)
+from .grid import WORLD, GridBuilder, TimezoneGrid, rings_cross_box, tzfpy_version
+from .mapped import MappedTimezoneData, resident_size
+from .metrics import Histogram
+from .region import load_countries
+from .route import Route
+from .worker import LookupWorker
+
+_LOGGER = logging.getLogger(__name__)
+
+# tzfpy is imported, and its polygon data loaded, by _load_tzfpy in the
+# executor once Arvee starts tracking. None means it hasn't been tried yet.
+TZFPY_AVAILABLE: bool | None = None
+get_tz: Callable[[float, float], str | None] | None = None
+get_tz_polygon_geojson: Callable[[str], str] | None = None
+get_tzs: Callable[[float, float], list[str]] | None = None
+timezone_names: Callable[[], list[str]] | None = None
+
+# Cache marker for cells that a timezone border crosses
+BORDER = ""
+
+_MISSING: Any = object()
+
+# How often the resident size of mapped timezone data is measured again
+RESIDENT_INTERVAL = 300  # seconds
+
+
+class TimezoneCache:
+    """Bounded LRU cache of timezones keyed by grid cell."""
+
+    def __init__(self, cell_size: float, max_size: int) -> None:
+        """Initialize the cache."""
+        self.cell_size = cell_size
+        self.max_size = max_size
+        self.hits = 0
+        self.misses = 0
+        self._cells: OrderedDict[tuple[int, int], str] = OrderedDict()
+
+    def __len__(self) -> int:
+        """Return the number of cached cells."""
+        return len(self._cells)
+
+    def cell(self, lat: float, lon: float) -> tuple[int, int]:
+        """Return the grid cell containing a coordinate."""
+        return (
+            math.floor(lat / self.cell_size),
+            math.floor(lon / self.cell_size),
+        )
+
+    def get(self, cell: tuple[int, int]) -> str | None:
+        """Return the cached value for a cell, or None on a miss."""
+        value = self._cells.get(cell, _MISSING)
+        if value is _MISSING:
+            self.misses += 1
+            return None
+        self.hits += 1
+        self._cells.move_to_end(cell)
+        return value
+
+    def put(self, cell: tuple[int, int], value: str) -> None:
+        """Cache the value for a cell, evicting the least recently used."""
+        self._cells[cell] = value
+        self._cells.move_to_end(cell)
+        while len(self._cells) > self.max_size:
+            self._cells.popitem(last=False)
+
+    def configure(self, cell_size: float, max_size: int) -> None:
+        """Change the cache geometry, dropping entries if the grid changed."""
+        if cell_size != self.cell_size:
+            self._cells.clear()
+        self.cell_size = cell_size
+        self.max_size = max_size
+        while len(self._cells) > self.max_size:
+            self._cells.popitem(last=False)
+
+    def clear(self) -> None:
+        """Drop all cached cells."""
+        self._cells.clear()
+
+
+class TimezoneResolver:
+    """Resolve coordinates to timezones through a spatial cache.
+
+    Coordinates in cells of the precomputed grid that lie inside one zone
+    are answered right away. Everything else is looked up on a dedicated
+    worker thread, so lookups don't queue behind other integrations' jobs
+    in Home Assistant's shared executor.
+    """
+
+    def __init__(
+        self,
+        hass: HomeAssistant,
+        cell_size: float = DEFAULT_CACHE_CELL_SIZE,
+        max_size: int = DEFAULT_CACHE_SIZE,
+    ) -> None:
+        """Initialize the resolver."""
+        self.hass = hass
+        self.cache = TimezoneCache(cell_size, max_size)
+        self.lookups = 0
+        self.lookup_time = Histogram()
+        self.boundary_time = Histogram()
+        self.load_time: float | None = None
+        self.data_file: str | None = None
+        self.mapped: MappedTimezoneData | None = None
+        self.data_resident: int | None = None
+        # The lookup of the backend in use, tzfpy unless a data file is mapped
+        self.backend: str | None = None
+        self._get_tz: Callable[[float, float], str | None] = _tzfpy_get_tz
+        self._resident_measured = 0.0
+        self.countries: dict[str, tuple[str, str]] = {}
+        self.region_file: str | None = None
+        self.regions: MappedTimezoneData | None = None
+        self.region_cache = TimezoneCache(cell_size, max_size)
+        self.region_lookups = 0
+        self.worker = LookupWorker(hass)
+        self.grid: TimezoneGrid | None = None
+        self.grid_bounds = WORLD
+        self.grid_hits = 0
+        self.grid_build_time: float | None = None
+        self._grid_resolution = 0.0
+        self._grid_task: asyncio.Task[None] | None = None
+        self._warmup: asyncio.Future[bool] | None = None
+
+    @property
+    def available(self) -> bool | None:
+        """Return whether lookups can be performed, or None while loading."""
+        if self.backend is not None:
+            return True
+        return TZFPY_AVAILABLE
+
+    @callback
+    def configure_cache(self, cell_size: float, max_size: int) -> None:
+        """Change the geometry of the timezone and region caches."""
+        self.cache.configure(cell_size, max_size)
+        self.region_cache.configure(cell_size, max_size)
+
+    def country(self, timezone: str) -> tuple[str, str] | None:
+        """Return the code and name of the country a timezone is in."""
+        return self.countries.get(timezone)
+
+    @callback
+    def async_start_warmup(self) -> None:
+        """Start loading tzfpy on the worker if it isn't already."""
+        if self._warmup is None:
+            self._warmup = self.hass.async_create_task(
+                self.worker.async_run(self._warm_up)
+            )
+
+    async def async_ready(self) -> bool:
+        """Wait for tzfpy to load and return True if it's usable."""
+        self.async_start_warmup()
+        return await asyncio.shield(self._warmup)
+
+    @callback
+    def async_start_grid(self, resolution: float) -> None:
+        """Load or build the precomputed grid in the background.
+
+        A resolution of 0 drops the grid.
+        """
+        if resolution == self._grid_resolution:
+            return
+        self._grid_resolution = resolution
+        self.grid = None
+        if self._grid_task is not None:
+            self._grid_task.cancel()
+            self._grid_task = None
+        if resolution:
+            self._grid_task = self.hass.async_create_background_task(
+                self._async_load_grid(resolution), "arvee timezone grid"
+            )
+
+    async def _async_load_grid(self, resolution: float) -> None:
+        """Load the stored grid, building and storing it if it's out of date."""
+        if not await self.async_ready() or None in (
+            get_tz_polygon_geojson,
+            get_tzs,
+            timezone_names,
+        ):
+            _LOGGER.debug("tzfpy can't provide polygons, not building a grid")
+            return
+
+        store = Store(self.hass, STORAGE_VERSION, GRID_STORAGE_KEY)
+        source = await self.worker.async_run(tzfpy_version)
+        grid = None
+        if stored := await store.async_load():
+            try:
+                grid = await self.worker.async_run(TimezoneGrid.from_dict, stored)
+            except (KeyError, TypeError, ValueError) as err:
+                _LOGGER.debug("Discarding stored timezone grid: %s", err)
+
+        if grid is None or (grid.source, grid.resolution, grid.bounds) != (
+            source,
+            resolution,
+            tuple(self.grid_bounds),
+        ):
+            start = time.monotonic()
+            builder = GridBuilder(
+                resolution,
+                timezone_names(),
+                _polygon_rings,
+                get_tzs,
+                self.grid_bounds,
+                source,
+            )
+            # One step per job lets lookups in between
+            while not await self.worker.async_run(builder.step):
+                pass
+            grid = builder.grid
+            self.grid_build_time = time.monotonic() - start
+            _LOGGER.debug("Built timezone grid in %.1fs", self.grid_build_time)
+            await store.async_save(await self.worker.async_run(grid.as_dict))
+
+        self.grid = grid
+
+    def _warm_up(self) -> bool:
+        """Load the timezone data and record how long it took."""
+        start = time.monotonic()
+        try:
+            self.countries = load_countries()
+        except (OSError, ValueError, KeyError) as err:
+            _LOGGER.error("Could not read the country table: %s", err)
+        if self.region_file is not None:
+            self._open_region_file()
+        if self.data_file is not None and self._open_data_file():
+            available = True
+        else:
+            before = resident_size()
+            available = _load_tzfpy()
+            if before is not None and (after := resident_size()) is not None:
+                self.data_resident = after - before
+            if available:
+                self.backend = "tzfpy"
+        self.load_time = time.monotonic() - start
+        _LOGGER.debug("Timezone data warm-up finished in %.3fs", self.load_time)
+        return available
+
+    def _open_data_file(self) -> bool:
+        """Map a converted timezone data file in place of tzfpy."""
+        try:
+            mapped = MappedTimezoneData(self.data_file)
+        except (OSError, ValueError, KeyError) as err:
+            _LOGGER.error(
+                "Could not open timezone data %s, using tzfpy instead: %s",
+                self.data_file,
+                err,
+            )
+            return False
+
+        self.mapped = mapped
+        self.backend = "mapped"
+        self._get_tz = mapped.get_tz
+        self._update_resident(mapped)
+        return True
+
+    def _open_region_file(self) -> None:
+        """Map a converted region boundary file."""
+        try:
+            self.regions = MappedTimezoneData(self.region_file)
+        except (OSError, ValueError, KeyError) as err:
+            _LOGGER.error(
+                "Could not open region data %s, regions won't be looked up: %s",
+                self.region_file,
+                err,
+            )
+
+    async def async_get_timezone(
+        self, lat: float, lon: float, key: Hashable | None = None
+    ) -> str | None:
+        """Return the timezone for a coordinate.
+
+        A lookup still queued when another is made with the same key is
+        abandoned with LookupSuperseded.
+        """
+        if (grid := self.grid) is not None and (
+            grid_timezone := grid.lookup(lat, lon)
+        ) is not None:
+            if grid_timezone:
+                self.grid_hits += 1
+                return grid_timezone
+            # Border cells of the grid are always looked up exactly
+            self.lookups += 1
+            return await self._async_timed_job(
+                self.lookup_time, self._get_tz, lon, lat, key=key
+            )
+
+        cell = self.cache.cell(lat, lon)
+        cached = self.cache.get(cell)
+
+        if cached:
+            return cached
+
+        self.lookups += 1
+        if cached == BORDER:
+            return await self._async_timed_job(
+                self.lookup_time, self._get_tz, lon, lat, key=key
+            )
+
+        timezone, cell_timezone = await self._async_timed_job(
+            self.lookup_time, self._lookup_cell, lat, lon, cell, key=key
+        )
+        self.cache.put(cell, cell_timezone)
+        return timezone
+
+    async def async_get_region(
+        self, lat: float, lon: float, key: Hashable | None = None
+    ) -> str | None:
+        """Return the state or province containing a coordinate.
+
+        Returns None without a region file, or outside every region. Regions
+        are cached by cell like timezones and looked up on the same worker.
+        """
+        if (regions := self.regions) is None:
+            return None
+
+        cell = self.region_cache.cell(lat, lon)
+        cached = self.region_cache.get(cell)
+        if cached:
+            return cached
+
+        self.region_lookups += 1
+        if cached == BORDER:
+            return await self._async_timed_job(
+                self.lookup_time, regions.get_tz, lon, lat, key=key
+            )
+
+        region, cell_region = await self._async_timed_job(
+            self.lookup_time,
+            _classify_mapped_cell,
+            regions,
+            lat,
+            lon,
+            cell,
+            self.region_cache.cell_size,
+            key=key,
+        )
+        self.region_cache.put(cell, cell_region)
+        return region
+
+    async def async_get_timezones(
+        self, coordinates: list[tuple[float, float]]
+    ) -> list[str | None]:
+        """Return the timezones for many coordinates with one worker job.
+
+        Duplicate coordinates are looked up once, and grid and cached cells
+        are answered without a lookup.
+        """
+        grid = self.grid
+        results: dict[tuple[float, float], str | None] = {}
+        misses = []
+        for lat, lon in dict.fromkeys(coordinates):
+            if grid is not None and (grid_timezone := grid.lookup(lat, lon)):
+                self.grid_hits += 1
+                results[(lat, lon)] = grid_timezone
+            elif cached := self.cache.get(self.cache.cell(lat, lon)):
+                results[(lat, lon)] = cached
+            else:
+                misses.append((lat, lon))
+
+        if misses:
+            self.lookups += 1
+            timezones = await self._async_timed_job(
+                self.lookup_time, _lookup_many, self._get_tz, misses
+            )
+            results.update(zip(misses, timezones))
+
+        return [results[coordinate] for coordinate in coordinates]
+
+    async def async_get_safe_zone(
+        self, lat: float, lon: float, timezone: str, key: Hashable | None = None
+    ) -> SafeZone | None:
+        """Return the disc around a fix that stays inside its timezone."""
+        if self.mapped is None and get_tz_polygon_geojson is None:
+            return None
+
+        radius = await self._async_timed_job(
+            self.boundary_time, self._safe_radius, lat, lon, timezone, key=key
+        )
+        if not radius:
+            return None
+        return SafeZone(lat, lon, radius, timezone)
+
+    async def async_build_route(self, points: list[tuple[float, float]]) -> Route:
+        """Find the timezone transitions along a route on the worker."""
+        self.lookups += 1
+        return await self.worker.async_run(Route.build, points, self._get_tz)
+
+    async def _async_timed_job(
+        self,
+        histogram: Histogram,
+        target: Callable[..., Any],
+        *args: Any,
+        key: Hashable | None = None,
+    ) -> Any:
+        """Run a job on the worker and record how long it took."""
+        start = time.perf_counter()
+        try:
+            return await self.worker.async_run(target, *args, key=key)
+        finally:
+            histogram.add(time.perf_counter() - start)
+
+    def as_dict(self) -> dict[str, Any]:
+        """Return resolver state and statistics for diagnostics."""
+        return {
+            "tzfpy_available": TZFPY_AVAILABLE,
+            "available": self.available,
+            "load_time": self.load_time,
+            "data": {
+                "backend": self.backend,
+                "file": None if self.mapped is None else self.mapped.path,
+                "file_bytes": None if self.mapped is None else self.mapped.nbytes,
+                "resident_bytes": self.data_resident,
+            },
+            "lookups": self.lookups,
+            "lookup_time": self.lookup_time.as_dict(),
+            "boundary_time": self.boundary_time.as_dict(),
+            "cache": {
+                "cell_size": self.cache.cell_size,
+                "max_size": self.cache.max_size,
+                "cells": len(self.cache),
+                "hits": self.cache.hits,
+                "misses": self.cache.misses,
+            },
+            "grid": None
+            if (grid := self.grid) is None
+            else {
+                "resolution": grid.resolution,
+                "bounds": list(grid.bounds),
+                "source": grid.source,
+                "zones": len(grid.zones),
+                "cells": len(grid.cells),
+                "border_cells": grid.border_cells,
+                "bytes": grid.nbytes,
+                "hits": self.grid_hits,
+                "build_time": self.grid_build_time,
+            },
+            "regions": {
+                "countries": len(self.countries),
+                "file": None if self.regions is None else self.regions.path,
+                "regions": None if self.regions is None else len(self.regions.zones),
+                "lookups": self.region_lookups,
+                "cells": len(self.region_cache),
+                "hits": self.region_cache.hits,
+            },
+            "worker": self.worker.as_dict(),
+        }
+
+    def _safe_radius(self, lat: float, lon: float, timezone: str) -> float | None:
+        """Compute the distance from a fix to its timezone's boundary."""
+        if (mapped := self.mapped) is not None:
+            radius = mapped.safe_radius(lat, lon, timezone)
+            # The pages read for the boundary are the ones that stay resident,
+            # but reading smaps is too slow to repeat for every fix
+            if time.monotonic() - self._resident_measured >= RESIDENT_INTERVAL:
+                self._update_resident(mapped)
+            return radius
+
+        try:
+            rings = _zone_rings(timezone)
+        except (ValueError, KeyError, TypeError) as err:
+            _LOGGER.debug("Could not load boundary for %s: %s", timezone, err)
+            return None
+        return safe_radius(rings, lat, lon)
+
+    def _update_resident(self, mapped: MappedTimezoneData) -> None:
+        """Measure how much of the mapped timezone data is resident."""
+        self.data_resident = mapped.update_resident()
+        self._resident_measured = time.monotonic()
+
+    def _lookup_cell(
+        self, lat: float, lon: float, cell: tuple[int, int]
+    ) -> tuple[str | None, str]:
+        """Look up a coordinate and classify the cell around it.
+
+        Returns the value at the coordinate and the value shared by the
+        whole cell, or BORDER unless the polygon edges show that no border
+        crosses the cell and the coordinate and every corner are in that
+        zone alone. Without polygons only exact answers are kept.
+        """
+        if (mapped := self.mapped) is not None:
+            return _classify_mapped_cell(mapped, lat, lon, cell, self.cache.cell_size)
+
+        value = self._get_tz(lon, lat)
+        if value is None or get_tz_polygon_geojson is None:
+            return value, BORDER
+
+        try:
+            rings = _zone_rings(value)
+        except (ValueError, KeyError, TypeError) as err:
+            _LOGGER.debug("Could not load boundary for %s: %s", value, err)
+            return value, BORDER
+        box = _cell_box(cell, self.cache.cell_size)
+        if rings_cross_box(rings, *box):
+            return value, BORDER
+        # Another zone reaching into the cell, or overlapping this one, is
+        # found at the corners. Overlaps are left for exact lookups, as in
+        # the grid.
+        south, west, north, east = box
+        for point_lat, point_lon in (
+            (lat, lon),
+            (south, west),
+            (south, east),
+            (north, west),
+            (north, east),
+        ):
+            if get_tzs is not None:
+                zones = get_tzs(point_lon, point_lat)
+            else:
+                zones = [self._get_tz(point_lon, point_lat)]
+            if zones != [value]:
+                return value, BORDER
+        return value, value
+
+
+def _classify_mapped_cell(
+    data: MappedTimezoneData,
+    lat: float,
+    lon: float,
+    cell: tuple[int, int],
+    size: float,
+) -> tuple[str | None, str]:
+    """Look up a coordinate in mapped data and classify the cell around it.
+
+    Returns the value at the coordinate and the value shared by the whole
+    cell, or BORDER if a border crosses any data cell it overlaps.
+    """
+    value = data.get_tz(lon, lat)
+    if value is None:
+        return None, BORDER
+    if data.zone_in_box(*_cell_box(cell, size)) != value:
+        return value, BORDER
+    return value, value
+
+
+def _cell_box(cell: tuple[int, int], size: float) -> tuple[float, float, float, float]:
+    """Return the south, west, north and east edges of a cache cell."""
+    return cell[0] * size, cell[1] * size, (cell[0] + 1) * size, (cell[1] + 1) * size
+
+
+def _load_tzfpy() -> bool:
+    """Import tzfpy and load its timezone data."""
+    global TZFPY_AVAILABLE, get_tz, get_tz_polygon_geojson, get_tzs, timezone_names
+
+    if TZFPY_AVAILABLE is not None:
+        return TZFPY_AVAILABLE
+
+    try:
+        import tzfpy
+    except ImportError:
+        TZFPY_AVAILABLE = False
+        _LOGGER.warning("tzfpy not available, timezone lookups will not work")
+        return False
+
+    # The first lookup loads the polygon data
+    try:
+        tzfpy.get_tz(0.0, 0.0)
+    except Exception:  # pylint: disable=broad-except
+        TZFPY_AVAILABLE = False
+        _LOGGER.exception("tzfpy failed to load, timezone lookups will not work")
+        return False
+
+    get_tz = tzfpy.get_tz
+    # Polygon access was added to tzfpy after get_tz
+    get_tz_polygon_geojson = getattr(tzfpy, "get_tz_polygon_geojson", None)
+    get_tzs = getattr(tzfpy, "get_tzs", None)
+    timezone_names = getattr(tzfpy, "timezonenames", None)
+    TZFPY_AVAILABLE = True
+    return True
+
+
+def _tzfpy_get_tz(lon: float, lat: float) -> str | None:
+    """Look up a coordinate with tzfpy, once it's loaded."""
+    return get_tz(lon, lat)
+
+
+def _lookup_many(
+    get_timezone: Callable[[float, float], str | None],
+    coordinates: list[tuple[float, float]],
+) -> list[str | None]:
+    """Look up the exact timezone of each coordinate."""
+    return [get_timezone(lon, lat) for lat, lon in coordinates]
+
+
+def _polygon_rings(timezone: str) -> list[array]:
+    """Return the boundary rings of a timezone without caching them."""
+    return parse_rings(get_tz_polygon_geojson(timezone))
+
+
+@lru_cache(maxsize=2)
+def _zone_rings(timezone: str) -> list[array]:
+    """Return the parsed boundary rings of a timezone."""
+    return parse_rings(get_tz_polygon_geojson(timezone))
@@ -0,0 +1,302 @@
+"""Planned routes for Arvee."""
+from __future__ import annotations
+
+from array import array
+from bisect import bisect_right
+from collections.abc import Callable, Sequence
+from dataclasses import dataclass
+import math
+import re
+from typing import Any
+
+from .boundary import MILES_PER_DEGREE
+from .geo import consecutive_miles
+
+# Spacing of the timezone lookups made along each leg of a route
+ROUTE_SAMPLE_SPACING = 0.25  # miles
+
+# Furthest a fix can be from the route and still be placed on it
+ROUTE_TOLERANCE = 0.25  # miles
+
+# Fixes closer than this to a transition along the route are looked up
+# exactly, as the border may cross the road at an angle
+TRANSITION_MARGIN = 1.0  # miles
+
+# Halvings of the sample interval holding a transition, to about 25 feet
+_BISECT_STEPS = 5
+
+# Size of the cells indexing route legs by position
+_INDEX_CELL = 0.05  # degrees
+_INDEX_COLUMNS = round(360 / _INDEX_CELL)
+
+# Track and route points of a GPX file, and the coordinates they carry.
+# Attributes are all that's needed, so the XML isn't parsed.
+_GPX_POINT = re.compile(r"<(?:[\w.-]+:)?(trkpt|rtept|wpt)\b([^>]*)>")
+_GPX_ATTRIBUTE = re.compile(r"\b(lat|lon)\s*=\s*[\"']\s*([^\"']*?)\s*[\"']")
+
+
+@dataclass(frozen=True, slots=True)
+class RouteTransition:
+    """Point where a route enters a new timezone."""
+
+    distance: float  # miles along the route
+    latitude: float
+    longitude: float
+    previous: str | None
+    timezone: str | None
+
+
+@dataclass(frozen=True, slots=True)
+class RoutePosition:
+    """Fix placed on a route."""
+
+    distance: float  # miles along the route
+    offset: float  # miles from the route
+    timezone: str | None  # None where the route can't answer for the fix
+
+
+class Route:
+    """Timezone transitions along a planned route.
+
+    The transitions are computed once, in bulk, when the route is loaded.
+    A fix near the route is then projected onto it, and unless it's close
+    to a transition its timezone is the one the route is in at that
+    point, with no lookup.
+    """
+
+    def __init__(
+        self,
+        points: Sequence[tuple[float, float]],
+        start_timezone: str | None,
+        transitions: list[RouteTransition],
+    ) -> None:
+        """Initialize the route."""
+        if len(points) < 2:
+            raise ValueError("A route needs at least two points")
+        self.latitudes = array("d", (lat for lat, _ in points))
+        self.longitudes = array("d", (lon for _, lon in points))
+        self.distances = array("d")
+        total = 0.0
+        for distance in consecutive_miles(self.latitudes, self.longitudes):
+            total += distance
+            self.distances.append(total)
+        self.transitions = transitions
+        self._transition_distances = [transition.distance for transition in transitions]
+        self._zones = [start_timezone] + [transition.timezone for transition in transitions]
+        self._index = self._build_index()
+
+    @property
+    def total_distance(self) -> float:
+        """Return the length of the route in miles."""
+        return self.distances[-1]
+
+    @classmethod
+    def build(
+        cls,
+        points: Sequence[tuple[float, float]],
+        get_tz: Callable[[float, float], str | None],
+    ) -> Route:
+        """Find the timezone transitions along a route.
+
+        Each leg is sampled every ROUTE_SAMPLE_SPACING miles, and a change
+        between two samples is narrowed down by bisection. This makes
+        lookups, so it's run off the event loop.
+        """
+        if len(points) < 2:
+            raise ValueError("A route needs at least two points")
+        lengths = consecutive_miles(
+            [lat for lat, _ in points], [lon for _, lon in points]
+        )
+        start_timezone = current = get_tz(points[0][1], points[0][0])
+        transitions: list[RouteTransition] = []
+        travelled = 0.0
+
+        for (lat0, lon0), (lat1, lon1), length in zip(points, points[1:], lengths[1:]):
+            dlat = lat1 - lat0
+            dlon = _wrap(lon1 - lon0)
+            samples = max(math.ceil(length / ROUTE_SAMPLE_SPACING), 1)
+            before = 0.0
+            for sample in range(1, samples + 1):
+                after = sample / samples
+                timezone = get_tz(_wrap(lon0 + after * dlon), lat0 + after * dlat)
+                if timezone == current:
+                    before = after
+                    continue
+                low, high = before, after
+                for _ in range(_BISECT_STEPS):
+                    middle = (low + high) / 2
+                    if get_tz(_wrap(lon0 + middle * dlon), lat0 + middle * dlat) == current:
+                        low = middle
+                    else:
+                        high = middle
+                transitions.append(
+                    RouteTransition(
+                        travelled + high * length,
+                        lat0 + high * dlat,
+                        _wrap(lon0 + high * dlon),
+                        current,
+                        timezone,
+                    )
+                )
+                current = timezone
+                before = after
+            travelled += length
+
+        return cls(points, start_timezone, transitions)
+
+    def timezone_at(self, distance: float) -> str | None:
+        """Return the timezone a distance along the route is in."""
+        return self._zones[bisect_right(self._transition_distances, distance)]
+
+    def next_transition(self, distance: float) -> RouteTransition | None:
+        """Return the first transition after a distance along the route."""
+        index = bisect_right(self._transition_distances, distance)
+        return self.transitions[index] if index < len(self.transitions) else None
+
+    def locate(
+        self, lat: float, lon: float, near: float | None = None
+    ) -> RoutePosition | None:
+        """Place a fix on the route, or return None if it's off the route.
+
+        Where the route passes the fix more than once, the pass nearest to
+        the previous position (near, in miles along the route) is used.
+        """
+        row = math.floor(lat / _INDEX_CELL)
+        col = math.floor(lon / _INDEX_CELL) % _INDEX_COLUMNS
+        if not (legs := self._index.get((row, col))):
+            return None
+
+        kx = math.cos(math.radians(lat)) * MILES_PER_DEGREE
+        best: tuple[float, float, float] | None = None
+        for leg in legs:
+            # Project onto the leg on a plane tangent at the fix
+            ax = _wrap(self.longitudes[leg] - lon) * kx
+            ay = (self.latitudes[leg] - lat) * MILES_PER_DEGREE
+            dx = _wrap(self.longitudes[leg + 1] - self.longitudes[leg]) * kx
+            dy = (self.latitudes[leg + 1] - self.latitudes[leg]) * MILES_PER_DEGREE
+            length_sq = dx * dx + dy * dy
+            t = 0.0
+            if length_sq:
+                t = min(max(-(ax * dx + ay * dy) / length_sq, 0.0), 1.0)
+            offset = math.hypot(ax + t * dx, ay + t * dy)
+            if offset > ROUTE_TOLERANCE:
+                continue
+            distance = self.distances[leg] + t * (
+                self.distances[leg + 1] - self.distances[leg]
+            )
+            rank = abs(distance - near) if near is not None else offset
+            if best is None or rank < best[0]:
+                best = (rank, distance, offset)
+
+        if best is None:
+            return None
+        _, distance, offset = best
+
+        timezone = self.timezone_at(distance)
+        index = bisect_right(self._transition_distances, distance)
+        for neighbour in (index - 1, index):
+            if (
+                0 <= neighbour < len(self._transition_distances)
+                and abs(self._transition_distances[neighbour] - distance)
+                < TRANSITION_MARGIN
+            ):
+                timezone = None
+        return RoutePosition(distance, offset, timezone)
+
+    def as_dict(self) -> dict[str, Any]:
+        """Return a summary of the route, without its coordinates."""
+        return {
+            "points": len(self.latitudes),
+            "total_distance": round(self.total_distance, 3),
+            "transitions": [
+                {
+                    "distance": round(transition.distance, 3),
+                    "from": transition.previous,
+                    "to": transition.timezone,
+                }
+                for transition in self.transitions
+            ],
+        }
+
+    def _build_index(self) -> dict[tuple[int, int], list[int]]:
+        """Index each leg under the cells within ROUTE_TOLERANCE of it.
+
+        Legs are split into pieces no longer than a cell in either
+        direction, so a long diagonal leg is indexed under the cells along
+        it rather than every cell of its bounding box.
+        """
+        index: dict[tuple[int, int], list[int]] = {}
+        margin_lat = ROUTE_TOLERANCE / MILES_PER_DEGREE
+        for leg in range(len(self.latitudes) - 1):
+            lat0 = self.latitudes[leg]
+            lon0 = self.longitudes[leg]
+            dlat = self.latitudes[leg + 1] - lat0
+            dlon = _wrap(self.longitudes[leg + 1] - lon0)
+            pieces = max(math.ceil(max(abs(dlat), abs(dlon)) / _INDEX_CELL), 1)
+            cells: set[tuple[int, int]] = set()
+            for piece in range(pieces):
+                start, end = piece / pieces, (piece + 1) / pieces
+                south, north = sorted((lat0 + start * dlat, lat0 + end * dlat))
+                west, east = sorted((lon0 + start * dlon, lon0 + end * dlon))
+                widest = min(max(abs(south), abs(north)) + margin_lat, 89.0)
+                margin_lon = margin_lat / math.cos(math.radians(widest))
+                row0 = math.floor((south - margin_lat) / _INDEX_CELL)
+                row1 = math.floor((north + margin_lat) / _INDEX_CELL)
+                col0 = math.floor((west - margin_lon) / _INDEX_CELL)
+                col1 = math.floor((east + margin_lon) / _INDEX_CELL)
+                for row in range(row0, row1 + 1):
+                    for col in range(col0, col1 + 1):
+                        cells.add((row, col % _INDEX_COLUMNS))
+            for cell in cells:
+                index.setdefault(cell, []).append(leg)
+        return index
+
+
+def parse_gpx(text: str) -> list[tuple[float, float]]:
+    """Return the track or route points of a GPX file.
+
+    Waypoints are used only when the file has neither.
+    """
+    found: dict[str, list[tuple[float, float]]] = {"trkpt": [], "rtept": [], "wpt": []}
+    for match in _GPX_POINT.finditer(text):
+        attributes = dict(_GPX_ATTRIBUTE.findall(match.group(2)))
+        try:
+            point = (float(attributes["lat"]), float(attributes["lon"]))
+        except (KeyError, ValueError) as err:
+            raise ValueError(f"GPX point without a valid position: {match.group(0)}") from err
+        found[match.group(1)].append(point)
+
+    points = found["trkpt"] or found["rtept"] or found["wpt"]
+    if not points:
+        raise ValueError("No track, route or waypoints in GPX data")
+    return points
+
+
+def decode_polyline(text: str, precision: int = 5) -> list[tuple[float, float]]:
+    """Decode an encoded polyline, as returned by most routing services."""
+    factor = 10**precision
+    points: list[tuple[float, float]] = []
+    values = [0, 0]
+    position = 0
+    while position < len(text):
+        for axis in (0, 1):
+            result = shift = 0
+            while True:
+                if position >= len(text):
+                    raise ValueError("Truncated polyline")
+                byte = ord(text[position]) - 63
+                position += 1
+                if not 0 <= byte < 64:
+                    raise ValueError("Invalid character in polyline")
+                result |= (byte & 0x1F) << shift
+                shift += 5
+                if byte < 0x20:
+                    break
+            values[axis] += ~(result >> 1) if result & 1 else result >> 1
+        points.append((values[0] / factor, values[1] / factor))
+    return points
+
+
+def _wrap(lon: float) -> float:
+    """Wrap a longitude, or a difference of them, into [-180, 180)."""
+    return (lon + 180) % 360 - 180
@@ -0,0 +1,82 @@
+"""Coalescing scheduler for Arvee location updates."""
+from __future__ import annotations
+
+import asyncio
+from collections.abc import Awaitable, Callable
+from contextlib import suppress
+import logging
+
+from homeassistant.core import HomeAssistant, callback
+
+_LOGGER = logging.getLogger(__name__)
+
+
+class LocationUpdateScheduler:
+    """Run location updates single-flight with at most one pending.
+
+    Requests that arrive within the settle window are merged, so a
+    latitude/longitude pair written back to back counts as one fix.
+    Requests that arrive while an update is running mark a single
+    follow-up run instead of spawning another task.
+    """
+
+    def __init__(
+        self,
+        hass: HomeAssistant,
+        update: Callable[[], Awaitable[None]],
+        settle: float,
+    ) -> None:
+        """Initialize the scheduler."""
+        self.hass = hass
+        self.settle = settle
+        self._update = update
+        self._pending = False
+        self._task: asyncio.Task | None = None
+
+    @property
+    def running(self) -> bool:
+        """Return True if an update is scheduled or in flight."""
+        return self._task is not None
+
+    @callback
+    def async_schedule(self) -> None:
+        """Request an update after the settle window."""
+        self._pending = True
+        if self._task is None:
+            self._task = self.hass.async_create_task(
+                self._async_run(self.settle), "arvee location update"
+            )
+
+    async def async_refresh(self) -> None:
+        """Request an update as soon as possible and wait for it."""
+        self._pending = True
+        if self._task is None:
+            self._task = self.hass.async_create_task(
+                self._async_run(0), "arvee location refresh"
+            )
+        await asyncio.shield(self._task)
+
+    async def async_shutdown(self) -> None:
+        """Drop any pending request and cancel the update in flight."""
+        self._pending = False
+        if (task := self._task) is None:
+            return
+        task.cancel()
+        with suppress(asyncio.CancelledError):
+            await task
+        self._task = None
+
+    async def _async_run(self, delay: float) -> None:
+        """Run updates until no request is pending."""
+        try:
+            while self._pending:
+                if delay:
+                    await asyncio.sleep(delay)
+                delay = self.settle
+                self._pending = False
+                try:
+                    await self._update()
+                except Exception:  # pylint: disable=broad-except
+                    _LOGGER.exception("Unexpected error processing location update")
+        finally:
+            self._task = None
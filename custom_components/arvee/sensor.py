@@ -0,0 +1,305 @@
+"""Sensors for Arvee."""
+from __future__ import annotations
+
+from collections.abc import Callable
+from dataclasses import dataclass
+from typing import Any
+
+from homeassistant.components.sensor import (
+    SensorDeviceClass,
+    SensorEntity,
+    SensorEntityDescription,
+    SensorStateClass,
+)
+from homeassistant.config_entries import ConfigEntry
+from homeassistant.const import EntityCategory, UnitOfInformation, UnitOfTime
+from homeassistant.core import HomeAssistant, callback
+from homeassistant.helpers.device_registry import DeviceEntryType, DeviceInfo
+from homeassistant.helpers.dispatcher import async_dispatcher_connect
+from homeassistant.helpers.entity_platform import AddEntitiesCallback
+from homeassistant.helpers.typing import StateType
+
+from .const import (
+    CONF_REGION_FILE,
+    DATA_RESOLVER,
+    DOMAIN,
+    SIGNAL_METRICS_UPDATED,
+    SIGNAL_REGION_UPDATED,
+)
+from .fleet import FleetTracker
+
+
+@dataclass(frozen=True, kw_only=True)
+class ArveeSensorEntityDescription(SensorEntityDescription):
+    """Describes an Arvee diagnostic sensor."""
+
+    value_fn: Callable[[dict[str, Any], Any], StateType]
+
+
+SENSORS: tuple[ArveeSensorEntityDescription, ...] = (
+    ArveeSensorEntityDescription(
+        key="events_received",
+        name="GPS events received",
+        state_class=SensorStateClass.TOTAL_INCREASING,
+        value_fn=lambda data, resolver: data["metrics"].events_received,
+    ),
+    ArveeSensorEntityDescription(
+        key="events_dropped",
+        name="GPS events dropped",
+        state_class=SensorStateClass.TOTAL_INCREASING,
+        value_fn=lambda data, resolver: data["metrics"].events_dropped,
+    ),
+    ArveeSensorEntityDescription(
+        key="below_threshold",
+        name="Fixes below threshold",
+        state_class=SensorStateClass.TOTAL_INCREASING,
+        value_fn=lambda data, resolver: data["metrics"].below_threshold,
+    ),
+    ArveeSensorEntityDescription(
+        key="lookups",
+        name="Timezone lookups",
+        state_class=SensorStateClass.TOTAL_INCREASING,
+        value_fn=lambda data, resolver: resolver.lookups if resolver else None,
+    ),
+    ArveeSensorEntityDescription(
+        key="lookup_time",
+        name="Timezone lookup time",
+        native_unit_of_measurement=UnitOfTime.MILLISECONDS,
+        state_class=SensorStateClass.MEASUREMENT,
+        suggested_display_precision=1,
+        value_fn=lambda data, resolver: resolver.lookup_time.mean if resolver else None,
+    ),
+    ArveeSensorEntityDescription(
+        key="lookup_wait",
+        name="Timezone lookup wait time",
+        native_unit_of_measurement=UnitOfTime.MILLISECONDS,
+        state_class=SensorStateClass.MEASUREMENT,
+        suggested_display_precision=1,
+        value_fn=lambda data, resolver: (
+            resolver.worker.wait_time.mean if resolver else None
+        ),
+    ),
+    ArveeSensorEntityDescription(
+        key="lookup_queue",
+        name="Timezone lookup queue peak",
+        state_class=SensorStateClass.MEASUREMENT,
+        value_fn=lambda data, resolver: resolver.worker.max_depth if resolver else None,
+    ),
+    ArveeSensorEntityDescription(
+        key="grid_hits",
+        name="Timezone grid hits",
+        state_class=SensorStateClass.TOTAL_INCREASING,
+        value_fn=lambda data, resolver: resolver.grid_hits if resolver else None,
+    ),
+    ArveeSensorEntityDescription(
+        key="cache_hits",
+        name="Timezone cache hits",
+        state_class=SensorStateClass.TOTAL_INCREASING,
+        value_fn=lambda data, resolver: resolver.cache.hits if resolver else None,
+    ),
+    ArveeSensorEntityDescription(
+        key="data_resident",
+        name="Timezone data resident size",
+        device_class=SensorDeviceClass.DATA_SIZE,
+        native_unit_of_measurement=UnitOfInformation.BYTES,
+        suggested_unit_of_measurement=UnitOfInformation.MEBIBYTES,
+        state_class=SensorStateClass.MEASUREMENT,
+        suggested_display_precision=1,
+        value_fn=lambda data, resolver: resolver.data_resident if resolver else None,
+    ),
+    ArveeSensorEntityDescription(
+        key="config_updates",
+        name="Configuration updates",
+        state_class=SensorStateClass.TOTAL_INCREASING,
+        value_fn=lambda data, resolver: data["metrics"].config_updates,
+    ),
+    ArveeSensorEntityDescription(
+        key="fix_to_config",
+        name="Fix to configuration time",
+        native_unit_of_measurement=UnitOfTime.MILLISECONDS,
+        state_class=SensorStateClass.MEASUREMENT,
+        suggested_display_precision=0,
+        value_fn=lambda data, resolver: data["metrics"].fix_to_config.mean,
+    ),
+)
+
+
+@dataclass(frozen=True, kw_only=True)
+class ArveeRegionSensorEntityDescription(SensorEntityDescription):
+    """Describes an Arvee country or region sensor."""
+
+    value_fn: Callable[[dict[str, Any]], StateType]
+    attributes_fn: Callable[[dict[str, Any]], dict[str, Any]] = lambda data: {}
+
+
+COUNTRY_SENSOR = ArveeRegionSensorEntityDescription(
+    key="country",
+    name="Country",
+    icon="mdi:earth",
+    value_fn=lambda data: data["country"][1] if data["country"] else None,
+    attributes_fn=lambda data: {
+        "country_code": data["country"][0] if data["country"] else None
+    },
+)
+
+REGION_SENSOR = ArveeRegionSensorEntityDescription(
+    key="region",
+    name="Region",
+    icon="mdi:map-outline",
+    value_fn=lambda data: data["region"],
+)
+
+
+async def async_setup_entry(
+    hass: HomeAssistant,
+    entry: ConfigEntry,
+    async_add_entities: AddEntitiesCallback,
+) -> None:
+    """Set up Arvee diagnostic sensors, or a fleet's timezone sensors."""
+    if (fleet := hass.data[DOMAIN][entry.entry_id].get("fleet")) is not None:
+        async_add_entities(
+            FleetTimezoneSensor(
+                entry,
+                fleet,
+                entity_id,
+                state.name if (state := hass.states.get(entity_id)) else entity_id,
+            )
+            for entity_id in fleet.trackers
+        )
+        return
+
+    entities: list[SensorEntity] = [
+        ArveeDiagnosticSensor(entry, description) for description in SENSORS
+    ]
+    entities.append(ArveeRegionSensor(entry, COUNTRY_SENSOR))
+    # Regions need a boundary file, which is only opened at startup
+    if {**entry.data, **entry.options}.get(CONF_REGION_FILE):
+        entities.append(ArveeRegionSensor(entry, REGION_SENSOR))
+    async_add_entities(entities)
+
+
+class ArveeDiagnosticSensor(SensorEntity):
+    """Sensor exposing one Arvee runtime metric."""
+
+    entity_description: ArveeSensorEntityDescription
+    _attr_entity_category = EntityCategory.DIAGNOSTIC
+    _attr_entity_registry_enabled_default = False
+    _attr_has_entity_name = True
+    _attr_should_poll = False
+
+    def __init__(
+        self, entry: ConfigEntry, description: ArveeSensorEntityDescription
+    ) -> None:
+        """Initialize the sensor."""
+        self.entity_description = description
+        self._entry_id = entry.entry_id
+        self._written: StateType = None
+        self._attr_unique_id = f"{entry.entry_id}_{description.key}"
+        self._attr_device_info = DeviceInfo(
+            identifiers={(DOMAIN, entry.entry_id)},
+            name=entry.title,
+            entry_type=DeviceEntryType.SERVICE,
+        )
+
+    async def async_added_to_hass(self) -> None:
+        """Refresh whenever a location update has been processed."""
+        self.async_on_remove(
+            async_dispatcher_connect(
+                self.hass,
+                SIGNAL_METRICS_UPDATED.format(self._entry_id),
+                self._async_metrics_updated,
+            )
+        )
+
+    @callback
+    def _async_metrics_updated(self) -> None:
+        """Write the latest metric value, if it changed."""
+        if (value := self.native_value) != self._written:
+            self._written = value
+            self.async_write_ha_state()
+
+    @property
+    def native_value(self) -> StateType:
+        """Return the current metric value."""
+        data = self.hass.data[DOMAIN][self._entry_id]
+        value = self.entity_description.value_fn(data, self.hass.data.get(DATA_RESOLVER))
+        if isinstance(value, float):
+            return round(value, 3)
+        return value
+
+
+class ArveeRegionSensor(SensorEntity):
+    """Sensor holding the country or region Home Assistant is in."""
+
+    entity_description: ArveeRegionSensorEntityDescription
+    _attr_has_entity_name = True
+    _attr_should_poll = False
+
+    def __init__(
+        self, entry: ConfigEntry, description: ArveeRegionSensorEntityDescription
+    ) -> None:
+        """Initialize the sensor."""
+        self.entity_description = description
+        self._entry_id = entry.entry_id
+        self._attr_unique_id = f"{entry.entry_id}_{description.key}"
+        self._attr_device_info = DeviceInfo(
+            identifiers={(DOMAIN, entry.entry_id)},
+            name=entry.title,
+            entry_type=DeviceEntryType.SERVICE,
+        )
+
+    async def async_added_to_hass(self) -> None:
+        """Refresh only when the country or region changes."""
+        self.async_on_remove(
+            async_dispatcher_connect(
+                self.hass,
+                SIGNAL_REGION_UPDATED.format(self._entry_id),
+                self.async_write_ha_state,
+            )
+        )
+
+    @property
+    def native_value(self) -> StateType:
+        """Return the country or region name."""
+        return self.entity_description.value_fn(self.hass.data[DOMAIN][self._entry_id])
+
+    @property
+    def extra_state_attributes(self) -> dict[str, Any]:
+        """Return the country code."""
+        return self.entity_description.attributes_fn(
+            self.hass.data[DOMAIN][self._entry_id]
+        )
+
+
+class FleetTimezoneSensor(SensorEntity):
+    """Sensor holding the local timezone of one tracker in a fleet."""
+
+    _attr_has_entity_name = True
+    _attr_icon = "mdi:map-clock"
+    _attr_should_poll = False
+
+    def __init__(
+        self, entry: ConfigEntry, fleet: FleetTracker, entity_id: str, tracker_name: str
+    ) -> None:
+        """Initialize the sensor."""
+        self._fleet = fleet
+        self._tracker = entity_id
+        self._attr_name = f"{tracker_name} timezone"
+        self._attr_unique_id = f"{entry.entry_id}_{entity_id}"
+        self._attr_extra_state_attributes = {"tracker": entity_id}
+        self._attr_device_info = DeviceInfo(
+            identifiers={(DOMAIN, entry.entry_id)},
+            name=entry.title,
+            entry_type=DeviceEntryType.SERVICE,
+        )
+
+    async def async_added_to_hass(self) -> None:
+        """Refresh whenever the tracker's timezone changes."""
+        self.async_on_remove(
+            self._fleet.async_add_listener(self._tracker, self.async_write_ha_state)
+        )
+
+    @property
+    def native_value(self) -> StateType:
+        """Return the tracker's timezone."""
+        return self._fleet.timezones.get(self._tracker)
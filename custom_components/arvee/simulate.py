@@ -0,0 +1,283 @@
+"""Dry runs of the location update pipeline for Arvee.
+
+A simulation replays a trace of fixes through the same fix selection,
+movement gate, route, overrides and timezone lookups as live updates,
+but records the configuration writes they would make instead of making
+them, so thresholds can be tuned without driving.
+"""
+from __future__ import annotations
+
+import asyncio
+from collections.abc import Awaitable, Callable, Iterable
+from dataclasses import dataclass
+from datetime import datetime, timezone as dt_timezone
+import json
+import time
+from typing import Any
+
+from .gate import MovementGate
+from .geo import haversine_miles
+from .metrics import ArveeMetrics
+from .overrides import OverrideIndex
+from .pipeline import ACCEPTED_RESULTS, Lookup, SafeZoneLookup, async_process_fix
+from .route import Route
+from .source import FixSelector, GpsFix
+
+# Result of a fix the selector didn't take, as a repeat or an outlier
+RESULT_DROPPED = "dropped"
+
+# The replayed trace, read like a GPS stream
+SIMULATED_SOURCE = "simulation://trace"
+
+# Fixes replayed between handing the streamed lines over and letting
+# other tasks run
+REPLAY_CHUNK = 1000
+
+# Takes streamed lines of JSON
+OutputWriter = Callable[[list[str]], Awaitable[None]]
+
+
+@dataclass(frozen=True, slots=True)
+class SimulatedFix:
+    """Fix of a trace being replayed."""
+
+    time: float  # POSIX timestamp
+    latitude: float
+    longitude: float
+    accuracy: float | None = None  # meters
+
+
+class Simulation:
+    """Replay fixes through the location update pipeline without writing anything.
+
+    Each fix goes through the same pipeline as a live update, with every
+    write to Home Assistant's configuration going to a sink that only
+    records it. The replay starts from the given home and timezone, as a
+    newly set up entry would. It runs on the event loop, with the lookups
+    going to the resolver's worker like live ones.
+    """
+
+    def __init__(
+        self,
+        lookup: Lookup,
+        safe_zone: SafeZoneLookup,
+        update_threshold: float,
+        location_threshold: float,
+        location_interval: float,
+        smoothing: bool = False,
+        route: Route | None = None,
+        overrides: OverrideIndex | None = None,
+        home: tuple[float, float] | None = None,
+        time_zone: str | None = None,
+    ) -> None:
+        """Initialize the simulation with the lookups, options and starting point."""
+        self.lookup = lookup
+        self.safe_zone = safe_zone
+        self.location_threshold = location_threshold
+        self.location_interval = location_interval  # seconds
+        self.route = route
+        self.overrides = overrides
+        self.metrics = ArveeMetrics()
+        self.timezone_changes: list[dict[str, Any]] = []
+        # What Home Assistant's configuration would hold
+        self.home = home
+        self.timezone = time_zone
+
+        gate = MovementGate(update_threshold)
+        if home is not None:
+            gate.set_anchor(*home)
+        # Laid out as a live entry's data, for the pipeline
+        self.data: dict[str, Any] = {
+            "selector": FixSelector(None, [(SIMULATED_SOURCE,)], smoothing=smoothing),
+            "gate": gate,
+            "metrics": self.metrics,
+            "last_lat": None if home is None else home[0],
+            "last_lon": None if home is None else home[1],
+            "timezone": None,
+            "safe_zone": None,
+            "border_crossing": None,
+            "override": None,
+            "route_distance": None,
+        }
+        self._pending: tuple[float, float] | None = None
+        self._location_updated: float | None = None
+        self._flush_at: float | None = None
+        self._lines: list[str] | None = None
+
+    async def async_run(
+        self, fixes: Iterable[SimulatedFix], output: OutputWriter | None = None
+    ) -> dict[str, Any]:
+        """Replay fixes in order and return a summary.
+
+        With an output, the result of each fix and each write is handed to
+        it as a line of JSON as the replay goes.
+        """
+        start = time.perf_counter()
+        self._lines = None if output is None else []
+        try:
+            await self._async_replay(fixes, output)
+        finally:
+            self._lines = None
+        return self.summary(time.perf_counter() - start)
+
+    def summary(self, elapsed: float | None = None) -> dict[str, Any]:
+        """Return what the replay did and would have written."""
+        metrics = self.metrics
+        return {
+            "fixes": metrics.events_received,
+            "dropped": metrics.events_dropped,
+            "accepted": metrics.updates - metrics.below_threshold,
+            "below_threshold": metrics.below_threshold,
+            "safe_zone_hits": metrics.safe_zone_hits,
+            "route_hits": metrics.route_hits,
+            "override_hits": metrics.override_hits,
+            "border_holds": metrics.border_holds,
+            "lookups": metrics.lookups,
+            "config_writes": metrics.config_updates,
+            "timezone_changes": self.timezone_changes,
+            "elapsed": None if elapsed is None else round(elapsed, 3),
+        }
+
+    async def _async_replay(
+        self, fixes: Iterable[SimulatedFix], output: OutputWriter | None
+    ) -> None:
+        """Run each fix through the pipeline."""
+        selector: FixSelector = self.data["selector"]
+        last = None
+        for count, fix in enumerate(fixes, 1):
+            if count % REPLAY_CHUNK == 0:
+                await self._async_hand_over(output)
+            self._flush_due(fix.time)
+            last = fix.time
+            self.metrics.events_received += 1
+            if not selector.push(
+                SIMULATED_SOURCE,
+                GpsFix(fix.latitude, fix.longitude, fix.accuracy, fix.time),
+                fix.time,
+            ):
+                self.metrics.events_dropped += 1
+                self._emit(fix, RESULT_DROPPED)
+                continue
+
+            result = await async_process_fix(
+                self.data,
+                fix.time,
+                self.timezone,
+                self.lookup,
+                self.safe_zone,
+                self._async_write,
+                self.route,
+                self.overrides,
+            )
+            timezone = self.data["timezone"] if result in ACCEPTED_RESULTS else None
+            self._emit(fix, result, timezone)
+
+        # A deferred write still happens after the trace ends
+        if self._flush_at is not None and last is not None:
+            self._flush_due(self._flush_at)
+        await self._async_hand_over(output)
+
+    async def _async_hand_over(self, output: OutputWriter | None) -> None:
+        """Pass the lines streamed so far on, and let other tasks run."""
+        if output is None or not self._lines:
+            # Fixes answered without a lookup never give up the loop
+            await asyncio.sleep(0)
+            return
+        lines, self._lines = self._lines, []
+        await output(lines)
+
+    async def _async_write(
+        self,
+        now: float,
+        location: tuple[float, float] | None,
+        timezone: str | None,
+    ) -> None:
+        """Take a write from the pipeline as live updates would."""
+        if timezone is None:
+            self._pending = location
+            self._flush(now)
+            return
+
+        self.timezone_changes.append({
+            "time": _isoformat(now),
+            "from": self.timezone,
+            "to": timezone,
+            "latitude": round(self.data["last_lat"], 6),
+            "longitude": round(self.data["last_lon"], 6),
+        })
+        self._pending = None
+        self._write(now, location, timezone)
+
+    def _flush(self, now: float, interval_elapsed: bool = False) -> None:
+        """Write the pending location if the location write policy allows it."""
+        if (pending := self._pending) is None:
+            return
+        if (
+            self.home is not None
+            and haversine_miles(*self.home, *pending) < self.location_threshold
+        ):
+            self._pending = None
+            return
+        if (
+            not interval_elapsed
+            and self._location_updated is not None
+            and now - self._location_updated < self.location_interval
+        ):
+            if self._flush_at is None:
+                self._flush_at = self._location_updated + self.location_interval
+            return
+        self._pending = None
+        self._write(now, pending)
+
+    def _flush_due(self, now: float) -> None:
+        """Make a deferred location write whose time has come."""
+        if (flush_at := self._flush_at) is not None and flush_at <= now:
+            self._flush_at = None
+            self._flush(flush_at, interval_elapsed=True)
+
+    def _write(
+        self,
+        now: float,
+        location: tuple[float, float] | None,
+        timezone: str | None = None,
+    ) -> None:
+        """Record a configuration write in place of making it."""
+        self.metrics.config_updates += 1
+        if location is not None:
+            self.home = location
+            self._location_updated = now
+        if timezone is not None:
+            self.timezone = timezone
+        if self._lines is not None:
+            self._lines.append(
+                json.dumps({
+                    "time": _isoformat(now),
+                    "write": "timezone" if timezone else "location",
+                    "latitude": None if location is None else round(location[0], 6),
+                    "longitude": None if location is None else round(location[1], 6),
+                    "timezone": self.timezone,
+                })
+                + "\n"
+            )
+
+    def _emit(
+        self, fix: SimulatedFix, result: str | None, timezone: str | None = None
+    ) -> None:
+        """Stream what happened to a fix."""
+        if self._lines is None:
+            return
+        self._lines.append(
+            json.dumps({
+                "time": _isoformat(fix.time),
+                "latitude": fix.latitude,
+                "longitude": fix.longitude,
+                "result": result,
+                "timezone": timezone,
+            })
+            + "\n"
+        )
+
+
+def _isoformat(timestamp: float) -> str:
+    """Return a POSIX timestamp as an ISO 8601 string in UTC."""
+    return datetime.fromtimestamp(timestamp, dt_timezone.utc).isoformat()
@@ -0,0 +1,132 @@
+"""GPS jitter filter for Arvee."""
+from __future__ import annotations
+
+from dataclasses import replace
+import math
+from typing import TYPE_CHECKING
+
+from .const import DEFAULT_GPS_ACCURACY
+
+if TYPE_CHECKING:
+    from .source import GpsFix
+
+METERS_PER_DEGREE = 111_195.0
+
+# Variance of the acceleration the filter allows for, (m/s²)² per second
+ACCELERATION_NOISE = 3.0
+
+# Initial uncertainty of the velocity, roughly highway speed
+INITIAL_SPEED_ERROR = 30.0  # m/s
+
+# Squared normalized innovation above which a fix is rejected as an
+# outlier, about five standard deviations
+OUTLIER_GATE = 25.0
+
+# Consecutive rejections after which the filter restarts at the next
+# outlying fix, so a real jump (a ferry, a tunnel, a restart elsewhere)
+# isn't ignored
+MAX_REJECTIONS = 3
+
+
+class _Axis:
+    """Constant-velocity Kalman filter along one axis, in meters."""
+
+    __slots__ = ("velocity", "p_pp", "p_pv", "p_vv")
+
+    def __init__(self, variance: float) -> None:
+        """Start at a measured position with no known velocity."""
+        self.velocity = 0.0
+        self.p_pp = variance
+        self.p_pv = 0.0
+        self.p_vv = INITIAL_SPEED_ERROR * INITIAL_SPEED_ERROR
+
+    def predict(self, dt: float) -> float:
+        """Advance the covariance by dt and return the position change."""
+        q = ACCELERATION_NOISE
+        self.p_pp += dt * (2 * self.p_pv + dt * self.p_vv) + q * dt**3 / 3
+        self.p_pv += dt * self.p_vv + q * dt**2 / 2
+        self.p_vv += q * dt
+        return self.velocity * dt
+
+    def correct(self, innovation: float, variance: float) -> float:
+        """Apply a measurement and return the position correction."""
+        total = self.p_pp + variance
+        k_p = self.p_pp / total
+        k_v = self.p_pv / total
+        self.velocity += k_v * innovation
+        self.p_vv -= k_v * self.p_pv
+        self.p_pp *= 1 - k_p
+        self.p_pv *= 1 - k_p
+        return k_p * innovation
+
+
+class KalmanSmoother:
+    """Smooth the fixes of one source and reject outliers.
+
+    The state is kept as the estimated coordinate plus a velocity and
+    covariance per axis, so memory doesn't grow with the number of fixes.
+    Fixes are weighted by their reported accuracy.
+    """
+
+    def __init__(self) -> None:
+        """Initialize the smoother."""
+        self.rejected = 0
+        self._consecutive = 0
+        self._state: tuple[float, float, float] | None = None
+        self._north: _Axis | None = None
+        self._east: _Axis | None = None
+
+    def update(self, fix: GpsFix, now: float) -> GpsFix | None:
+        """Filter a fix, returning the estimate or None if it was rejected."""
+        accuracy = DEFAULT_GPS_ACCURACY if fix.accuracy is None else max(fix.accuracy, 1.0)
+        variance = accuracy * accuracy
+
+        if self._state is None:
+            return self._restart(fix, now, variance)
+
+        lat, lon, last = self._state
+        dt = max(now - last, 0.0)
+        kx = math.cos(math.radians(lat)) * METERS_PER_DEGREE
+
+        # Predicted position, in meters from the last estimate
+        north = self._north.predict(dt)
+        east = self._east.predict(dt)
+        innovation_north = (fix.latitude - lat) * METERS_PER_DEGREE - north
+        innovation_east = ((fix.longitude - lon + 180) % 360 - 180) * kx - east
+
+        distance = innovation_north**2 / (self._north.p_pp + variance) + innovation_east**2 / (
+            self._east.p_pp + variance
+        )
+        if distance > OUTLIER_GATE:
+            self._consecutive += 1
+            if self._consecutive > MAX_REJECTIONS:
+                return self._restart(fix, now, variance)
+            self.rejected += 1
+            # Keep the prediction so the next fix is judged against it
+            self._state = (
+                lat + north / METERS_PER_DEGREE,
+                (lon + east / kx + 180) % 360 - 180,
+                now,
+            )
+            return None
+
+        self._consecutive = 0
+        north += self._north.correct(innovation_north, variance)
+        east += self._east.correct(innovation_east, variance)
+        lat += north / METERS_PER_DEGREE
+        lon = (lon + east / kx + 180) % 360 - 180
+        self._state = (lat, lon, now)
+        return replace(
+            fix,
+            latitude=lat,
+            longitude=lon,
+            accuracy=math.sqrt(max(self._north.p_pp, self._east.p_pp)),
+        )
+
+    def _restart(self, fix: GpsFix, now: float, variance: float) -> GpsFix:
+        """Start filtering again from a fix."""
+        self._consecutive = 0
+        self._state = (fix.latitude, fix.longitude, now)
+        self._north = _Axis(variance)
+        self._east = _Axis(variance)
+        return fix
@@ -0,0 +1,267 @@
+"""GPS sources for Arvee."""
+from __future__ import annotations
+
+from collections.abc import Mapping
+from dataclasses import dataclass, replace
+import logging
+import time
+from typing import Any
+
+from homeassistant.const import ATTR_GPS_ACCURACY, ATTR_LATITUDE, ATTR_LONGITUDE
+from homeassistant.core import HomeAssistant, State
+
+from .const import (
+    CONF_LATITUDE_ENTITY,
+    CONF_LONGITUDE_ENTITY,
+    CONF_SMOOTHING,
+    CONF_SOURCE_MAX_AGE,
+    CONF_SOURCES,
+    CONF_STREAM,
+    CONF_TRACKER_ENTITY,
+    DEFAULT_GPS_ACCURACY,
+    DEFAULT_SMOOTHING,
+    DEFAULT_SOURCE_MAX_AGE,
+)
+from .smoother import KalmanSmoother
+
+_LOGGER = logging.getLogger(__name__)
+
+# How far a fix may drift per second of age when ranking sources, roughly
+# highway speed
+DRIFT_SPEED = 30.0  # meters per second
+
+# A source listed earlier is preferred unless another is better by this much
+PRIORITY_MARGIN = 25.0  # meters
+
+
+@dataclass(frozen=True)
+class GpsFix:
+    """Coordinates read from a GPS source."""
+
+    latitude: float
+    longitude: float
+    accuracy: float | None = None  # meters
+    updated: float = 0.0  # POSIX timestamp of the source state
+
+    def error(self, now: float) -> float:
+        """Estimate how far this fix may be from the true position, in meters."""
+        accuracy = DEFAULT_GPS_ACCURACY if self.accuracy is None else self.accuracy
+        return accuracy + max(now - self.updated, 0.0) * DRIFT_SPEED
+
+
+def config_sources(config: Mapping[str, Any]) -> list[tuple[str, ...]]:
+    """Return the sources of a configuration in priority order.
+
+    Each source is a tuple of entity IDs: a device tracker on its own, or
+    a latitude/longitude entity pair. A GPS stream read directly is a
+    tuple holding its URL, right after the source chosen during setup.
+    """
+    if tracker := config.get(CONF_TRACKER_ENTITY):
+        sources = [(tracker,)]
+    else:
+        sources = [(config[CONF_LATITUDE_ENTITY], config[CONF_LONGITUDE_ENTITY])]
+    if stream := config.get(CONF_STREAM):
+        sources.append((stream,))
+    for entity_id in config.get(CONF_SOURCES, []):
+        if (entity_id,) not in sources:
+            sources.append((entity_id,))
+    return sources
+
+
+def is_stream(source: tuple[str, ...]) -> bool:
+    """Return True for a source read from a GPS stream rather than entities."""
+    return len(source) == 1 and "://" in source[0]
+
+
+def state_as_float(value: Any) -> float | None:
+    """Return a state value as a float, or None if it isn't numeric."""
+    try:
+        return float(value)
+    except (ValueError, TypeError):
+        return None
+
+
+def tracker_fix(state: State | None) -> GpsFix | None:
+    """Return the fix held in a tracker's attributes, or None without one."""
+    if state is None:
+        return None
+    lat = state_as_float(state.attributes.get(ATTR_LATITUDE))
+    lon = state_as_float(state.attributes.get(ATTR_LONGITUDE))
+    if lat is None or lon is None:
+        return None
+    return GpsFix(
+        lat,
+        lon,
+        state_as_float(state.attributes.get(ATTR_GPS_ACCURACY)),
+        state.last_updated.timestamp(),
+    )
+
+
+def pair_fix(lat_state: State | None, lon_state: State | None) -> GpsFix | None:
+    """Return the fix held by a latitude/longitude entity pair."""
+    if lat_state is None or lon_state is None:
+        return None
+    lat = state_as_float(lat_state.state)
+    lon = state_as_float(lon_state.state)
+    if lat is None or lon is None:
+        return None
+    return GpsFix(
+        lat,
+        lon,
+        updated=max(lat_state.last_updated, lon_state.last_updated).timestamp(),
+    )
+
+
+class FixSelector:
+    """Track the latest usable fix of each source and pick the best one.
+
+    Only the source whose entity changed is re-read, so the cost of an
+    event doesn't grow with the number of sources. A selector for GPS
+    streams alone needs no Home Assistant instance.
+    """
+
+    def __init__(
+        self,
+        hass: HomeAssistant | None,
+        sources: list[tuple[str, ...]],
+        max_age: float = DEFAULT_SOURCE_MAX_AGE * 60,
+        smoothing: bool = DEFAULT_SMOOTHING,
+    ) -> None:
+        """Initialize the selector."""
+        self.hass = hass
+        self.sources = sources
+        self.max_age = max_age
+        self.selected: int | None = None
+        self.switches = 0
+        self._fixes: list[GpsFix | None] = [None] * len(sources)
+        self._raw: list[GpsFix | None] = [None] * len(sources)
+        self._smoothers = [KalmanSmoother() if smoothing else None for _ in sources]
+        self._sources_by_entity: dict[str, int] = {}
+        self._streamed: dict[int, GpsFix | None] = {}
+        for index, source in enumerate(sources):
+            if is_stream(source):
+                self._streamed[index] = None
+                continue
+            for entity_id in source:
+                self._sources_by_entity.setdefault(entity_id, index)
+        self._position: tuple[float, float] | None = None
+
+    @classmethod
+    def from_config(cls, hass: HomeAssistant, config: Mapping[str, Any]) -> FixSelector:
+        """Create a selector for a configuration."""
+        return cls(
+            hass,
+            config_sources(config),
+            config.get(CONF_SOURCE_MAX_AGE, DEFAULT_SOURCE_MAX_AGE) * 60,
+            config.get(CONF_SMOOTHING, DEFAULT_SMOOTHING),
+        )
+
+    @property
+    def entities(self) -> list[str]:
+        """Return the entities to follow."""
+        return list(self._sources_by_entity)
+
+    def refresh(self, now: float) -> GpsFix | None:
+        """Re-read every source and return the best fix."""
+        for index in range(len(self.sources)):
+            self._read(index, now)
+        return self.current()
+
+    def update(self, entity_id: str, now: float) -> bool:
+        """Re-read the source of an entity.
+
+        Returns True if the best fix moved as a result.
+        """
+        if (index := self._sources_by_entity.get(entity_id)) is None:
+            return False
+        return self._update(index, now)
+
+    def push(self, url: str, fix: GpsFix, now: float) -> bool:
+        """Take a fix read from a GPS stream.
+
+        Returns True if the best fix moved as a result.
+        """
+        index = self.sources.index((url,))
+        self._streamed[index] = fix
+        return self._update(index, now)
+
+    def _update(self, index: int, now: float) -> bool:
+        """Re-read a source, returning True if the best fix moved."""
+        if not self._read(index, now):
+            return False
+
+        previous = self._position
+        fix = self.current()
+        return fix is not None and (fix.latitude, fix.longitude) != previous
+
+    def current(self) -> GpsFix | None:
+        """Return the best fix among the sources right now."""
+        now = time.time()
+        usable = [
+            (fix.error(now), index)
+            for index, fix in enumerate(self._fixes)
+            if fix is not None
+        ]
+        # Stale sources are only used when nothing fresher is reporting
+        fresh = [
+            item for item in usable if now - self._fixes[item[1]].updated <= self.max_age
+        ]
+        if not (candidates := fresh or usable):
+            return None
+
+        best = min(candidates)[0]
+        index = min(index for error, index in candidates if error <= best + PRIORITY_MARGIN)
+        if index != self.selected:
+            if self.selected is not None:
+                self.switches += 1
+                _LOGGER.debug("Switched GPS source to %s", ", ".join(self.sources[index]))
+            self.selected = index
+
+        fix = self._fixes[index]
+        self._position = (fix.latitude, fix.longitude)
+        return fix
+
+    def as_dict(self) -> list[dict[str, Any]]:
+        """Return the state of each source for diagnostics."""
+        now = time.time()
+        return [
+            {
+                "entities": list(source),
+                "available": fix is not None,
+                "accuracy": None if fix is None else fix.accuracy,
+                "age": None if fix is None else round(now - fix.updated, 1),
+                "selected": index == self.selected,
+                "rejected": None if smoother is None else smoother.rejected,
+            }
+            for index, (source, fix, smoother) in enumerate(
+                zip(self.sources, self._fixes, self._smoothers)
+            )
+        ]
+
+    def _read(self, index: int, now: float) -> bool:
+        """Read the current fix of a source, returning False if it's unchanged."""
+        if index in self._streamed:
+            raw = self._streamed[index]
+        else:
+            states = [self.hass.states.get(entity_id) for entity_id in self.sources[index]]
+            raw = tracker_fix(states[0]) if len(states) == 1 else pair_fix(*states)
+
+        last = self._raw[index]
+        self._raw[index] = raw
+        if raw is None or (smoother := self._smoothers[index]) is None:
+            self._fixes[index] = raw
+            return True
+
+        # Repeated coordinates carry no new position for the filter
+        if last is not None and (raw.latitude, raw.longitude) == (
+            last.latitude,
+            last.longitude,
+        ):
+            self._fixes[index] = replace(self._fixes[index] or raw, updated=raw.updated)
+            return False
+
+        if (fix := smoother.update(raw, now)) is None:
+            _LOGGER.debug("Rejected outlying fix from %s", ", ".join(self.sources[index]))
+            return False
+        self._fixes[index] = fix
+        return True
@@ -0,0 +1,278 @@
+"""Direct GPS streams for Arvee.
+
+Fixes are read from gpsd or an NMEA 0183 stream without going through
+Home Assistant's state machine, so a GPS reporting several times a
+second isn't written to states and the recorder only to be read back.
+"""
+from __future__ import annotations
+
+import asyncio
+from collections.abc import Callable
+from contextlib import suppress
+import json
+import logging
+import time
+from typing import Any
+from urllib.parse import parse_qs, urlsplit
+
+from homeassistant.core import HomeAssistant, callback
+
+from .const import STREAM_INTERVAL
+from .source import GpsFix
+
+# pyserial-asyncio isn't required by Arvee, only for serial NMEA streams
+try:
+    import serial_asyncio
+except ImportError:
+    serial_asyncio = None
+
+_LOGGER = logging.getLogger(__name__)
+
+# Supported stream URL schemes
+STREAM_SCHEMES = ("gpsd", "tcp", "serial")
+
+GPSD_PORT = 2947
+GPSD_WATCH = b'?WATCH={"enable":true,"json":true};\n'
+SERIAL_BAUD = 4800
+
+# Typical error of a GPS position at an HDOP of 1
+USER_EQUIVALENT_RANGE_ERROR = 5.0  # meters
+
+# Wait before reconnecting, doubled after each failure up to the maximum
+RECONNECT_DELAY = 5.0  # seconds
+MAX_RECONNECT_DELAY = 60.0  # seconds
+
+# Longest line accepted from a stream
+_LINE_LIMIT = 65536
+
+
+def parse_nmea(line: str) -> GpsFix | None:
+    """Return the fix in a GGA or RMC sentence, or None for other sentences.
+
+    Raises ValueError for a sentence with a bad checksum or fields.
+    """
+    line = line.strip()
+    if not line.startswith("$"):
+        return None
+    body, _, checksum = line[1:].partition("*")
+    if checksum:
+        expected = 0
+        for char in body.encode("ascii", "replace"):
+            expected ^= char
+        if int(checksum[:2], 16) != expected:
+            raise ValueError(f"Bad NMEA checksum: {line}")
+
+    fields = body.split(",")
+    sentence = fields[0][2:]
+    if sentence == "GGA" and len(fields) > 8:
+        # Fix quality 0 means no fix
+        if fields[6] in ("", "0"):
+            return None
+        lat = _nmea_coordinate(fields[2], fields[3])
+        lon = _nmea_coordinate(fields[4], fields[5])
+        accuracy = float(fields[8]) * USER_EQUIVALENT_RANGE_ERROR if fields[8] else None
+    elif sentence == "RMC" and len(fields) > 6:
+        # Status V means the receiver has no valid fix
+        if fields[2] != "A":
+            return None
+        lat = _nmea_coordinate(fields[3], fields[4])
+        lon = _nmea_coordinate(fields[5], fields[6])
+        accuracy = None
+    else:
+        return None
+    if lat is None or lon is None:
+        return None
+    return GpsFix(lat, lon, accuracy, time.time())
+
+
+def parse_gpsd(line: str) -> GpsFix | None:
+    """Return the fix in a gpsd TPV report, or None for other reports.
+
+    Raises ValueError for a line that isn't JSON.
+    """
+    report = json.loads(line)
+    # Mode 2 and 3 are 2D and 3D fixes
+    if (
+        not isinstance(report, dict)
+        or report.get("class") != "TPV"
+        or report.get("mode", 0) < 2
+        or "lat" not in report
+        or "lon" not in report
+    ):
+        return None
+    accuracy = report.get("eph")
+    if accuracy is None and "epx" in report and "epy" in report:
+        accuracy = max(report["epx"], report["epy"])
+    return GpsFix(float(report["lat"]), float(report["lon"]), accuracy, time.time())
+
+
+class GpsStream:
+    """Read fixes from gpsd or an NMEA stream in the background.
+
+    Lines are parsed as they arrive, and at most one fix per interval is
+    passed on: the first right away and the latest of the rest once the
+    interval has passed, so a 10 Hz receiver costs one update a second.
+    The connection is retried with a growing delay when it fails.
+    """
+
+    def __init__(
+        self,
+        hass: HomeAssistant,
+        url: str,
+        on_fix: Callable[[GpsFix], None],
+        interval: float = STREAM_INTERVAL,
+    ) -> None:
+        """Initialize the stream."""
+        self.hass = hass
+        self.url = url
+        self.interval = interval
+        self.connected = False
+        self.lines = 0
+        self.errors = 0
+        self.fixes = 0
+        self.decimated = 0
+        self.reconnects = 0
+        self._on_fix = on_fix
+        self._parts = urlsplit(url)
+        if self._parts.scheme not in STREAM_SCHEMES:
+            raise ValueError(f"Unsupported GPS stream {url}")
+        self._parse = parse_gpsd if self._parts.scheme == "gpsd" else parse_nmea
+        self._task: asyncio.Task[None] | None = None
+        self._pending: GpsFix | None = None
+        self._timer: asyncio.TimerHandle | None = None
+        self._last_delivery: float | None = None
+
+    @callback
+    def async_start(self) -> None:
+        """Start reading the stream."""
+        if self._task is None:
+            self._task = self.hass.async_create_background_task(
+                self._async_run(), f"arvee gps stream {self.url}"
+            )
+
+    @callback
+    def async_stop(self) -> None:
+        """Stop reading the stream and drop any held fix."""
+        if self._task is not None:
+            self._task.cancel()
+            self._task = None
+        if self._timer is not None:
+            self._timer.cancel()
+            self._timer = None
+        self._pending = None
+
+    async def _async_run(self) -> None:
+        """Read the stream, reconnecting when it fails."""
+        delay = RECONNECT_DELAY
+        while True:
+            try:
+                reader, writer = await self._async_open()
+            except (OSError, ValueError) as err:
+                _LOGGER.warning("Could not open GPS stream %s: %s", self.url, err)
+            else:
+                self.connected = True
+                delay = RECONNECT_DELAY
+                try:
+                    await self._async_read(reader)
+                except (OSError, ValueError) as err:
+                    _LOGGER.warning("GPS stream %s failed: %s", self.url, err)
+                finally:
+                    self.connected = False
+                    writer.close()
+                    with suppress(OSError):
+                        await writer.wait_closed()
+            await asyncio.sleep(delay)
+            delay = min(delay * 2, MAX_RECONNECT_DELAY)
+            self.reconnects += 1
+
+    async def _async_open(
+        self,
+    ) -> tuple[asyncio.StreamReader, asyncio.StreamWriter]:
+        """Connect to the stream."""
+        parts = self._parts
+        if parts.scheme == "serial":
+            if serial_asyncio is None:
+                raise ValueError("Serial GPS streams need pyserial-asyncio")
+            baud = int(parse_qs(parts.query).get("baud", [SERIAL_BAUD])[0])
+            return await serial_asyncio.open_serial_connection(
+                url=parts.path, baudrate=baud, limit=_LINE_LIMIT
+            )
+
+        port = parts.port or (GPSD_PORT if parts.scheme == "gpsd" else None)
+        if not parts.hostname or port is None:
+            raise ValueError(f"GPS stream {self.url} needs a host and port")
+        reader, writer = await asyncio.open_connection(
+            parts.hostname, port, limit=_LINE_LIMIT
+        )
+        if parts.scheme == "gpsd":
+            writer.write(GPSD_WATCH)
+            await writer.drain()
+        return reader, writer
+
+    async def _async_read(self, reader: asyncio.StreamReader) -> None:
+        """Parse lines until the stream ends."""
+        while line := await reader.readline():
+            self.lines += 1
+            try:
+                fix = self._parse(line.decode("ascii", "replace"))
+            except (ValueError, TypeError) as err:
+                self.errors += 1
+                _LOGGER.debug("Skipping GPS stream line: %s", err)
+                continue
+            if fix is not None:
+                self._async_receive(fix)
+        _LOGGER.debug("GPS stream %s closed", self.url)
+
+    @callback
+    def _async_receive(self, fix: GpsFix) -> None:
+        """Pass a fix on, or hold it until the interval has passed."""
+        self.fixes += 1
+        now = self.hass.loop.time()
+        if self._pending is not None:
+            # Replaced by this fix before it was passed on
+            self.decimated += 1
+            self._pending = fix
+            return
+        if self._last_delivery is not None and (
+            wait := self._last_delivery + self.interval - now
+        ) > 0:
+            self._pending = fix
+            self._timer = self.hass.loop.call_later(wait, self._async_deliver_pending)
+            return
+        self._async_deliver(fix, now)
+
+    @callback
+    def _async_deliver_pending(self) -> None:
+        """Pass on the latest held fix."""
+        self._timer = None
+        if (fix := self._pending) is not None:
+            self._pending = None
+            self._async_deliver(fix, self.hass.loop.time())
+
+    @callback
+    def _async_deliver(self, fix: GpsFix, now: float) -> None:
+        """Pass a fix on to the pipeline."""
+        self._last_delivery = now
+        self._on_fix(fix)
+
+    def as_dict(self) -> dict[str, Any]:
+        """Return stream statistics for diagnostics."""
+        return {
+            "scheme": self._parts.scheme,
+            "connected": self.connected,
+            "lines": self.lines,
+            "errors": self.errors,
+            "fixes": self.fixes,
+            "decimated": self.decimated,
+            "reconnects": self.reconnects,
+        }
+
+
+def _nmea_coordinate(value: str, hemisphere: str) -> float | None:
+    """Convert an NMEA ddmm.mmmm coordinate to degrees."""
+    if not value:
+        return None
+    raw = float(value)
+    degrees = int(raw // 100)
+    coordinate = degrees + (raw - degrees * 100) / 60
+    return -coordinate if hemisphere in ("S", "W") else coordinate
@@ -0,0 +1,294 @@
+"""Trip history for Arvee.
+
+Fixes are kept in fixed-size columns of a ring buffer: time, latitude and
+longitude as 32-bit integers and the timezone as an index into a short
+list of names, 14 bytes a point. Points that add nothing to the shape of
+the track are dropped as they arrive, so a day of driving takes a few
+hundred points rather than one per GPS report.
+"""
+from __future__ import annotations
+
+from array import array
+from bisect import bisect_left, bisect_right
+from dataclasses import dataclass
+import json
+import math
+import os
+import struct
+import sys
+from typing import Any
+
+from .boundary import MILES_PER_DEGREE
+
+MAGIC = b"ARVK"
+FORMAT_VERSION = 1
+
+# Magic, version, reserved, point count and zone list length
+_HEADER = struct.Struct("<4sHHII")
+
+# Coordinates are stored as integers in units of 1e-7 degrees
+SCALE = 10_000_000
+
+# Points kept before the oldest are overwritten, about 700 kB
+TRACK_CAPACITY = 50000
+
+# Furthest a dropped fix may be from the simplified track
+TRACK_TOLERANCE = 0.02  # miles
+
+# A point is kept at least this often, so a time on a stop can be found
+TRACK_MAX_GAP = 900  # seconds
+
+# Fixes held while deciding which to keep, bounding the work per fix
+_MAX_WINDOW = 256
+
+# Zone index for fixes whose timezone isn't known
+_NO_ZONE = 0
+
+
+@dataclass(frozen=True, slots=True)
+class TrackPoint:
+    """Point on the trip history."""
+
+    time: float  # POSIX timestamp
+    latitude: float
+    longitude: float
+    timezone: str | None
+
+
+class TripLog:
+    """Simplified trip history in a ring buffer.
+
+    Incoming fixes are simplified with an opening window: fixes are held
+    while every one of them lies within TRACK_TOLERANCE of the line from
+    the last kept point to the newest fix, and when one doesn't, the fix
+    before the newest is kept and the rest dropped. This gives the same
+    track Douglas-Peucker would to within the tolerance, without holding
+    the whole trip. The newest fix always ends the track.
+    """
+
+    def __init__(
+        self, capacity: int = TRACK_CAPACITY, tolerance: float = TRACK_TOLERANCE
+    ) -> None:
+        """Initialize an empty log."""
+        if capacity < 2:
+            raise ValueError("A trip log needs room for at least two points")
+        self.capacity = capacity
+        self.tolerance = tolerance
+        self.times = array("I", bytes(4 * capacity))
+        self.latitudes = array("i", bytes(4 * capacity))
+        self.longitudes = array("i", bytes(4 * capacity))
+        self.zone_ids = array("H", bytes(2 * capacity))
+        self.zones: list[str] = []
+        self.count = 0
+        self.simplified = 0
+        self.overwritten = 0
+        self.dirty = False
+        self._start = 0
+        self._zone_ids: dict[str, int] = {}
+        self._window: list[TrackPoint] = []
+
+    @property
+    def nbytes(self) -> int:
+        """Return the memory used by the columns."""
+        return sum(
+            column.itemsize * len(column)
+            for column in (self.times, self.latitudes, self.longitudes, self.zone_ids)
+        )
+
+    def add(self, time: float, lat: float, lon: float, timezone: str | None) -> None:
+        """Add a fix to the end of the track.
+
+        A fix older than the newest point is dropped, so the track stays in
+        time order.
+        """
+        if self._window:
+            if time < self._window[-1].time:
+                return
+        elif self.count and time < self._time(self.count - 1):
+            return
+        point = TrackPoint(time, lat, lon, timezone)
+        self.dirty = True
+        if not self.count:
+            self._keep(point)
+            return
+        if self._window:
+            anchor = self._point(self.count - 1)
+            if (
+                len(self._window) >= _MAX_WINDOW
+                or timezone != anchor.timezone
+                or time - anchor.time > TRACK_MAX_GAP
+                or any(
+                    _offset(anchor, point, held) > self.tolerance
+                    for held in self._window
+                )
+            ):
+                self._keep(self._window[-1])
+                self.simplified += len(self._window) - 1
+                self._window.clear()
+        self._window.append(point)
+
+    def points(
+        self, start: float | None = None, end: float | None = None
+    ) -> list[TrackPoint]:
+        """Return the points of the track from start to end, oldest first."""
+        first = 0
+        last = self.count
+        if start is not None:
+            first = bisect_left(range(self.count), start, key=self._time)
+        if end is not None:
+            last = bisect_right(range(self.count), end, key=self._time)
+        points = [self._point(index) for index in range(first, last)]
+        if self._window and (
+            (start is None or self._window[-1].time >= start)
+            and (end is None or self._window[-1].time <= end)
+        ):
+            points.append(self._window[-1])
+        return points
+
+    def to_bytes(self) -> bytes:
+        """Return the track, including its newest fix, in its stored form."""
+        order = [(self._start + index) % self.capacity for index in range(self.count)]
+        columns = [
+            array(column.typecode, (column[index] for index in order))
+            for column in (self.times, self.latitudes, self.longitudes, self.zone_ids)
+        ]
+        if self._window:
+            tail = self._window[-1]
+            columns[0].append(int(tail.time))
+            columns[1].append(round(tail.latitude * SCALE))
+            columns[2].append(round(tail.longitude * SCALE))
+            columns[3].append(self._zone_id(tail.timezone))
+        zones = json.dumps(self.zones).encode()
+        if sys.byteorder == "big":
+            for column in columns:
+                column.byteswap()
+        return b"".join(
+            [
+                _HEADER.pack(MAGIC, FORMAT_VERSION, 0, len(columns[0]), len(zones)),
+                zones,
+                *(column.tobytes() for column in columns),
+            ]
+        )
+
+    @classmethod
+    def from_bytes(cls, data: bytes, capacity: int = TRACK_CAPACITY) -> TripLog:
+        """Restore a track from its stored form, keeping the newest points."""
+        try:
+            magic, version, _, count, zones_length = _HEADER.unpack_from(data)
+        except struct.error as err:
+            raise ValueError("Trip log is truncated") from err
+        if magic != MAGIC or version != FORMAT_VERSION:
+            raise ValueError("Not a trip log, or one from another version")
+        offset = _HEADER.size
+        zones = json.loads(data[offset : offset + zones_length])
+        offset += zones_length
+
+        columns = []
+        for typecode in ("I", "i", "i", "H"):
+            column = array(typecode)
+            size = column.itemsize * count
+            if len(data) < offset + size:
+                raise ValueError("Trip log is truncated")
+            column.frombytes(data[offset : offset + size])
+            if sys.byteorder == "big":
+                column.byteswap()
+            columns.append(column)
+            offset += size
+
+        log = cls(capacity)
+        log.zones = zones
+        log._zone_ids = {zone: index + 1 for index, zone in enumerate(zones)}
+        kept = min(count, capacity)
+        for target, column in zip(
+            (log.times, log.latitudes, log.longitudes, log.zone_ids), columns
+        ):
+            target[:kept] = column[count - kept :]
+        log.count = kept
+        return log
+
+    def as_dict(self) -> dict[str, Any]:
+        """Return the state of the log for diagnostics, without positions."""
+        return {
+            "points": self.count + bool(self._window),
+            "capacity": self.capacity,
+            "held": len(self._window),
+            "simplified": self.simplified,
+            "overwritten": self.overwritten,
+            "zones": len(self.zones),
+            "nbytes": self.nbytes,
+        }
+
+    def _keep(self, point: TrackPoint) -> None:
+        """Append a point to the ring, overwriting the oldest when it's full."""
+        if self.count == self.capacity:
+            index = self._start
+            self._start = (self._start + 1) % self.capacity
+            self.overwritten += 1
+        else:
+            index = (self._start + self.count) % self.capacity
+            self.count += 1
+        self.times[index] = int(point.time)
+        self.latitudes[index] = round(point.latitude * SCALE)
+        self.longitudes[index] = round(point.longitude * SCALE)
+        self.zone_ids[index] = self._zone_id(point.timezone)
+
+    def _zone_id(self, timezone: str | None) -> int:
+        """Return the index of a timezone's name, adding it if it's new."""
+        if timezone is None:
+            return _NO_ZONE
+        if (zone_id := self._zone_ids.get(timezone)) is None:
+            self.zones.append(timezone)
+            zone_id = self._zone_ids[timezone] = len(self.zones)
+        return zone_id
+
+    def _time(self, position: int) -> int:
+        """Return the time of the point at a position from the oldest."""
+        return self.times[(self._start + position) % self.capacity]
+
+    def _point(self, position: int) -> TrackPoint:
+        """Return the point at a position from the oldest."""
+        index = (self._start + position) % self.capacity
+        zone_id = self.zone_ids[index]
+        return TrackPoint(
+            self.times[index],
+            self.latitudes[index] / SCALE,
+            self.longitudes[index] / SCALE,
+            self.zones[zone_id - 1] if zone_id != _NO_ZONE else None,
+        )
+
+
+def load_trip_log(path: str) -> TripLog | None:
+    """Read a stored trip log, or return None if there isn't one."""
+    try:
+        with open(path, "rb") as file:
+            return TripLog.from_bytes(file.read())
+    except FileNotFoundError:
+        return None
+
+
+def save_trip_log(path: str, data: bytes) -> None:
+    """Write a trip log, replacing the stored one in one step."""
+    temporary = f"{path}.tmp"
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    with open(temporary, "wb") as file:
+        file.write(data)
+    os.replace(temporary, path)
+
+
+def _offset(start: TrackPoint, end: TrackPoint, point: TrackPoint) -> float:
+    """Return the distance in miles from a point to the line between two others."""
+    kx = math.cos(math.radians(point.latitude)) * MILES_PER_DEGREE
+    ax = _wrap(start.longitude - point.longitude) * kx
+    ay = (start.latitude - point.latitude) * MILES_PER_DEGREE
+    dx = _wrap(end.longitude - start.longitude) * kx
+    dy = (end.latitude - start.latitude) * MILES_PER_DEGREE
+    length_sq = dx * dx + dy * dy
+    t = 0.0
+    if length_sq:
+        t = min(max(-(ax * dx + ay * dy) / length_sq, 0.0), 1.0)
+    return math.hypot(ax + t * dx, ay + t * dy)
+
+
+def _wrap(lon: float) -> float:
+    """Wrap a longitude difference into [-180, 180)."""
+    return (lon + 180) % 360 - 180
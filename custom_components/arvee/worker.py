@@ -0,0 +1,172 @@
+"""Dedicated lookup worker for Arvee."""
+from __future__ import annotations
+
+import asyncio
+from collections import OrderedDict
+from collections.abc import Callable, Hashable
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass
+import logging
+from typing import Any
+
+from homeassistant.const import EVENT_HOMEASSISTANT_STOP
+from homeassistant.core import Event, HomeAssistant, callback
+
+from .metrics import Histogram
+
+_LOGGER = logging.getLogger(__name__)
+
+# Most jobs waiting for the worker before the oldest is dropped
+DEFAULT_QUEUE_SIZE = 64
+
+
+class LookupSuperseded(Exception):
+    """Raised for a queued job replaced or dropped before it ran."""
+
+
+@dataclass(slots=True)
+class _Job:
+    """A queued call and the future waiting for it."""
+
+    target: Callable[..., Any]
+    args: tuple[Any, ...]
+    future: asyncio.Future[Any]
+    queued: float
+
+
+class LookupWorker:
+    """Run lookups on Arvee's own thread instead of the shared executor.
+
+    Jobs queued while the worker is busy are run together as one batch,
+    with one hand-off to the thread and back. A job queued under the same
+    key as one still waiting replaces it, so only the latest position is
+    looked up.
+    """
+
+    def __init__(self, hass: HomeAssistant, max_queued: int = DEFAULT_QUEUE_SIZE) -> None:
+        """Initialize the worker."""
+        self.hass = hass
+        self.max_queued = max_queued
+        self.wait_time = Histogram()
+        self.jobs = 0
+        self.batches = 0
+        self.superseded = 0
+        self.dropped = 0
+        self.max_depth = 0
+        self._queue: OrderedDict[Hashable, _Job] = OrderedDict()
+        self._executor: ThreadPoolExecutor | None = None
+        self._busy = False
+
+    @property
+    def depth(self) -> int:
+        """Return the number of jobs waiting for the worker."""
+        return len(self._queue)
+
+    async def async_run(
+        self, target: Callable[..., Any], *args: Any, key: Hashable | None = None
+    ) -> Any:
+        """Run a job on the worker thread and return its result.
+
+        Raises LookupSuperseded if a newer job with the same key replaced
+        it, or it was dropped from a full queue, before it ran.
+        """
+        if key is None:
+            key = object()
+
+        if (previous := self._queue.pop(key, None)) is not None:
+            self.superseded += 1
+            _fail(previous, "superseded by a newer job")
+        elif len(self._queue) >= self.max_queued:
+            _, oldest = self._queue.popitem(last=False)
+            self.dropped += 1
+            _fail(oldest, "dropped from a full queue")
+
+        loop = self.hass.loop
+        job = _Job(target, args, loop.create_future(), loop.time())
+        self._queue[key] = job
+        self.max_depth = max(self.max_depth, len(self._queue))
+        self._async_start_batch()
+        return await job.future
+
+    @callback
+    def _async_start_batch(self) -> None:
+        """Hand everything queued to the worker thread if it's idle."""
+        if self._busy or not self._queue:
+            return
+
+        jobs = list(self._queue.values())
+        self._queue.clear()
+        now = self.hass.loop.time()
+        for job in jobs:
+            self.wait_time.add(now - job.queued)
+        self.jobs += len(jobs)
+        self.batches += 1
+
+        if self._executor is None:
+            self._executor = ThreadPoolExecutor(
+                max_workers=1, thread_name_prefix="arvee_lookup"
+            )
+            self.hass.bus.async_listen_once(
+                EVENT_HOMEASSISTANT_STOP, self._async_shutdown
+            )
+
+        self._busy = True
+        batch = self.hass.loop.run_in_executor(self._executor, _run_batch, jobs)
+        batch.add_done_callback(lambda _: self._async_finish_batch(jobs, batch))
+
+    @callback
+    def _async_finish_batch(
+        self, jobs: list[_Job], batch: asyncio.Future[list[tuple[bool, Any]]]
+    ) -> None:
+        """Deliver the results of a batch and start the next one."""
+        self._busy = False
+        if batch.cancelled() or batch.exception() is not None:
+            for job in jobs:
+                _fail(job, "worker stopped")
+        else:
+            for job, (ok, value) in zip(jobs, batch.result()):
+                if job.future.done():
+                    continue  # The caller went away
+                if ok:
+                    job.future.set_result(value)
+                else:
+                    job.future.set_exception(value)
+        self._async_start_batch()
+
+    async def _async_shutdown(self, event: Event) -> None:
+        """Stop the worker thread when Home Assistant stops."""
+        for job in self._queue.values():
+            _fail(job, "worker stopped")
+        self._queue.clear()
+        if (executor := self._executor) is not None:
+            self._executor = None
+            await self.hass.async_add_executor_job(executor.shutdown)
+
+    def as_dict(self) -> dict[str, Any]:
+        """Return worker statistics for diagnostics."""
+        return {
+            "depth": self.depth,
+            "max_depth": self.max_depth,
+            "jobs": self.jobs,
+            "batches": self.batches,
+            "superseded": self.superseded,
+            "dropped": self.dropped,
+            "wait_time": self.wait_time.as_dict(),
+        }
+
+
+def _run_batch(jobs: list[_Job]) -> list[tuple[bool, Any]]:
+    """Run a batch of jobs on the worker thread."""
+    results: list[tuple[bool, Any]] = []
+    for job in jobs:
+        try:
+            results.append((True, job.target(*job.args)))
+        except Exception as err:  # pylint: disable=broad-except
+            results.append((False, err))
+    return results
+
+
+def _fail(job: _Job, reason: str) -> None:
+    """Fail a job that won't run."""
+    if not job.future.done():
+        job.future.set_exception(LookupSuperseded(reason))
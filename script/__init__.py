@@ -0,0 +1 @@
+"""Offline data build tools for Arvee."""
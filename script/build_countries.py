@@ -0,0 +1,59 @@
+"""Build the table of the country each timezone is in.
+
+Run ``python -m script.build_countries`` to regenerate
+``custom_components/arvee/countries.json`` from the tz database's
+``zone.tab`` and ``iso3166.tab``, which list exactly one country for each
+zone. ``--tzdata DIR`` reads them from another copy of the database.
+"""
+from __future__ import annotations
+
+import argparse
+import json
+import os
+
+OUTPUT = os.path.join(
+    os.path.dirname(__file__), os.pardir, "custom_components", "arvee", "countries.json"
+)
+
+
+def _read_tab(path: str) -> list[list[str]]:
+    """Return the rows of a tz database table, without comments."""
+    with open(path, encoding="utf-8") as file:
+        return [
+            line.rstrip("\n").split("\t")
+            for line in file
+            if line.strip() and not line.startswith("#")
+        ]
+
+
+def main(argv: list[str] | None = None) -> None:
+    """Write the country table."""
+    parser = argparse.ArgumentParser(description=__doc__.split("\n")[0])
+    parser.add_argument(
+        "--tzdata", default="/usr/share/zoneinfo", help="tz database directory"
+    )
+    parser.add_argument("--output", default=OUTPUT, help="table to write")
+    args = parser.parse_args(argv)
+
+    countries = {
+        row[0]: row[1] for row in _read_tab(os.path.join(args.tzdata, "iso3166.tab"))
+    }
+    zones = {
+        row[2]: row[0] for row in _read_tab(os.path.join(args.tzdata, "zone.tab"))
+    }
+    with open(args.output, "w", encoding="utf-8") as file:
+        json.dump(
+            {
+                "countries": dict(sorted(countries.items())),
+                "zones": dict(sorted(zones.items())),
+            },
+            file,
+            indent=0,
+            ensure_ascii=False,
+        )
+        file.write("\n")
+    print(f"{len(zones)} zones in {len(set(zones.values()))} countries")
+
+
+if __name__ == "__main__":
+    main()
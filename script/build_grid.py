@@ -0,0 +1,111 @@
+"""Build a timezone grid and compare it with tzfpy.
+
+Run ``python -m script.build_grid OUTPUT`` to build a grid with the installed
+tzfpy and write it in its stored JSON form, and add ``--compare N`` to check
+it against tzfpy at N random points and report memory and lookup times.
+"""
+from __future__ import annotations
+
+import argparse
+from collections.abc import Callable
+import json
+import random
+import time
+from typing import Any
+
+from custom_components.arvee.boundary import parse_rings
+from custom_components.arvee.grid import (
+    WORLD,
+    TimezoneGrid,
+    build_grid,
+    tzfpy_version,
+)
+from custom_components.arvee.mapped import resident_size
+
+
+def _compare(
+    grid: TimezoneGrid, get_tz: Callable[[float, float], str | None], count: int
+) -> dict[str, Any]:
+    """Check a grid against tzfpy at random points and time both."""
+    south, west, north, east = grid.bounds
+    rng = random.Random(0)
+    points = [
+        (rng.uniform(south, north), rng.uniform(west, east)) for _ in range(count)
+    ]
+
+    start = time.perf_counter()
+    exact = [get_tz(lon, lat) for lat, lon in points]
+    exact_time = time.perf_counter() - start
+
+    start = time.perf_counter()
+    two_tier = [grid.lookup(lat, lon) or get_tz(lon, lat) for lat, lon in points]
+    grid_time = time.perf_counter() - start
+
+    return {
+        "points": count,
+        "mismatches": sum(a != b for a, b in zip(exact, two_tier)),
+        "grid_answered": sum(bool(grid.lookup(lat, lon)) for lat, lon in points),
+        "tzfpy_us": round(exact_time / count * 1e6, 3),
+        "two_tier_us": round(grid_time / count * 1e6, 3),
+    }
+
+
+def main(argv: list[str] | None = None) -> None:
+    """Build a grid with the installed tzfpy."""
+    parser = argparse.ArgumentParser(description=__doc__.split("\n")[0])
+    parser.add_argument("output", help="JSON file to write the grid to")
+    parser.add_argument(
+        "--resolution", type=float, default=0.25, help="cell size in degrees"
+    )
+    parser.add_argument(
+        "--bounds",
+        type=float,
+        nargs=4,
+        default=WORLD,
+        metavar=("SOUTH", "WEST", "NORTH", "EAST"),
+        help="area to cover, the whole world by default",
+    )
+    parser.add_argument(
+        "--compare",
+        type=int,
+        default=0,
+        metavar="N",
+        help="check against tzfpy at N random points",
+    )
+    args = parser.parse_args(argv)
+
+    before = resident_size()
+    import tzfpy  # pylint: disable=import-outside-toplevel
+
+    tzfpy.get_tz(0.0, 0.0)
+    after = resident_size()
+
+    start = time.perf_counter()
+    grid = build_grid(
+        args.resolution,
+        tzfpy.timezonenames(),
+        lambda name: parse_rings(tzfpy.get_tz_polygon_geojson(name)),
+        tzfpy.get_tzs,
+        tuple(args.bounds),
+        tzfpy_version(),
+    )
+    report: dict[str, Any] = {
+        "build_seconds": round(time.perf_counter() - start, 1),
+        "rows": grid.rows,
+        "cols": grid.cols,
+        "zones": len(grid.zones),
+        "border_cells": grid.border_cells,
+        "grid_bytes": grid.nbytes,
+        "tzfpy_bytes": None if before is None or after is None else after - before,
+    }
+
+    with open(args.output, "w", encoding="utf-8") as output:
+        json.dump(grid.as_dict(), output)
+
+    if args.compare:
+        report.update(_compare(grid, tzfpy.get_tz, args.compare))
+    print(json.dumps(report))
+
+
+if __name__ == "__main__":
+    main()
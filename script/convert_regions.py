@@ -0,0 +1,71 @@
+"""Convert state and province boundaries to a region data file.
+
+Run ``python -m script.convert_regions INPUT OUTPUT`` with a GeoJSON
+FeatureCollection of administrative areas, such as Natural Earth's
+admin-1 states and provinces, copy the file to the Home Assistant
+configuration directory and set it as Arvee's region data file. Each
+feature's ``--name`` property names its region.
+"""
+from __future__ import annotations
+
+import argparse
+import json
+import os
+import time
+
+from custom_components.arvee.boundary import parse_rings
+from custom_components.arvee.grid import WORLD
+from custom_components.arvee.mapped import MappedTimezoneData, write_timezone_data
+
+
+def main(argv: list[str] | None = None) -> None:
+    """Convert a GeoJSON file of regions."""
+    parser = argparse.ArgumentParser(description=__doc__.split("\n")[0])
+    parser.add_argument("input", help="GeoJSON FeatureCollection to read")
+    parser.add_argument("output", help="data file to write")
+    parser.add_argument(
+        "--name", default="name", help="feature property holding the region name"
+    )
+    parser.add_argument(
+        "--resolution", type=float, default=0.25, help="cell size in degrees"
+    )
+    parser.add_argument(
+        "--bounds",
+        type=float,
+        nargs=4,
+        default=WORLD,
+        metavar=("SOUTH", "WEST", "NORTH", "EAST"),
+        help="area to cover, the whole world by default",
+    )
+    args = parser.parse_args(argv)
+
+    with open(args.input, encoding="utf-8") as file:
+        features = json.load(file)["features"]
+
+    # Areas sharing a name, such as the parts of a split province, are merged
+    regions: dict[str, list[dict]] = {}
+    for feature in features:
+        if name := (feature.get("properties") or {}).get(args.name):
+            regions.setdefault(str(name), []).append(feature)
+
+    start = time.perf_counter()
+    write_timezone_data(
+        args.output,
+        args.resolution,
+        regions,
+        lambda name: parse_rings(json.dumps({"features": regions[name]})),
+        tuple(args.bounds),
+        os.path.basename(args.input),
+    )
+    data = MappedTimezoneData(args.output)
+    report = {
+        "regions": len(data.zones),
+        "convert_seconds": round(time.perf_counter() - start, 1),
+        "file_bytes": os.path.getsize(args.output),
+    }
+    data.close()
+    print(json.dumps(report))
+
+
+if __name__ == "__main__":
+    main()
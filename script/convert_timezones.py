@@ -0,0 +1,138 @@
+"""Convert tzfpy's timezone polygons to a memory-mapped data file.
+
+Run ``python -m script.convert_timezones OUTPUT`` on any machine with tzfpy
+installed, copy the file to the Home Assistant configuration directory and
+set it as Arvee's timezone data file. The report compares the resident
+memory of tzfpy with that of the mapped file after lookups around one
+place (``--around LAT LON``), and ``--compare N`` checks the file against
+tzfpy at N random points.
+"""
+from __future__ import annotations
+
+import argparse
+import json
+import os
+import random
+import time
+from typing import Any
+
+from custom_components.arvee.boundary import parse_rings
+from custom_components.arvee.grid import WORLD, tzfpy_version
+from custom_components.arvee.mapped import (
+    MappedTimezoneData,
+    resident_size,
+    write_timezone_data,
+)
+
+# Lookups made around --around, spread over this many degrees each way
+LOCAL_LOOKUPS = 1000
+LOCAL_SPREAD = 1.0
+
+
+def _compare(data: MappedTimezoneData, tzfpy: Any, count: int) -> dict[str, Any]:
+    """Check mapped lookups against tzfpy at random points and time both."""
+    south, west, north, east = data.bounds
+    rng = random.Random(0)
+    points = [
+        (rng.uniform(south, north), rng.uniform(west, east)) for _ in range(count)
+    ]
+
+    start = time.perf_counter()
+    exact = [tzfpy.get_tz(lon, lat) for lat, lon in points]
+    exact_time = time.perf_counter() - start
+
+    start = time.perf_counter()
+    mapped = [data.get_tz(lon, lat) for lat, lon in points]
+    mapped_time = time.perf_counter() - start
+
+    mismatches = [
+        (lat, lon)
+        for (lat, lon), a, b in zip(points, exact, mapped)
+        if a != b
+    ]
+    return {
+        "points": count,
+        "mismatches": len(mismatches),
+        # Where polygons overlap, tzfpy and the file may pick different zones
+        "overlap_mismatches": sum(
+            len(tzfpy.get_tzs(lon, lat)) > 1 for lat, lon in mismatches
+        ),
+        "tzfpy_us": round(exact_time / count * 1e6, 3),
+        "mapped_us": round(mapped_time / count * 1e6, 3),
+        "resident_after_compare": data.update_resident(),
+    }
+
+
+def main(argv: list[str] | None = None) -> None:
+    """Convert the installed tzfpy's data."""
+    parser = argparse.ArgumentParser(description=__doc__.split("\n")[0])
+    parser.add_argument("output", help="data file to write")
+    parser.add_argument(
+        "--resolution", type=float, default=0.25, help="cell size in degrees"
+    )
+    parser.add_argument(
+        "--bounds",
+        type=float,
+        nargs=4,
+        default=WORLD,
+        metavar=("SOUTH", "WEST", "NORTH", "EAST"),
+        help="area to cover, the whole world by default",
+    )
+    parser.add_argument(
+        "--around",
+        type=float,
+        nargs=2,
+        default=(39.74, -104.99),
+        metavar=("LAT", "LON"),
+        help="where to make the local lookups measured for resident memory",
+    )
+    parser.add_argument(
+        "--compare",
+        type=int,
+        default=0,
+        metavar="N",
+        help="check against tzfpy at N random points",
+    )
+    args = parser.parse_args(argv)
+
+    before = resident_size()
+    import tzfpy  # pylint: disable=import-outside-toplevel
+
+    tzfpy.get_tz(0.0, 0.0)
+    after = resident_size()
+
+    start = time.perf_counter()
+    write_timezone_data(
+        args.output,
+        args.resolution,
+        tzfpy.timezonenames(),
+        lambda name: parse_rings(tzfpy.get_tz_polygon_geojson(name)),
+        tuple(args.bounds),
+        tzfpy_version(),
+    )
+    report: dict[str, Any] = {
+        "convert_seconds": round(time.perf_counter() - start, 1),
+        "file_bytes": os.path.getsize(args.output),
+        "tzfpy_bytes": None if before is None or after is None else after - before,
+    }
+
+    data = MappedTimezoneData(args.output)
+    report["resident_opened"] = data.update_resident()
+
+    lat, lon = args.around
+    rng = random.Random(0)
+    for _ in range(LOCAL_LOOKUPS):
+        point_lat = lat + rng.uniform(-LOCAL_SPREAD, LOCAL_SPREAD)
+        point_lon = lon + rng.uniform(-LOCAL_SPREAD, LOCAL_SPREAD)
+        if timezone := data.get_tz(point_lon, point_lat):
+            data.safe_radius(point_lat, point_lon, timezone)
+    report["resident_local"] = data.update_resident()
+
+    if args.compare:
+        report.update(_compare(data, tzfpy, args.compare))
+    data.close()
+    print(json.dumps(report))
+
+
+if __name__ == "__main__":
+    main()
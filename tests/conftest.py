@@ -12,14 +12,29 @@ def auto_enable_custom_integrations(enable_custom_integrations):
     yield
 
 
+@pytest.fixture(autouse=True)
+def trip_log_dir(tmp_path):
+    """Write trip logs to a temporary directory rather than the test config."""
+    with patch(
+        "custom_components.arvee._track_path",
+        lambda hass, entry: str(tmp_path / f"arvee.track.{entry.entry_id}"),
+    ):
+        yield tmp_path
+
+
 @pytest.fixture
 def mock_tzfpy():
     """Mock tzfpy.get_tz function."""
     mock_get_tz = MagicMock(return_value="America/New_York")
     with patch.dict("sys.modules", {"tzfpy": MagicMock(get_tz=mock_get_tz)}):
-        with patch("custom_components.arvee.get_tz", mock_get_tz, create=True):
-            with patch("custom_components.arvee.TZFPY_AVAILABLE", True):
-                yield mock_get_tz
+        with patch("custom_components.arvee.resolver.get_tz", mock_get_tz, create=True):
+            with patch("custom_components.arvee.resolver.TZFPY_AVAILABLE", True):
+                with patch.multiple(
+                    "custom_components.arvee.resolver",
+                    get_tz_polygon_geojson=None,
+                    get_tzs=None,
+                ):
+                    yield mock_get_tz
 
 
 @pytest.fixture
@@ -0,0 +1,327 @@
+"""Replay recorded GPS traces through the Arvee location update pipeline.
+
+Traces are CSV files with ``timestamp,latitude,longitude[,accuracy]``
+columns or GPX track logs, optionally gzip compressed. Each fix is written
+to the latitude/longitude entities of a test Home Assistant instance whose
+event loop runs on a virtual clock driven by the trace timestamps, so
+interval based policies behave as they would on the road.
+
+Run ``python -m tests.replay TRACE [TRACE ...]`` to report on traces of any
+size, and add ``--update-baseline`` to record the counts in
+``tests/fixtures/traces/baselines.json``.
+"""
+from __future__ import annotations
+
+import argparse
+import asyncio
+from collections.abc import Iterator
+import csv
+from dataclasses import asdict, dataclass, field
+import gzip
+import io
+import json
+from pathlib import Path
+import time
+from typing import Any
+from unittest.mock import patch
+import xml.etree.ElementTree as ET
+
+from homeassistant.core import HomeAssistant
+from homeassistant.util import dt as dt_util
+from pytest_homeassistant_custom_component.common import MockConfigEntry
+
+from custom_components import arvee
+from custom_components.arvee import resolver as resolver_module
+from custom_components.arvee.const import (
+    CONF_LATITUDE_ENTITY,
+    CONF_LONGITUDE_ENTITY,
+    DOMAIN,
+)
+from custom_components.arvee.scheduler import LocationUpdateScheduler
+
+TRACES_DIR = Path(__file__).parent / "fixtures" / "traces"
+BASELINES = TRACES_DIR / "baselines.json"
+
+LAT_ENTITY = "sensor.replay_latitude"
+LON_ENTITY = "sensor.replay_longitude"
+
+# Degrees the replayed timezone grid extends past the trace
+GRID_MARGIN = 1.0
+
+# Counters that must not grow past the recorded baseline
+BASELINE_COUNTERS = ("events_scheduled", "updates", "get_tz_calls", "config_updates")
+
+
+@dataclass(frozen=True)
+class Fix:
+    """A single recorded GPS fix."""
+
+    timestamp: float
+    latitude: float
+    longitude: float
+    accuracy: float | None = None
+
+
+@dataclass
+class ReplayReport:
+    """Cost of replaying a trace."""
+
+    trace: str
+    fixes: int = 0
+    seconds: float = 0.0
+    events_scheduled: int = 0
+    updates: int = 0
+    get_tz_calls: int = 0
+    config_updates: int = 0
+    time_zones: list[str] = field(default_factory=list)
+    metrics: dict[str, Any] = field(default_factory=dict, repr=False)
+    latencies: list[float] = field(default_factory=list, repr=False)
+
+    @property
+    def fixes_per_second(self) -> float:
+        """Return the replay throughput."""
+        return self.fixes / self.seconds if self.seconds else 0.0
+
+    def percentile(self, pct: float) -> float:
+        """Return a per-fix latency percentile in milliseconds."""
+        if not self.latencies:
+            return 0.0
+        ordered = sorted(self.latencies)
+        index = min(len(ordered) - 1, round(pct / 100 * (len(ordered) - 1)))
+        return ordered[index] * 1000
+
+    def counters(self) -> dict[str, int]:
+        """Return the counters compared against baselines."""
+        return {name: getattr(self, name) for name in BASELINE_COUNTERS}
+
+    def as_dict(self) -> dict[str, Any]:
+        """Return the report as a dict for printing."""
+        result = asdict(self)
+        del result["latencies"]
+        del result["metrics"]
+        result["fixes_per_second"] = round(self.fixes_per_second, 1)
+        result["p50_ms"] = round(self.percentile(50), 3)
+        result["p99_ms"] = round(self.percentile(99), 3)
+        return result
+
+
+class VirtualClock:
+    """Event loop clock that only moves when the replay advances it."""
+
+    def __init__(self, start: float) -> None:
+        """Initialize the clock."""
+        self.now = start
+
+    def time(self) -> float:
+        """Return the current virtual time."""
+        return self.now
+
+
+def load_trace(path: Path) -> list[Fix]:
+    """Load a CSV or GPX trace, optionally gzip compressed."""
+    name = path.name
+    if name.endswith(".gz"):
+        text = gzip.decompress(path.read_bytes()).decode()
+        name = name[:-3]
+    else:
+        text = path.read_text()
+
+    if name.endswith(".gpx"):
+        return list(_parse_gpx(text))
+    return list(_parse_csv(text))
+
+
+def _parse_time(value: str) -> float:
+    """Parse an ISO timestamp or epoch seconds."""
+    try:
+        return float(value)
+    except ValueError:
+        parsed = dt_util.parse_datetime(value)
+        if parsed is None:
+            raise ValueError(f"Invalid timestamp: {value}") from None
+        return parsed.timestamp()
+
+
+def _parse_csv(text: str) -> Iterator[Fix]:
+    """Parse fixes from CSV text."""
+    for row in csv.DictReader(io.StringIO(text)):
+        accuracy = row.get("accuracy")
+        yield Fix(
+            _parse_time(row["timestamp"]),
+            float(row["latitude"]),
+            float(row["longitude"]),
+            float(accuracy) if accuracy else None,
+        )
+
+
+def _parse_gpx(text: str) -> Iterator[Fix]:
+    """Parse track points from GPX text."""
+    for element in ET.fromstring(text).iter():
+        if not element.tag.endswith("trkpt"):
+            continue
+        timestamp = next(
+            (child.text for child in element if child.tag.endswith("time")), None
+        )
+        if timestamp is None:
+            continue
+        yield Fix(
+            _parse_time(timestamp),
+            float(element.attrib["lat"]),
+            float(element.attrib["lon"]),
+        )
+
+
+async def async_replay(
+    hass: HomeAssistant,
+    fixes: list[Fix],
+    name: str = "trace",
+    options: dict[str, Any] | None = None,
+) -> ReplayReport:
+    """Replay fixes through a freshly set up Arvee entry."""
+    report = ReplayReport(name)
+    if not fixes:
+        return report
+
+    # Make sure tzfpy is loaded before timing starts
+    await hass.async_add_executor_job(resolver_module._load_tzfpy)
+
+    real_get_tz = resolver_module.get_tz
+    real_schedule = LocationUpdateScheduler.async_schedule
+    real_config_update = hass.config.async_update
+    real_process = arvee._async_process_location_update
+
+    def counting_get_tz(lon: float, lat: float) -> str | None:
+        report.get_tz_calls += 1
+        return real_get_tz(lon, lat)
+
+    def counting_schedule(scheduler: LocationUpdateScheduler) -> None:
+        report.events_scheduled += 1
+        real_schedule(scheduler)
+
+    async def counting_config_update(**kwargs: Any) -> None:
+        report.config_updates += 1
+        if "time_zone" in kwargs:
+            report.time_zones.append(kwargs["time_zone"])
+        await real_config_update(**kwargs)
+
+    async def counting_process(*args: Any) -> None:
+        report.updates += 1
+        await real_process(*args)
+
+    hass.states.async_set(LAT_ENTITY, str(fixes[0].latitude))
+    hass.states.async_set(LON_ENTITY, str(fixes[0].longitude))
+
+    entry = MockConfigEntry(
+        domain=DOMAIN,
+        data={CONF_LATITUDE_ENTITY: LAT_ENTITY, CONF_LONGITUDE_ENTITY: LON_ENTITY},
+        options=options or {},
+    )
+    entry.add_to_hass(hass)
+
+    # Build the timezone grid over the trace only, which takes a moment
+    # where the whole world would take seconds
+    resolver = arvee._async_get_resolver(hass)
+    resolver.grid_bounds = (
+        min(fix.latitude for fix in fixes) - GRID_MARGIN,
+        min(fix.longitude for fix in fixes) - GRID_MARGIN,
+        max(fix.latitude for fix in fixes) + GRID_MARGIN,
+        max(fix.longitude for fix in fixes) + GRID_MARGIN,
+    )
+
+    clock = VirtualClock(hass.loop.time())
+    offset = clock.now - fixes[0].timestamp
+
+    with patch.object(hass.loop, "time", clock.time), patch.object(
+        resolver_module, "get_tz", counting_get_tz
+    ), patch.object(
+        LocationUpdateScheduler, "async_schedule", counting_schedule
+    ), patch.object(
+        hass.config, "async_update", counting_config_update
+    ), patch.object(
+        arvee, "_async_process_location_update", counting_process
+    ), patch.object(
+        arvee, "UPDATE_SETTLE_TIME", 0
+    ):
+        await hass.config_entries.async_setup(entry.entry_id)
+        await hass.async_block_till_done()
+        if resolver._grid_task is not None:
+            await resolver._grid_task
+
+        start = time.perf_counter()
+        for fix in fixes:
+            # Let timers that came due since the last fix run first
+            clock.now = max(clock.now, fix.timestamp + offset)
+            await asyncio.sleep(0)
+
+            fix_start = time.perf_counter()
+            hass.states.async_set(LAT_ENTITY, str(fix.latitude))
+            hass.states.async_set(LON_ENTITY, str(fix.longitude))
+            await hass.async_block_till_done()
+            report.latencies.append(time.perf_counter() - fix_start)
+
+        report.seconds = time.perf_counter() - start
+        report.fixes = len(fixes)
+        report.metrics = hass.data[DOMAIN][entry.entry_id]["metrics"].as_dict()
+
+        await hass.config_entries.async_unload(entry.entry_id)
+        await hass.async_block_till_done()
+
+    await hass.config_entries.async_remove(entry.entry_id)
+    return report
+
+
+def load_baselines() -> dict[str, dict[str, int]]:
+    """Return the recorded baseline counters per trace."""
+    if not BASELINES.exists():
+        return {}
+    return json.loads(BASELINES.read_text())
+
+
+def save_baselines(reports: list[ReplayReport]) -> None:
+    """Record report counters as the new baselines."""
+    baselines = load_baselines()
+    for report in reports:
+        baselines[report.trace] = report.counters()
+    BASELINES.write_text(json.dumps(baselines, indent=2, sort_keys=True) + "\n")
+
+
+async def _async_main(args: argparse.Namespace) -> list[ReplayReport]:
+    """Replay the requested traces in a test Home Assistant instance."""
+    from homeassistant import loader
+    from pytest_homeassistant_custom_component.common import (
+        async_test_home_assistant,
+        mock_storage,
+    )
+
+    reports = []
+    with mock_storage():
+        async with async_test_home_assistant() as hass:
+            # Load Arvee from custom_components
+            hass.data.pop(loader.DATA_CUSTOM_COMPONENTS)
+            for path in args.traces:
+                fixes = load_trace(Path(path))
+                reports.append(await async_replay(hass, fixes, Path(path).name))
+            await hass.async_stop(force=True)
+    return reports
+
+
+def main() -> None:
+    """Replay traces from the command line and print their reports."""
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("traces", nargs="+", help="CSV or GPX trace files")
+    parser.add_argument(
+        "--update-baseline",
+        action="store_true",
+        help="record the counters as the new baselines",
+    )
+    args = parser.parse_args()
+
+    reports = asyncio.run(_async_main(args))
+    for report in reports:
+        print(json.dumps(report.as_dict()))
+    if args.update_baseline:
+        save_baselines(reports)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,101 @@
+"""Test timezone boundary distance helpers."""
+import json
+from unittest.mock import patch
+
+import pytest
+
+from homeassistant.core import HomeAssistant
+
+from custom_components.arvee import _haversine_miles
+from custom_components.arvee.boundary import (
+    SAFETY_FACTOR,
+    distance_to_rings,
+    parse_rings,
+    safe_radius,
+)
+from custom_components.arvee.resolver import TimezoneResolver
+
+# One degree square around the origin
+SQUARE = json.dumps({
+    "type": "FeatureCollection",
+    "features": [{
+        "type": "Feature",
+        "properties": {"tzid": "Etc/Test"},
+        "geometry": {
+            "type": "MultiPolygon",
+            "coordinates": [[[[-1, -1], [1, -1], [1, 1], [-1, 1], [-1, -1]]]],
+        },
+    }],
+})
+
+
+class TestBoundaryDistance:
+    """Test distance to polygon edges."""
+
+    def test_parse_rings(self):
+        """Test rings are flattened to lon/lat arrays."""
+        rings = parse_rings(SQUARE)
+        assert len(rings) == 1
+        assert list(rings[0][:4]) == [-1, -1, 1, -1]
+
+    def test_distance_from_center(self):
+        """Test the center of the square is one degree from each edge."""
+        distance = distance_to_rings(parse_rings(SQUARE), 0.0, 0.0)
+        assert distance == pytest.approx(_haversine_miles(0, 0, 1, 0), rel=1e-3)
+
+    def test_distance_near_edge(self):
+        """Test the nearest edge decides the distance."""
+        distance = distance_to_rings(parse_rings(SQUARE), 0.0, 0.9)
+        assert distance == pytest.approx(_haversine_miles(0, 0.9, 0, 1), rel=1e-3)
+
+    def test_antimeridian_wraps(self):
+        """Test longitudes are compared across the antimeridian."""
+        ring = parse_rings(json.dumps({
+            "features": [{
+                "geometry": {
+                    "type": "Polygon",
+                    "coordinates": [[[179, -1], [-179, -1], [-179, 1], [179, 1], [179, -1]]],
+                },
+            }],
+        }))
+        distance = distance_to_rings(ring, 0.0, 180.0)
+        assert distance == pytest.approx(_haversine_miles(0, 0, 0, 1), rel=1e-3)
+
+    def test_safe_radius_margin(self):
+        """Test the safe radius stays inside the measured distance."""
+        rings = parse_rings(SQUARE)
+        assert safe_radius(rings, 0.0, 0.0) == pytest.approx(
+            distance_to_rings(rings, 0.0, 0.0) * SAFETY_FACTOR
+        )
+
+    def test_no_rings(self):
+        """Test an empty polygon has no distance."""
+        assert distance_to_rings([], 0.0, 0.0) is None
+
+
+@pytest.mark.asyncio
+class TestSafeZone:
+    """Test safe zones from the resolver."""
+
+    async def test_safe_zone(self, hass: HomeAssistant):
+        """Test the resolver builds a safe zone from polygon data."""
+        resolver = TimezoneResolver(hass)
+        with patch(
+            "custom_components.arvee.resolver.get_tz_polygon_geojson",
+            return_value=SQUARE,
+        ):
+            safe_zone = await resolver.async_get_safe_zone(0.0, 0.5, "Etc/Test")
+
+        assert safe_zone.timezone == "Etc/Test"
+        assert safe_zone.radius == pytest.approx(
+            _haversine_miles(0, 0.5, 0, 1) * SAFETY_FACTOR, rel=1e-3
+        )
+
+    async def test_unknown_timezone(self, hass: HomeAssistant):
+        """Test an unknown timezone has no safe zone."""
+        resolver = TimezoneResolver(hass)
+        with patch(
+            "custom_components.arvee.resolver.get_tz_polygon_geojson",
+            side_effect=ValueError("unknown timezone"),
+        ):
+            assert await resolver.async_get_safe_zone(0.0, 0.0, "Etc/Nope") is None
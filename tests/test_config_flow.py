@@ -11,28 +11,47 @@ from custom_components.arvee.const import (
     DOMAIN,
     CONF_LATITUDE_ENTITY,
     CONF_LONGITUDE_ENTITY,
+    CONF_TRACKER_ENTITY,
     CONF_UPDATE_THRESHOLD,
+    CONF_MODE,
+    CONF_FLEET_TRACKERS,
+    MODE_FLEET,
 )
 
 
+async def _async_start_flow(hass: HomeAssistant, source: str) -> dict:
+    """Start a config flow and pick a GPS source from the menu."""
+    result = await hass.config_entries.flow.async_init(
+        DOMAIN, context={"source": config_entries.SOURCE_USER}
+    )
+    return await hass.config_entries.flow.async_configure(
+        result["flow_id"], {"next_step_id": source}
+    )
+
+
 @pytest.mark.asyncio
 class TestConfigFlow:
     """Test the config flow."""
 
-    async def test_form(self, hass: HomeAssistant, mock_gps_entities):
-        """Test we get the form."""
+    async def test_menu(self, hass: HomeAssistant):
+        """Test we're asked for the kind of GPS source."""
         result = await hass.config_entries.flow.async_init(
             DOMAIN, context={"source": config_entries.SOURCE_USER}
         )
-        assert result["type"] == FlowResultType.FORM
+        assert result["type"] == FlowResultType.MENU
         assert result["step_id"] == "user"
+        assert result["menu_options"] == ["entities", "tracker", "fleet"]
+
+    async def test_form(self, hass: HomeAssistant, mock_gps_entities):
+        """Test we get the form."""
+        result = await _async_start_flow(hass, "entities")
+        assert result["type"] == FlowResultType.FORM
+        assert result["step_id"] == "entities"
         assert result["errors"] == {}
 
     async def test_form_valid_input(self, hass: HomeAssistant, mock_gps_entities, mock_tzfpy):
         """Test form with valid input creates entry."""
-        result = await hass.config_entries.flow.async_init(
-            DOMAIN, context={"source": config_entries.SOURCE_USER}
-        )
+        result = await _async_start_flow(hass, "entities")
 
         result = await hass.config_entries.flow.async_configure(
             result["flow_id"],
@@ -53,9 +72,7 @@ class TestConfigFlow:
 
     async def test_form_entity_not_found(self, hass: HomeAssistant):
         """Test form with non-existent entity shows error."""
-        result = await hass.config_entries.flow.async_init(
-            DOMAIN, context={"source": config_entries.SOURCE_USER}
-        )
+        result = await _async_start_flow(hass, "entities")
 
         result = await hass.config_entries.flow.async_configure(
             result["flow_id"],
@@ -72,9 +89,7 @@ class TestConfigFlow:
 
     async def test_form_invalid_latitude(self, hass: HomeAssistant, mock_gps_entities_invalid):
         """Test form with invalid latitude value shows error."""
-        result = await hass.config_entries.flow.async_init(
-            DOMAIN, context={"source": config_entries.SOURCE_USER}
-        )
+        result = await _async_start_flow(hass, "entities")
 
         result = await hass.config_entries.flow.async_configure(
             result["flow_id"],
@@ -89,10 +104,59 @@ class TestConfigFlow:
         assert result["errors"][CONF_LATITUDE_ENTITY] == "invalid_latitude"
 
     async def test_already_configured(self, hass: HomeAssistant, mock_gps_entities, mock_tzfpy):
-        """Test we abort if already configured."""
-        result = await hass.config_entries.flow.async_init(
-            DOMAIN, context={"source": config_entries.SOURCE_USER}
+        """Test we abort a second entry following one vehicle."""
+        result = await _async_start_flow(hass, "entities")
+        await hass.config_entries.flow.async_configure(
+            result["flow_id"],
+            {
+                CONF_LATITUDE_ENTITY: "sensor.test_latitude",
+                CONF_LONGITUDE_ENTITY: "sensor.test_longitude",
+                CONF_UPDATE_THRESHOLD: 10.0,
+            },
+        )
+
+        result = await _async_start_flow(hass, "tracker")
+        assert result["type"] == FlowResultType.ABORT
+        assert result["reason"] == "already_configured"
+
+    async def test_tracker(self, hass: HomeAssistant, mock_tzfpy):
+        """Test a device tracker can be the only GPS source."""
+        hass.states.async_set(
+            "device_tracker.rv",
+            "not_home",
+            {"latitude": 40.7128, "longitude": -74.0060, "gps_accuracy": 5},
+        )
+        result = await _async_start_flow(hass, "tracker")
+        assert result["type"] == FlowResultType.FORM
+        assert result["step_id"] == "tracker"
+
+        result = await hass.config_entries.flow.async_configure(
+            result["flow_id"],
+            {CONF_TRACKER_ENTITY: "device_tracker.rv", CONF_UPDATE_THRESHOLD: 10.0},
+        )
+
+        assert result["type"] == FlowResultType.CREATE_ENTRY
+        assert result["data"] == {
+            CONF_TRACKER_ENTITY: "device_tracker.rv",
+            CONF_UPDATE_THRESHOLD: 10.0,
+        }
+
+    async def test_tracker_without_coordinates(self, hass: HomeAssistant):
+        """Test a tracker without GPS attributes shows an error."""
+        hass.states.async_set("device_tracker.phone", "home", {"source_type": "router"})
+        result = await _async_start_flow(hass, "tracker")
+
+        result = await hass.config_entries.flow.async_configure(
+            result["flow_id"],
+            {CONF_TRACKER_ENTITY: "device_tracker.phone", CONF_UPDATE_THRESHOLD: 10.0},
         )
+
+        assert result["type"] == FlowResultType.FORM
+        assert result["errors"][CONF_TRACKER_ENTITY] == "invalid_tracker"
+
+    async def test_fleet(self, hass: HomeAssistant, mock_gps_entities, mock_tzfpy):
+        """Test a fleet can be added next to the vehicle entry."""
+        result = await _async_start_flow(hass, "entities")
         await hass.config_entries.flow.async_configure(
             result["flow_id"],
             {
@@ -101,12 +165,35 @@ class TestConfigFlow:
                 CONF_UPDATE_THRESHOLD: 10.0,
             },
         )
+        hass.states.async_set("device_tracker.trailer", "not_home")
 
-        result = await hass.config_entries.flow.async_init(
-            DOMAIN, context={"source": config_entries.SOURCE_USER}
+        result = await _async_start_flow(hass, "fleet")
+        assert result["type"] == FlowResultType.FORM
+        assert result["step_id"] == "fleet"
+
+        result = await hass.config_entries.flow.async_configure(
+            result["flow_id"], {CONF_FLEET_TRACKERS: ["device_tracker.trailer"]}
         )
+
+        assert result["type"] == FlowResultType.CREATE_ENTRY
+        assert result["data"] == {
+            CONF_MODE: MODE_FLEET,
+            CONF_FLEET_TRACKERS: ["device_tracker.trailer"],
+        }
+
+        result = await _async_start_flow(hass, "fleet")
         assert result["type"] == FlowResultType.ABORT
-        assert result["reason"] == "already_configured"
+
+    async def test_fleet_tracker_not_found(self, hass: HomeAssistant):
+        """Test a fleet needs existing trackers."""
+        result = await _async_start_flow(hass, "fleet")
+
+        result = await hass.config_entries.flow.async_configure(
+            result["flow_id"], {CONF_FLEET_TRACKERS: ["device_tracker.missing"]}
+        )
+
+        assert result["type"] == FlowResultType.FORM
+        assert result["errors"][CONF_FLEET_TRACKERS] == "entity_not_found"
 
 
 @pytest.mark.asyncio
@@ -115,9 +202,7 @@ class TestOptionsFlow:
 
     async def test_options_flow(self, hass: HomeAssistant, mock_gps_entities, mock_tzfpy):
         """Test options flow."""
-        result = await hass.config_entries.flow.async_init(
-            DOMAIN, context={"source": config_entries.SOURCE_USER}
-        )
+        result = await _async_start_flow(hass, "entities")
         result = await hass.config_entries.flow.async_configure(
             result["flow_id"],
             {
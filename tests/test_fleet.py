@@ -0,0 +1,146 @@
+"""Test fleet mode."""
+from unittest.mock import patch
+
+import pytest
+
+from homeassistant.core import HomeAssistant
+from pytest_homeassistant_custom_component.common import MockConfigEntry
+
+from custom_components.arvee.const import (
+    CONF_FLEET_TRACKERS,
+    CONF_MODE,
+    DATA_RESOLVER,
+    DOMAIN,
+    FLEET_UNIQUE_ID,
+    MODE_FLEET,
+)
+from custom_components.arvee.diagnostics import async_get_config_entry_diagnostics
+
+_TRACKERS = ["device_tracker.truck", "device_tracker.trailer", "device_tracker.van"]
+
+
+def _get_tz(lon: float, lat: float) -> str:
+    """Return a timezone that changes at 101.5 degrees west."""
+    return "America/Denver" if lon < -101.5 else "America/Chicago"
+
+
+def _set_position(hass: HomeAssistant, entity_id: str, lat: float, lon: float, **attributes) -> None:
+    """Report a tracker's position."""
+    hass.states.async_set(
+        entity_id, "not_home", {"latitude": lat, "longitude": lon, **attributes}
+    )
+
+
+async def _setup_fleet(hass: HomeAssistant) -> MockConfigEntry:
+    """Set up a fleet of three trackers, two of them parked together."""
+    _set_position(hass, _TRACKERS[0], 39.74, -104.99)
+    _set_position(hass, _TRACKERS[1], 39.74, -104.99)
+    _set_position(hass, _TRACKERS[2], 39.10, -94.58)
+    entry = MockConfigEntry(
+        domain=DOMAIN,
+        title="Arvee Fleet",
+        unique_id=FLEET_UNIQUE_ID,
+        data={CONF_MODE: MODE_FLEET, CONF_FLEET_TRACKERS: _TRACKERS},
+    )
+    entry.add_to_hass(hass)
+    with patch("custom_components.arvee.fleet.FLEET_BATCH_WINDOW", 0.01):
+        assert await hass.config_entries.async_setup(entry.entry_id)
+        await hass.async_block_till_done()
+    return entry
+
+
+@pytest.mark.asyncio
+class TestFleet:
+    """Test following the timezones of many trackers."""
+
+    async def test_sensors(self, hass: HomeAssistant, mock_tzfpy):
+        """Test each tracker gets a timezone sensor in one batch."""
+        mock_tzfpy.side_effect = _get_tz
+        original_tz = hass.config.time_zone
+
+        with patch.object(hass.config, "async_update") as mock_update:
+            entry = await _setup_fleet(hass)
+
+        assert hass.states.get("sensor.arvee_fleet_truck_timezone").state == "America/Denver"
+        assert hass.states.get("sensor.arvee_fleet_trailer_timezone").state == "America/Denver"
+        assert hass.states.get("sensor.arvee_fleet_van_timezone").state == "America/Chicago"
+        mock_update.assert_not_called()
+        assert hass.config.time_zone == original_tz
+
+        fleet = hass.data[DOMAIN][entry.entry_id]["fleet"]
+        assert fleet.metrics.updates == 1
+        # The two parked trackers share one lookup
+        assert mock_tzfpy.call_count == 2
+        assert hass.data[DATA_RESOLVER].lookups == 1
+
+    async def test_fixes_batched(self, hass: HomeAssistant, mock_tzfpy):
+        """Test fixes arriving together are resolved in one batch, latest first."""
+        mock_tzfpy.side_effect = _get_tz
+        entry = await _setup_fleet(hass)
+        fleet = hass.data[DOMAIN][entry.entry_id]["fleet"]
+        mock_tzfpy.reset_mock()
+
+        with patch.object(fleet._scheduler, "settle", 0.01):
+            _set_position(hass, _TRACKERS[0], 39.5, -102.0)
+            _set_position(hass, _TRACKERS[0], 39.4, -100.0)
+            _set_position(hass, _TRACKERS[2], 39.2, -96.0)
+            await hass.async_block_till_done()
+
+        assert fleet.metrics.updates == 2
+        assert fleet.largest_batch == 3
+        assert hass.states.get("sensor.arvee_fleet_truck_timezone").state == "America/Chicago"
+        # Only the latest fix of the truck was looked up
+        assert mock_tzfpy.call_count == 2
+
+    async def test_hundreds_of_trackers(self, hass: HomeAssistant, mock_tzfpy):
+        """Test a fleet reporting at once needs one worker job."""
+        entry = await _setup_fleet(hass)
+        fleet = hass.data[DOMAIN][entry.entry_id]["fleet"]
+        trackers = [f"device_tracker.trailer_{index}" for index in range(200)]
+        fleet.trackers = trackers
+        await fleet.async_stop()
+        fleet.async_start()
+        worker = hass.data[DATA_RESOLVER].worker
+        jobs = worker.jobs
+
+        with patch.object(fleet._scheduler, "settle", 0.01):
+            for index, entity_id in enumerate(trackers):
+                _set_position(hass, entity_id, 35 + index / 100, -100 - index / 100)
+            await hass.async_block_till_done()
+
+        assert fleet.largest_batch == 200
+        assert worker.jobs == jobs + 1
+        assert len(fleet.timezones) == 203
+
+    async def test_attribute_change_ignored(self, hass: HomeAssistant, mock_tzfpy):
+        """Test a tracker that reports without moving isn't looked up again."""
+        entry = await _setup_fleet(hass)
+        fleet = hass.data[DOMAIN][entry.entry_id]["fleet"]
+
+        _set_position(hass, _TRACKERS[1], 39.74, -104.99, battery_level=80)
+        await hass.async_block_till_done()
+
+        assert fleet.metrics.events_dropped == 1
+        assert fleet.metrics.updates == 1
+
+    async def test_unload(self, hass: HomeAssistant, mock_tzfpy):
+        """Test unloading stops following the trackers."""
+        entry = await _setup_fleet(hass)
+        fleet = hass.data[DOMAIN][entry.entry_id]["fleet"]
+
+        assert await hass.config_entries.async_unload(entry.entry_id)
+        _set_position(hass, _TRACKERS[0], 39.5, -102.0)
+        await hass.async_block_till_done()
+
+        assert fleet.metrics.events_received == 0
+
+    async def test_diagnostics(self, hass: HomeAssistant, mock_tzfpy):
+        """Test fleet diagnostics hold counts, not positions."""
+        mock_tzfpy.side_effect = _get_tz
+        entry = await _setup_fleet(hass)
+
+        result = await async_get_config_entry_diagnostics(hass, entry)
+
+        assert result["fleet"]["trackers"] == 3
+        assert result["fleet"]["timezones"] == 2
+        assert result["metrics"]["updates"] == 1
@@ -0,0 +1,117 @@
+"""Test the Arvee movement gate."""
+import pytest
+
+from custom_components.arvee import _haversine_miles
+from custom_components.arvee.boundary import MILES_PER_DEGREE, SafeZone
+from custom_components.arvee.gate import MAX_THRESHOLD_SCALE, MovementGate
+
+
+def _drive(gate: MovementGate, lat: float, lon: float, mph: float, seconds: int) -> tuple[float, float]:
+    """Feed the gate one fix per second heading north, returning the last one."""
+    step = mph / 3600 / MILES_PER_DEGREE
+    now = 0.0
+    for _ in range(seconds):
+        gate.observe(lat, lon, now)
+        lat += step
+        now += 1
+    return lat, lon
+
+
+class TestMovementGate:
+    """Test accepting fixes."""
+
+    def test_first_fix(self):
+        """Test the first fix is judged against the base threshold."""
+        gate = MovementGate(10.0)
+        gate.set_anchor(40.0, -105.0)
+        gate.observe(40.1, -105.0, 0)
+
+        assert not gate.accept(40.1, -105.0)
+        assert gate.accept(41.0, -105.0)
+
+    def test_distance_matches_haversine(self):
+        """Test the anchored distance agrees with the haversine distance."""
+        gate = MovementGate(10.0)
+        gate.set_anchor(45.0, -100.0)
+        # Right at the threshold east of the anchor
+        lon = -100.0 + 10.02 / _haversine_miles(45.0, -100.0, 45.0, -99.0)
+        gate.observe(45.0, lon, 0)
+
+        assert gate.accept(45.0, lon)
+        assert not gate.accept(45.0, -100.0 + 9.98 / _haversine_miles(45.0, -100.0, 45.0, -99.0))
+
+    def test_antimeridian(self):
+        """Test distances wrap around the antimeridian."""
+        gate = MovementGate(10.0)
+        gate.set_anchor(0.0, 179.99)
+        gate.observe(0.0, -179.99, 0)
+
+        assert not gate.accept(0.0, -179.99)
+
+    def test_speed(self):
+        """Test speed is estimated from recent fixes."""
+        gate = MovementGate(10.0)
+        _drive(gate, 40.0, -105.0, 60, 300)
+
+        assert gate.moving
+        assert gate.speed == pytest.approx(60, rel=0.05)
+
+    def test_threshold_scales_with_speed(self):
+        """Test the threshold grows at highway speed, up to a limit."""
+        gate = MovementGate(10.0)
+        _drive(gate, 40.0, -105.0, 60, 300)
+        assert gate.threshold == pytest.approx(20, rel=0.05)
+
+        _drive(gate, 40.0, -105.0, 200, 300)
+        assert gate.threshold == 10.0 * MAX_THRESHOLD_SCALE
+
+    def test_parking_hysteresis(self):
+        """Test slowing down doesn't flip between moving and parked."""
+        gate = MovementGate(10.0)
+        _drive(gate, 40.0, -105.0, 10, 300)
+        assert gate.moving
+
+        # Between the parked and moving speeds keeps the current state
+        _drive(gate, 40.0, -105.0, 3, 600)
+        assert gate.moving
+
+        _drive(gate, 40.0, -105.0, 0, 600)
+        assert not gate.moving
+
+    def test_parked_drift(self):
+        """Test slow drift and jitter while parked don't open the gate."""
+        gate = MovementGate(0.1)
+        gate.set_anchor(40.0, -105.0)
+        # 0.2 miles of drift over two hours, with 20 m of jitter on top
+        drift = 0.2 / MILES_PER_DEGREE / 7200
+        jitter = 0.0125 / MILES_PER_DEGREE
+        for second in range(7200):
+            lat = 40.0 + second * drift + (jitter if second % 2 else -jitter)
+            gate.observe(lat, -105.0, second)
+
+        assert not gate.moving
+        assert not gate.accept(lat, -105.0)
+
+    def test_parked_wakes_past_margin(self):
+        """Test a parked vehicle wakes half a mile past the threshold, not three times it."""
+        gate = MovementGate(10.0)
+        gate.set_anchor(40.0, -105.0)
+        _drive(gate, 40.0, -105.0, 0, 600)
+        assert not gate.moving
+
+        assert not gate.accept(40.0 + 10.3 / MILES_PER_DEGREE, -105.0)
+        assert gate.accept(40.0 + 10.6 / MILES_PER_DEGREE, -105.0)
+
+    def test_leaving_safe_zone(self):
+        """Test leaving the safe zone opens the gate below the threshold."""
+        gate = MovementGate(10.0)
+        gate.set_anchor(40.0, -105.0)
+        gate.set_safe_zone(SafeZone(40.0, -105.0, 1.0, "America/Denver"))
+        gate.observe(40.0, -105.0, 0)
+
+        inside = 40.0 + 0.9 / MILES_PER_DEGREE
+        outside = 40.0 + 1.1 / MILES_PER_DEGREE
+        assert gate.in_safe_zone(inside, -105.0)
+        assert not gate.accept(inside, -105.0)
+        assert not gate.in_safe_zone(outside, -105.0)
+        assert gate.accept(outside, -105.0)
@@ -0,0 +1,35 @@
+"""Test distance helpers."""
+from unittest.mock import patch
+
+import pytest
+
+from custom_components.arvee import geo
+from custom_components.arvee.geo import consecutive_miles, haversine_miles
+
+LATS = [40.7128, 41.8781, 34.0522]
+LONS = [-74.0060, -87.6298, -118.2437]
+
+
+class TestConsecutiveMiles:
+    """Test consecutive distances along a list of points."""
+
+    def test_matches_haversine(self):
+        """Test each distance matches the scalar haversine."""
+        distances = consecutive_miles(LATS, LONS)
+
+        assert distances[0] == 0.0
+        for i in range(1, len(LATS)):
+            assert distances[i] == pytest.approx(
+                haversine_miles(LATS[i - 1], LONS[i - 1], LATS[i], LONS[i])
+            )
+
+    def test_without_numpy(self):
+        """Test the pure Python fallback gives the same result."""
+        expected = consecutive_miles(LATS, LONS)
+        with patch.object(geo, "np", None):
+            assert consecutive_miles(LATS, LONS) == pytest.approx(expected)
+
+    def test_short_lists(self):
+        """Test empty and single point lists."""
+        assert consecutive_miles([], []) == []
+        assert consecutive_miles([1.0], [2.0]) == [0.0]
@@ -0,0 +1,230 @@
+"""Test the precomputed timezone grid."""
+from array import array
+import random
+from unittest.mock import patch
+
+import pytest
+
+from homeassistant.core import HomeAssistant
+from pytest_homeassistant_custom_component.common import MockConfigEntry
+
+from custom_components.arvee import resolver as resolver_module
+from custom_components.arvee.boundary import parse_rings
+from custom_components.arvee.const import (
+    CONF_LATITUDE_ENTITY,
+    CONF_LONGITUDE_ENTITY,
+    DATA_RESOLVER,
+    DOMAIN,
+)
+from custom_components.arvee.grid import GridBuilder, TimezoneGrid, build_grid
+from custom_components.arvee.resolver import TimezoneResolver
+
+# Two zones meeting along the prime meridian
+_SQUARES = {
+    "Etc/GMT+1": array("d", [-2, -2, 0, -2, 0, 2, -2, 2, -2, -2]),
+    "Etc/GMT-1": array("d", [0, -2, 2, -2, 2, 2, 0, 2, 0, -2]),
+}
+
+
+def _get_tzs(lon: float, lat: float) -> list[str]:
+    """Return the zones of the two squares at a coordinate."""
+    return ["Etc/GMT+1" if lon < 0 else "Etc/GMT-1"]
+
+
+def _build(resolution: float = 0.5) -> TimezoneGrid:
+    """Build a grid over the two squares."""
+    return build_grid(
+        resolution,
+        _SQUARES,
+        lambda name: [_SQUARES[name]],
+        _get_tzs,
+        (-1.0, -1.0, 1.0, 1.0),
+    )
+
+
+class TestTimezoneGrid:
+    """Test building and reading grids."""
+
+    def test_border_cells(self):
+        """Test only the cells a border touches need an exact lookup."""
+        grid = _build()
+
+        assert (grid.rows, grid.cols) == (4, 4)
+        assert grid.lookup(0.2, -0.9) == "Etc/GMT+1"
+        assert grid.lookup(0.2, 0.9) == "Etc/GMT-1"
+        # Cells on both sides of the meridian are border cells
+        assert grid.lookup(0.2, -0.3) == ""
+        assert grid.lookup(0.2, 0.3) == ""
+        assert grid.border_cells == 8
+
+    def test_outside_grid(self):
+        """Test coordinates outside the grid aren't answered."""
+        grid = _build()
+
+        assert grid.lookup(1.5, -0.9) is None
+        assert grid.lookup(0.0, -1.5) is None
+        assert grid.lookup(1.0, 1.0) == "Etc/GMT-1"
+
+    def test_builds_in_steps(self):
+        """Test a build is split into several steps."""
+        builder = GridBuilder(
+            0.5, _SQUARES, lambda name: [_SQUARES[name]], _get_tzs, (-1, -1, 1, 1)
+        )
+
+        assert builder.step() is False
+        assert builder.step() is True
+        assert builder.grid.lookup(-0.9, -0.9) == "Etc/GMT+1"
+
+    def test_round_trip(self):
+        """Test a grid survives its stored form."""
+        grid = _build()
+        restored = TimezoneGrid.from_dict(grid.as_dict())
+
+        assert restored.bounds == grid.bounds
+        assert restored.zones == grid.zones
+        assert restored.cells == grid.cells
+
+    def test_wrong_size_rejected(self):
+        """Test a cell array that doesn't fit the bounds is rejected."""
+        with pytest.raises(ValueError):
+            TimezoneGrid(0.5, (-1, -1, 1, 1), [], array("H", [0]))
+
+
+@pytest.fixture(scope="module")
+def tzfpy_rings():
+    """Return the parsed polygon rings of every tzfpy zone."""
+    tzfpy = pytest.importorskip("tzfpy")
+    return {
+        name: parse_rings(tzfpy.get_tz_polygon_geojson(name))
+        for name in tzfpy.timezonenames()
+    }
+
+
+class TestAgainstTzfpy:
+    """Test grids built from tzfpy agree with it exactly."""
+
+    @pytest.mark.parametrize(
+        "bounds",
+        [
+            (24.0, -125.0, 50.0, -66.0),  # Contiguous US
+            (35.0, -10.0, 60.0, 30.0),  # Europe
+            (-50.0, 160.0, -30.0, 180.0),  # New Zealand, up to the antimeridian
+        ],
+    )
+    def test_dense_sample(self, bounds, tzfpy_rings):
+        """Test two-tier lookups match tzfpy across a dense sample."""
+        tzfpy = pytest.importorskip("tzfpy")
+        grid = build_grid(0.25, tzfpy_rings, tzfpy_rings.get, tzfpy.get_tzs, bounds)
+
+        south, west, north, east = bounds
+        rng = random.Random(0)
+        # A lattice offset from the grid lines, plus random points
+        points = [
+            (south + (row + 0.37) * 0.1, west + (col + 0.61) * 0.1)
+            for row in range(int((north - south) / 0.1))
+            for col in range(int((east - west) / 0.1))
+        ]
+        points += [
+            (rng.uniform(south, north), rng.uniform(west, east)) for _ in range(20000)
+        ]
+
+        mismatches = []
+        for lat, lon in points:
+            exact = tzfpy.get_tz(lon, lat)
+            if (grid.lookup(lat, lon) or exact) != exact:
+                mismatches.append((lat, lon))
+        assert mismatches == []
+        assert grid.border_cells < len(grid.cells) / 2
+
+
+@pytest.mark.asyncio
+class TestResolverGrid:
+    """Test the resolver's use of the grid."""
+
+    async def test_grid_answers_without_worker(self, hass: HomeAssistant, mock_tzfpy):
+        """Test cells inside one zone are answered by the grid."""
+        resolver = TimezoneResolver(hass)
+        resolver.grid = _build()
+
+        assert await resolver.async_get_timezone(-0.9, -0.9) == "Etc/GMT+1"
+        assert resolver.grid_hits == 1
+        assert resolver.lookups == 0
+        mock_tzfpy.assert_not_called()
+
+    async def test_border_cell_looked_up(self, hass: HomeAssistant, mock_tzfpy):
+        """Test border cells fall back to an exact lookup."""
+        resolver = TimezoneResolver(hass)
+        resolver.grid = _build()
+
+        assert await resolver.async_get_timezone(0.1, 0.1) == "America/New_York"
+        mock_tzfpy.assert_called_once_with(0.1, 0.1)
+        assert resolver.lookups == 1
+        # Exact results for border cells aren't cached
+        assert len(resolver.cache) == 0
+
+    async def test_batch_uses_grid(self, hass: HomeAssistant, mock_tzfpy):
+        """Test batch lookups only look up coordinates the grid can't answer."""
+        resolver = TimezoneResolver(hass)
+        resolver.grid = _build()
+
+        timezones = await resolver.async_get_timezones([(-0.9, -0.9), (0.1, 0.1)])
+
+        assert timezones == ["Etc/GMT+1", "America/New_York"]
+        mock_tzfpy.assert_called_once_with(0.1, 0.1)
+
+    async def test_grid_built_and_stored(self, hass: HomeAssistant, hass_storage):
+        """Test the grid is built once and then loaded from storage."""
+        tzfpy = pytest.importorskip("tzfpy")
+        with patch.multiple(
+            resolver_module,
+            TZFPY_AVAILABLE=True,
+            get_tz=tzfpy.get_tz,
+            get_tz_polygon_geojson=tzfpy.get_tz_polygon_geojson,
+            get_tzs=tzfpy.get_tzs,
+            timezone_names=tzfpy.timezonenames,
+        ):
+            resolver = TimezoneResolver(hass)
+            resolver.grid_bounds = (39.0, -106.0, 41.0, -104.0)
+            resolver.async_start_grid(0.25)
+            await resolver._grid_task
+
+            assert resolver.grid.lookup(39.74, -104.99) == "America/Denver"
+            assert resolver.grid_build_time is not None
+            assert "arvee.timezone_grid" in hass_storage
+
+            restarted = TimezoneResolver(hass)
+            restarted.grid_bounds = resolver.grid_bounds
+            restarted.async_start_grid(0.25)
+            await restarted._grid_task
+
+            assert restarted.grid.cells == resolver.grid.cells
+            assert restarted.grid_build_time is None
+
+    async def test_zero_resolution_drops_grid(self, hass: HomeAssistant, mock_tzfpy):
+        """Test a resolution of 0 turns the grid off."""
+        resolver = TimezoneResolver(hass)
+        resolver.async_start_grid(0.25)
+        resolver.grid = _build()
+
+        resolver.async_start_grid(0)
+
+        assert resolver.grid is None
+        assert resolver._grid_task is None
+
+    async def test_off_by_default(self, hass: HomeAssistant, mock_gps_entities, mock_tzfpy):
+        """Test no grid is built unless a resolution is configured."""
+        entry = MockConfigEntry(
+            domain=DOMAIN,
+            unique_id=DOMAIN,
+            data={
+                CONF_LATITUDE_ENTITY: "sensor.test_latitude",
+                CONF_LONGITUDE_ENTITY: "sensor.test_longitude",
+            },
+        )
+        entry.add_to_hass(hass)
+        with patch.object(TimezoneResolver, "_async_load_grid") as load_grid:
+            assert await hass.config_entries.async_setup(entry.entry_id)
+            await hass.async_block_till_done()
+
+        load_grid.assert_not_called()
+        assert hass.data[DATA_RESOLVER].grid is None
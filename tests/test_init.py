@@ -1,21 +1,46 @@
 """Test component setup."""
-from unittest.mock import patch
+from array import array
+import asyncio
+from datetime import timedelta
+from unittest.mock import call, patch
 
 import pytest
 
 from homeassistant.core import HomeAssistant
+from homeassistant.exceptions import HomeAssistantError
 from homeassistant.setup import async_setup_component
+from homeassistant.util import dt as dt_util
+from pytest_homeassistant_custom_component.common import (
+    MockConfigEntry,
+    async_fire_time_changed,
+)
 
 from custom_components.arvee.const import (
     DOMAIN,
+    CONF_LATITUDE_ENTITY,
+    CONF_LONGITUDE_ENTITY,
+    CONF_TRACKER_ENTITY,
+    CONF_UPDATE_THRESHOLD,
+    CONF_LOCATION_THRESHOLD,
+    CONF_LOCATION_INTERVAL,
+    CONF_SOURCES,
+    CONF_SMOOTHING,
     SERVICE_SET_TIMEZONE,
     SERVICE_SET_GEO_TIMEZONE,
+    SERVICE_LOOKUP_TIMEZONES,
+    SERVICE_LOAD_ROUTE,
+    SERVICE_CLEAR_ROUTE,
+    ATTR_COORDINATES,
+    ATTR_POLYLINE,
     ATTR_LATITUDE,
     ATTR_LONGITUDE,
     ATTR_TIMEZONE,
+    DATA_RESOLVER,
+    DATA_ROUTE,
 )
 from custom_components.arvee import _haversine_miles
-from custom_components.arvee.config_flow import _is_numeric
+from custom_components.arvee.boundary import SafeZone
+from custom_components.arvee.config_flow import _is_numeric, get_schema
 
 
 @pytest.mark.asyncio
@@ -33,6 +58,9 @@ class TestAsyncSetup:
 
         assert hass.services.has_service(DOMAIN, SERVICE_SET_TIMEZONE)
         assert hass.services.has_service(DOMAIN, SERVICE_SET_GEO_TIMEZONE)
+        assert hass.services.has_service(DOMAIN, SERVICE_LOOKUP_TIMEZONES)
+        assert hass.services.has_service(DOMAIN, SERVICE_LOAD_ROUTE)
+        assert hass.services.has_service(DOMAIN, SERVICE_CLEAR_ROUTE)
 
 
 class TestHaversine:
@@ -125,3 +153,663 @@ class TestSetGeoTimezoneService:
         assert hass.config.longitude == -74.0060
         assert hass.config.time_zone == "America/New_York"
         mock_tzfpy.assert_called_once_with(-74.0060, 40.7128)
+
+    async def test_set_geo_timezone_cached(self, hass: HomeAssistant, mock_tzfpy):
+        """Test a repeat lookup in the same cell skips tzfpy."""
+        await async_setup_component(hass, DOMAIN, {})
+        await hass.async_block_till_done()
+
+        # The cell is cached once the zone's polygon shows no border crosses it
+        square = array("d", [-75, 40, -73, 40, -73, 42, -75, 42, -75, 40])
+        with patch.multiple(
+            "custom_components.arvee.resolver",
+            get_tz_polygon_geojson=lambda timezone: "",
+            _zone_rings=lambda timezone: [square],
+        ):
+            for _ in range(2):
+                await hass.services.async_call(
+                    DOMAIN,
+                    SERVICE_SET_GEO_TIMEZONE,
+                    {ATTR_LATITUDE: 40.7128, ATTR_LONGITUDE: -74.0060},
+                    blocking=True,
+                )
+
+        assert hass.data[DATA_RESOLVER].lookups == 1
+        assert hass.data[DATA_RESOLVER].cache.hits == 1
+
+
+@pytest.mark.asyncio
+class TestLookupTimezonesService:
+    """Test lookup_timezones service."""
+
+    async def test_lookup_timezones(self, hass: HomeAssistant, mock_tzfpy):
+        """Test a batch lookup returns timezones, distances and transitions."""
+        mock_tzfpy.side_effect = lambda lon, lat: (
+            "America/Denver" if lon < -101.5 else "America/Chicago"
+        )
+        await async_setup_component(hass, DOMAIN, {})
+        await hass.async_block_till_done()
+        original_tz = hass.config.time_zone
+
+        response = await hass.services.async_call(
+            DOMAIN,
+            SERVICE_LOOKUP_TIMEZONES,
+            {
+                ATTR_COORDINATES: [
+                    {ATTR_LATITUDE: 39.74, ATTR_LONGITUDE: -104.99},
+                    {ATTR_LATITUDE: 39.35, ATTR_LONGITUDE: -101.71},
+                    {ATTR_LATITUDE: 39.35, ATTR_LONGITUDE: -101.71},
+                    {ATTR_LATITUDE: 39.10, ATTR_LONGITUDE: -94.58},
+                ]
+            },
+            blocking=True,
+            return_response=True,
+        )
+
+        assert [point[ATTR_TIMEZONE] for point in response["points"]] == [
+            "America/Denver",
+            "America/Denver",
+            "America/Denver",
+            "America/Chicago",
+        ]
+        assert response["points"][0]["distance"] == 0
+        assert response["points"][2]["distance"] == 0
+        assert len(response["transitions"]) == 1
+        assert response["transitions"][0]["index"] == 3
+        assert response["transitions"][0]["from"] == "America/Denver"
+        assert response["transitions"][0]["to"] == "America/Chicago"
+        assert 500 < response["total_distance"] < 600
+
+        # Duplicates are looked up once, in a single executor job
+        assert mock_tzfpy.call_count == 3
+        assert hass.data[DATA_RESOLVER].lookups == 1
+        assert hass.config.time_zone == original_tz
+
+
+@pytest.mark.asyncio
+class TestLoadRouteService:
+    """Test load_route and clear_route services."""
+
+    async def test_load_route(self, hass: HomeAssistant, mock_tzfpy):
+        """Test a route is loaded and its transitions returned."""
+        mock_tzfpy.side_effect = lambda lon, lat: (
+            "America/Denver" if lon < -101.5 else "America/Chicago"
+        )
+        await async_setup_component(hass, DOMAIN, {})
+        await hass.async_block_till_done()
+
+        response = await hass.services.async_call(
+            DOMAIN,
+            SERVICE_LOAD_ROUTE,
+            {
+                ATTR_COORDINATES: [
+                    {ATTR_LATITUDE: 39.0, ATTR_LONGITUDE: -105.0},
+                    {ATTR_LATITUDE: 39.0, ATTR_LONGITUDE: -94.6},
+                ]
+            },
+            blocking=True,
+            return_response=True,
+        )
+
+        assert len(response["transitions"]) == 1
+        assert response["transitions"][0]["from"] == "America/Denver"
+        assert response["transitions"][0]["to"] == "America/Chicago"
+        assert response["transitions"][0][ATTR_LONGITUDE] == pytest.approx(-101.5, abs=0.001)
+        assert 540 < response["total_distance"] < 580
+        assert hass.data[DATA_ROUTE] is not None
+
+        await hass.services.async_call(DOMAIN, SERVICE_CLEAR_ROUTE, {}, blocking=True)
+        assert DATA_ROUTE not in hass.data
+
+    async def test_invalid_route(self, hass: HomeAssistant, mock_tzfpy):
+        """Test a route that can't be read is rejected."""
+        await async_setup_component(hass, DOMAIN, {})
+        await hass.async_block_till_done()
+
+        with pytest.raises(HomeAssistantError):
+            await hass.services.async_call(
+                DOMAIN, SERVICE_LOAD_ROUTE, {ATTR_POLYLINE: "_p~iF~ps|U_"}, blocking=True
+            )
+        assert DATA_ROUTE not in hass.data
+
+
+@pytest.mark.asyncio
+class TestLocationUpdates:
+    """Test GPS entity driven location updates."""
+
+    def _add_entry(
+        self, hass: HomeAssistant, options: dict | None = None
+    ) -> MockConfigEntry:
+        """Add an Arvee entry tracking the mock GPS entities."""
+        entry = MockConfigEntry(
+            domain=DOMAIN,
+            unique_id=DOMAIN,
+            data={
+                CONF_LATITUDE_ENTITY: "sensor.test_latitude",
+                CONF_LONGITUDE_ENTITY: "sensor.test_longitude",
+                CONF_UPDATE_THRESHOLD: 10.0,
+            },
+            options=options or {},
+        )
+        entry.add_to_hass(hass)
+        return entry
+
+    async def _setup_entry(
+        self, hass: HomeAssistant, options: dict | None = None
+    ) -> MockConfigEntry:
+        """Set up an Arvee entry tracking the mock GPS entities."""
+        entry = self._add_entry(hass, options)
+        with patch("custom_components.arvee.UPDATE_SETTLE_TIME", 0.01):
+            assert await hass.config_entries.async_setup(entry.entry_id)
+        await hass.async_block_till_done()
+        return entry
+
+    async def test_initial_update(self, hass: HomeAssistant, mock_gps_entities, mock_tzfpy):
+        """Test setup applies the current GPS fix."""
+        await self._setup_entry(hass)
+
+        assert hass.config.latitude == 40.7128
+        assert hass.config.longitude == -74.0060
+        assert hass.config.time_zone == "America/New_York"
+        assert hass.data[DATA_RESOLVER].lookups == 1
+
+    async def test_setup_does_not_wait_for_initial_update(self, hass: HomeAssistant, mock_gps_entities, mock_tzfpy):
+        """Test entry setup returns before the initial lookup finishes."""
+        release = asyncio.Event()
+
+        async def slow_ready(self):
+            await release.wait()
+            return True
+
+        with patch(
+            "custom_components.arvee.resolver.TimezoneResolver.async_ready", slow_ready
+        ):
+            entry = self._add_entry(hass)
+            assert await hass.config_entries.async_setup(entry.entry_id)
+
+            data = hass.data[DOMAIN][entry.entry_id]
+            assert not data["initial_update"].done()
+            assert data["initial_update_time"] is None
+
+            release.set()
+            await hass.async_block_till_done()
+
+        assert data["initial_update"].done()
+        assert data["initial_update_time"] is not None
+        assert hass.config.time_zone == "America/New_York"
+
+    async def test_unload_cancels_initial_update(self, hass: HomeAssistant, mock_gps_entities, mock_tzfpy):
+        """Test unloading cancels a running initial update."""
+        release = asyncio.Event()
+
+        async def slow_ready(self):
+            await release.wait()
+            return True
+
+        with patch(
+            "custom_components.arvee.resolver.TimezoneResolver.async_ready", slow_ready
+        ):
+            entry = self._add_entry(hass)
+            assert await hass.config_entries.async_setup(entry.entry_id)
+            task = hass.data[DOMAIN][entry.entry_id]["initial_update"]
+
+            assert await hass.config_entries.async_unload(entry.entry_id)
+            await hass.async_block_till_done()
+
+        assert task.cancelled()
+        mock_tzfpy.assert_not_called()
+
+    async def test_lat_lon_pair_is_one_update(self, hass: HomeAssistant, mock_gps_entities, mock_tzfpy):
+        """Test a latitude/longitude pair triggers a single lookup."""
+        await self._setup_entry(hass)
+        resolver = hass.data[DATA_RESOLVER]
+        mock_tzfpy.reset_mock()
+        mock_tzfpy.return_value = "America/Chicago"
+
+        hass.states.async_set("sensor.test_latitude", "41.8781")
+        hass.states.async_set("sensor.test_longitude", "-87.6298")
+        await hass.async_block_till_done()
+
+        assert resolver.lookups == 2
+        assert mock_tzfpy.call_args_list[0] == call(-87.6298, 41.8781)
+        assert hass.config.time_zone == "America/Chicago"
+
+    async def test_safe_zone_skips_lookup(self, hass: HomeAssistant, mock_gps_entities, mock_tzfpy):
+        """Test fixes inside the safe zone reuse the timezone."""
+        entry = await self._setup_entry(hass)
+        data = hass.data[DOMAIN][entry.entry_id]
+        data["safe_zone"] = SafeZone(40.7128, -74.0060, 100.0, "America/New_York")
+        data["gate"].set_safe_zone(data["safe_zone"])
+        mock_tzfpy.reset_mock()
+
+        # Far enough to clear the threshold at any speed
+        hass.states.async_set("sensor.test_latitude", "41.2")
+        hass.states.async_set("sensor.test_longitude", "-74.6")
+        await hass.async_block_till_done()
+
+        mock_tzfpy.assert_not_called()
+        assert data["pending_location"] == (41.2, -74.6)
+        assert hass.config.time_zone == "America/New_York"
+
+    async def test_route_skips_lookup(self, hass: HomeAssistant, mock_gps_entities, mock_tzfpy):
+        """Test fixes on a loaded route take its timezone without a lookup."""
+        entry = await self._setup_entry(hass)
+        await hass.services.async_call(
+            DOMAIN,
+            SERVICE_LOAD_ROUTE,
+            {ATTR_COORDINATES: [
+                {ATTR_LATITUDE: 40.7128, ATTR_LONGITUDE: -74.0060},
+                {ATTR_LATITUDE: 40.7128, ATTR_LONGITUDE: -72.0},
+            ]},
+            blocking=True,
+        )
+        mock_tzfpy.reset_mock()
+
+        hass.states.async_set("sensor.test_longitude", "-73.0")
+        await hass.async_block_till_done()
+
+        mock_tzfpy.assert_not_called()
+        data = hass.data[DOMAIN][entry.entry_id]
+        assert data["metrics"].route_hits == 1
+        assert data["route_distance"] > 50
+
+    async def test_route_transition_opens_gate(self, hass: HomeAssistant, mock_gps_entities, mock_tzfpy):
+        """Test passing a transition on the route changes the timezone right away."""
+        mock_tzfpy.side_effect = lambda lon, lat: (
+            "America/New_York" if lon < -73.98 else "America/Chicago"
+        )
+        await self._setup_entry(hass)
+        await hass.services.async_call(
+            DOMAIN,
+            SERVICE_LOAD_ROUTE,
+            {ATTR_COORDINATES: [
+                {ATTR_LATITUDE: 40.7128, ATTR_LONGITUDE: -74.0060},
+                {ATTR_LATITUDE: 40.7128, ATTR_LONGITUDE: -73.9},
+            ]},
+            blocking=True,
+        )
+        mock_tzfpy.reset_mock()
+
+        # Well inside the distance threshold, but past the transition
+        hass.states.async_set("sensor.test_longitude", "-73.95")
+        await hass.async_block_till_done()
+
+        mock_tzfpy.assert_not_called()
+        assert hass.config.time_zone == "America/Chicago"
+
+    async def test_timezone_change_written_immediately(self, hass: HomeAssistant, mock_gps_entities, mock_tzfpy):
+        """Test a timezone change bypasses the location interval."""
+        await self._setup_entry(hass)
+        mock_tzfpy.return_value = "America/Chicago"
+
+        with patch.object(
+            hass.config, "async_update", wraps=hass.config.async_update
+        ) as mock_update:
+            hass.states.async_set("sensor.test_latitude", "41.8781")
+            hass.states.async_set("sensor.test_longitude", "-87.6298")
+            await hass.async_block_till_done()
+
+        mock_update.assert_called_once_with(
+            latitude=41.8781, longitude=-87.6298, time_zone="America/Chicago"
+        )
+
+    async def test_border_hysteresis(self, hass: HomeAssistant, mock_gps_entities, mock_tzfpy):
+        """Test a timezone change is held until the fix is clear of the border."""
+        entry = await self._setup_entry(hass)
+        mock_tzfpy.return_value = "America/Chicago"
+        radius = 0.2
+
+        async def safe_zone(self, lat, lon, timezone, key=None):
+            return SafeZone(lat, lon, radius, timezone)
+
+        with patch(
+            "custom_components.arvee.resolver.TimezoneResolver.async_get_safe_zone",
+            safe_zone,
+        ):
+            hass.states.async_set("sensor.test_latitude", "41.8781")
+            hass.states.async_set("sensor.test_longitude", "-87.6298")
+            await hass.async_block_till_done()
+
+            assert hass.config.time_zone == "America/New_York"
+            assert hass.data[DOMAIN][entry.entry_id]["metrics"].border_holds == 1
+
+            radius = 5.0
+            hass.states.async_set("sensor.test_longitude", "-87.7")
+            await hass.async_block_till_done()
+
+        assert hass.config.time_zone == "America/Chicago"
+        assert hass.config.longitude == -87.7
+
+    async def test_parked_past_border(self, hass: HomeAssistant, mock_gps_entities, mock_tzfpy):
+        """Test a vehicle parked just past a border isn't looked up again and changes in time."""
+        entry = await self._setup_entry(hass)
+        data = hass.data[DOMAIN][entry.entry_id]
+        mock_tzfpy.return_value = "America/Chicago"
+
+        async def safe_zone(self, lat, lon, timezone, key=None):
+            return SafeZone(lat, lon, 0.3, timezone)
+
+        with patch(
+            "custom_components.arvee.resolver.TimezoneResolver.async_get_safe_zone",
+            safe_zone,
+        ):
+            hass.states.async_set("sensor.test_latitude", "41.8781")
+            hass.states.async_set("sensor.test_longitude", "-87.6298")
+            await hass.async_block_till_done()
+            mock_tzfpy.reset_mock()
+
+            # Jitter while parked is measured from the held fix
+            for lat in ("41.8782", "41.8781", "41.8783"):
+                hass.states.async_set("sensor.test_latitude", lat)
+                await hass.async_block_till_done()
+
+            assert hass.config.time_zone == "America/New_York"
+            assert data["metrics"].border_holds == 1
+            assert data["metrics"].below_threshold == 3
+            mock_tzfpy.assert_not_called()
+
+            # Staying past the border long enough makes the change
+            with patch("custom_components.arvee.gate.BORDER_DWELL", 0):
+                hass.states.async_set("sensor.test_latitude", "41.8782")
+                await hass.async_block_till_done()
+
+        assert hass.config.time_zone == "America/Chicago"
+        assert data["border_crossing"] is None
+
+    async def test_location_only_change_is_batched(self, hass: HomeAssistant, mock_gps_entities, mock_tzfpy):
+        """Test location-only changes wait for the interval and omit the timezone."""
+        entry = await self._setup_entry(hass, {CONF_LOCATION_INTERVAL: 10})
+        data = hass.data[DOMAIN][entry.entry_id]
+
+        with patch.object(
+            hass.config, "async_update", wraps=hass.config.async_update
+        ) as mock_update:
+            hass.states.async_set("sensor.test_latitude", "40.9")
+            hass.states.async_set("sensor.test_longitude", "-74.3")
+            await hass.async_block_till_done()
+            hass.states.async_set("sensor.test_latitude", "41.1")
+            await hass.async_block_till_done()
+
+            mock_update.assert_not_called()
+            assert data["pending_location"] == (41.1, -74.3)
+
+            async_fire_time_changed(hass, dt_util.utcnow() + timedelta(minutes=11))
+            await hass.async_block_till_done()
+
+        mock_update.assert_called_once_with(latitude=41.1, longitude=-74.3)
+        assert data["pending_location"] is None
+
+    async def test_location_below_distance_not_written(self, hass: HomeAssistant, mock_gps_entities, mock_tzfpy):
+        """Test small location-only changes are never written."""
+        entry = await self._setup_entry(
+            hass, {CONF_LOCATION_THRESHOLD: 50.0, CONF_LOCATION_INTERVAL: 0}
+        )
+        data = hass.data[DOMAIN][entry.entry_id]
+
+        with patch.object(
+            hass.config, "async_update", wraps=hass.config.async_update
+        ) as mock_update:
+            hass.states.async_set("sensor.test_latitude", "40.9")
+            hass.states.async_set("sensor.test_longitude", "-74.3")
+            await hass.async_block_till_done()
+
+        mock_update.assert_not_called()
+        assert data["pending_location"] is None
+        assert data["location_flush"] is None
+
+    async def test_attribute_only_change_ignored(self, hass: HomeAssistant, mock_gps_entities, mock_tzfpy):
+        """Test attribute-only changes don't schedule an update."""
+        entry = await self._setup_entry(hass)
+        scheduler = hass.data[DOMAIN][entry.entry_id]["scheduler"]
+
+        hass.states.async_set("sensor.test_latitude", "40.7128", {"accuracy": 5})
+        assert not scheduler.running
+
+    async def test_non_numeric_state_ignored(self, hass: HomeAssistant, mock_gps_entities, mock_tzfpy):
+        """Test unavailable states don't schedule an update."""
+        entry = await self._setup_entry(hass)
+        scheduler = hass.data[DOMAIN][entry.entry_id]["scheduler"]
+
+        hass.states.async_set("sensor.test_latitude", "unavailable")
+        assert not scheduler.running
+
+    async def test_additional_source(self, hass: HomeAssistant, mock_gps_entities, mock_tzfpy):
+        """Test a more accurate additional source is followed, and dropped when it goes away."""
+        hass.states.async_set(
+            "device_tracker.phone",
+            "not_home",
+            {"latitude": 41.8781, "longitude": -87.6298, "gps_accuracy": 5},
+        )
+        mock_tzfpy.return_value = "America/Chicago"
+        entry = await self._setup_entry(hass, {CONF_SOURCES: ["device_tracker.phone"]})
+
+        assert hass.config.latitude == 41.8781
+        assert hass.config.time_zone == "America/Chicago"
+
+        mock_tzfpy.return_value = "America/New_York"
+        hass.states.async_set("device_tracker.phone", "unavailable")
+        await hass.async_block_till_done()
+
+        assert hass.config.latitude == 40.7128
+        assert hass.config.time_zone == "America/New_York"
+        assert hass.data[DOMAIN][entry.entry_id]["selector"].switches == 1
+
+    async def test_outlier_filtered(self, hass: HomeAssistant, mock_gps_entities, mock_tzfpy):
+        """Test a fix that jumps implausibly far never reaches the lookup."""
+        entry = await self._setup_entry(hass, {CONF_SMOOTHING: True})
+        mock_tzfpy.reset_mock()
+
+        hass.states.async_set("sensor.test_latitude", "41.5")
+        await hass.async_block_till_done()
+
+        mock_tzfpy.assert_not_called()
+        assert hass.config.latitude == 40.7128
+        selector = hass.data[DOMAIN][entry.entry_id]["selector"]
+        assert selector.as_dict()[0]["rejected"] == 1
+
+    async def test_restart_while_parked(self, hass: HomeAssistant, hass_storage, mock_gps_entities, mock_tzfpy):
+        """Test a restored fix avoids lookups and config writes."""
+        entry = self._add_entry(hass)
+        hass_storage[f"{DOMAIN}.{entry.entry_id}"] = {
+            "version": 1,
+            "key": f"{DOMAIN}.{entry.entry_id}",
+            "data": {
+                "latitude": 40.7128,
+                "longitude": -74.0060,
+                "timezone": "America/New_York",
+                "updated": "2026-01-01T00:00:00+00:00",
+                "pending_location": None,
+                "safe_zone": {
+                    "latitude": 40.7128,
+                    "longitude": -74.0060,
+                    "radius": 20.0,
+                    "timezone": "America/New_York",
+                },
+            },
+        }
+
+        with patch.object(
+            hass.config, "async_update", wraps=hass.config.async_update
+        ) as mock_update:
+            assert await hass.config_entries.async_setup(entry.entry_id)
+            await hass.async_block_till_done()
+
+        mock_tzfpy.assert_not_called()
+        mock_update.assert_not_called()
+        data = hass.data[DOMAIN][entry.entry_id]
+        assert data["timezone"] == "America/New_York"
+        assert data["safe_zone"] == SafeZone(40.7128, -74.0060, 20.0, "America/New_York")
+
+    async def test_restored_pending_location_written(self, hass: HomeAssistant, hass_storage, mock_gps_entities, mock_tzfpy):
+        """Test a location still pending at shutdown is written after restart."""
+        entry = self._add_entry(hass)
+        hass_storage[f"{DOMAIN}.{entry.entry_id}"] = {
+            "version": 1,
+            "key": f"{DOMAIN}.{entry.entry_id}",
+            "data": {
+                "latitude": 40.7128,
+                "longitude": -74.0060,
+                "timezone": "America/New_York",
+                "updated": "2026-01-01T00:00:00+00:00",
+                "pending_location": [40.7128, -74.0060],
+                "safe_zone": None,
+            },
+        }
+
+        assert await hass.config_entries.async_setup(entry.entry_id)
+        await hass.async_block_till_done()
+
+        mock_tzfpy.assert_not_called()
+        assert hass.config.latitude == 40.7128
+        assert hass.config.longitude == -74.0060
+
+    async def test_fix_saved_on_unload(self, hass: HomeAssistant, hass_storage, mock_gps_entities, mock_tzfpy):
+        """Test the accepted fix is written to storage."""
+        entry = await self._setup_entry(hass)
+        assert await hass.config_entries.async_unload(entry.entry_id)
+        await hass.async_block_till_done()
+
+        stored = hass_storage[f"{DOMAIN}.{entry.entry_id}"]["data"]
+        assert stored["latitude"] == 40.7128
+        assert stored["longitude"] == -74.0060
+        assert stored["timezone"] == "America/New_York"
+        assert stored["updated"] is not None
+
+    async def test_threshold_applied_in_place(self, hass: HomeAssistant, mock_gps_entities, mock_tzfpy):
+        """Test changing the threshold doesn't reload or look up again."""
+        entry = await self._setup_entry(hass)
+        data = hass.data[DOMAIN][entry.entry_id]
+        mock_tzfpy.reset_mock()
+
+        selector = data["selector"]
+        # The options form returns every field, filled in with its default
+        options = get_schema(entry.data, tuning=True)({
+            CONF_LATITUDE_ENTITY: "sensor.test_latitude",
+            CONF_LONGITUDE_ENTITY: "sensor.test_longitude",
+            CONF_UPDATE_THRESHOLD: 12.0,
+        })
+
+        with patch.object(hass.config, "async_update") as mock_update:
+            hass.config_entries.async_update_entry(entry, options=options)
+            await hass.async_block_till_done()
+
+        assert hass.data[DOMAIN][entry.entry_id] is data
+        assert data["gate"].base_threshold == 12.0
+        assert data["selector"] is selector
+        mock_tzfpy.assert_not_called()
+        mock_update.assert_not_called()
+
+    async def test_source_change_keeps_position(self, hass: HomeAssistant, mock_gps_entities, mock_tzfpy):
+        """Test new sources are followed without a lookup if the position is the same."""
+        entry = await self._setup_entry(hass)
+        data = hass.data[DOMAIN][entry.entry_id]
+        hass.states.async_set(
+            "device_tracker.phone",
+            "not_home",
+            {"latitude": 40.7128, "longitude": -74.0060, "gps_accuracy": 5},
+        )
+        mock_tzfpy.reset_mock()
+
+        hass.config_entries.async_update_entry(
+            entry, options={CONF_SOURCES: ["device_tracker.phone"]}
+        )
+        await hass.async_block_till_done()
+
+        assert "device_tracker.phone" in data["selector"].entities
+        assert data["metrics"].updates == 1
+        mock_tzfpy.assert_not_called()
+
+        # The new source is followed
+        mock_tzfpy.return_value = "America/Chicago"
+        hass.states.async_set(
+            "device_tracker.phone",
+            "not_home",
+            {"latitude": 41.8781, "longitude": -87.6298, "gps_accuracy": 5},
+        )
+        await hass.async_block_till_done()
+
+        assert hass.config.time_zone == "America/Chicago"
+
+    async def test_unload_cancels_scheduler(self, hass: HomeAssistant, mock_gps_entities, mock_tzfpy):
+        """Test unloading drops a pending update."""
+        entry = await self._setup_entry(hass)
+        mock_tzfpy.reset_mock()
+
+        hass.states.async_set("sensor.test_latitude", "41.8781")
+        assert await hass.config_entries.async_unload(entry.entry_id)
+        await hass.async_block_till_done()
+
+        mock_tzfpy.assert_not_called()
+
+
+@pytest.mark.asyncio
+class TestTrackerSource:
+    """Test reading fixes from a single device tracker."""
+
+    async def _setup_entry(self, hass: HomeAssistant) -> MockConfigEntry:
+        """Set up an Arvee entry tracking a device tracker."""
+        hass.states.async_set(
+            "device_tracker.rv",
+            "not_home",
+            {"latitude": 40.7128, "longitude": -74.0060, "gps_accuracy": 5},
+        )
+        entry = MockConfigEntry(
+            domain=DOMAIN,
+            unique_id=DOMAIN,
+            data={
+                CONF_TRACKER_ENTITY: "device_tracker.rv",
+                CONF_UPDATE_THRESHOLD: 10.0,
+            },
+        )
+        entry.add_to_hass(hass)
+        with patch("custom_components.arvee.UPDATE_SETTLE_TIME", 0.01):
+            assert await hass.config_entries.async_setup(entry.entry_id)
+        await hass.async_block_till_done()
+        return entry
+
+    async def test_initial_update(self, hass: HomeAssistant, mock_tzfpy):
+        """Test setup applies the tracker's current fix."""
+        await self._setup_entry(hass)
+
+        assert hass.config.latitude == 40.7128
+        assert hass.config.longitude == -74.0060
+        assert hass.config.time_zone == "America/New_York"
+
+    async def test_move(self, hass: HomeAssistant, mock_tzfpy):
+        """Test one tracker state change carries both coordinates."""
+        entry = await self._setup_entry(hass)
+        mock_tzfpy.reset_mock()
+        mock_tzfpy.return_value = "America/Chicago"
+
+        hass.states.async_set(
+            "device_tracker.rv",
+            "not_home",
+            {"latitude": 41.8781, "longitude": -87.6298, "gps_accuracy": 5},
+        )
+        await hass.async_block_till_done()
+
+        assert mock_tzfpy.call_args_list[0] == call(-87.6298, 41.8781)
+        assert hass.config.time_zone == "America/Chicago"
+        metrics = hass.data[DOMAIN][entry.entry_id]["metrics"]
+        assert metrics.events_received == 1
+        assert metrics.updates == 2
+
+    async def test_attribute_only_change_ignored(self, hass: HomeAssistant, mock_tzfpy):
+        """Test tracker changes that keep the coordinates don't schedule an update."""
+        entry = await self._setup_entry(hass)
+        scheduler = hass.data[DOMAIN][entry.entry_id]["scheduler"]
+
+        hass.states.async_set(
+            "device_tracker.rv",
+            "not_home",
+            {"latitude": 40.7128, "longitude": -74.0060, "battery_level": 80},
+        )
+        assert not scheduler.running
+
+    async def test_missing_coordinates_ignored(self, hass: HomeAssistant, mock_tzfpy):
+        """Test tracker states without coordinates don't schedule an update."""
+        entry = await self._setup_entry(hass)
+        scheduler = hass.data[DOMAIN][entry.entry_id]["scheduler"]
+
+        hass.states.async_set("device_tracker.rv", "unavailable")
+        assert not scheduler.running
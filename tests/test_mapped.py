@@ -0,0 +1,168 @@
+"""Test the memory-mapped timezone data backend."""
+from array import array
+import mmap
+import random
+from unittest.mock import patch
+
+import pytest
+
+from homeassistant.core import HomeAssistant
+
+from custom_components.arvee import resolver as resolver_module
+from custom_components.arvee.mapped import MappedTimezoneData, write_timezone_data
+from custom_components.arvee.resolver import BORDER, TimezoneResolver
+
+# Two zones meeting along the prime meridian, the eastern one with a hole
+# filled by a third zone
+_ZONES = {
+    "Etc/GMT+1": [array("d", [-2, -2, 0, -2, 0, 2, -2, 2, -2, -2])],
+    "Etc/GMT-1": [
+        array("d", [0, -2, 2, -2, 2, 2, 0, 2, 0, -2]),
+        array("d", [0.4, 0.4, 0.8, 0.4, 0.8, 0.8, 0.4, 0.8, 0.4, 0.4]),
+    ],
+    "Etc/GMT-2": [array("d", [0.4, 0.4, 0.8, 0.4, 0.8, 0.8, 0.4, 0.8, 0.4, 0.4])],
+}
+
+
+@pytest.fixture(name="data_file")
+def data_file_fixture(tmp_path):
+    """Write a data file for the synthetic zones and return its path."""
+    path = str(tmp_path / "timezones.arvt")
+    write_timezone_data(path, 0.5, _ZONES, _ZONES.get, (-1.0, -1.0, 1.0, 1.0))
+    return path
+
+
+class TestMappedTimezoneData:
+    """Test converting and reading data files."""
+
+    def test_lookups(self, data_file):
+        """Test lookups in uniform cells, border cells and the hole."""
+        data = MappedTimezoneData(data_file)
+
+        assert data.get_tz(-0.9, -0.9) == "Etc/GMT+1"
+        assert data.get_tz(0.9, -0.9) == "Etc/GMT-1"
+        # Either side of the meridian, in cells it crosses
+        assert data.get_tz(-0.01, 0.2) == "Etc/GMT+1"
+        assert data.get_tz(0.01, 0.2) == "Etc/GMT-1"
+        assert data.get_tz(0.6, 0.6) == "Etc/GMT-2"
+        assert data.get_tz(0.3, 0.6) == "Etc/GMT-1"
+        assert data.get_tz(1.5, 0.0) is None
+        data.close()
+
+    def test_zone_in_box(self, data_file):
+        """Test a box has a zone only when every cell it overlaps is inside it."""
+        data = MappedTimezoneData(data_file)
+
+        assert data.zone_in_box(-0.9, -0.9, -0.6, -0.6) == "Etc/GMT+1"
+        assert data.zone_in_box(-1.0, -1.0, -0.5, -0.5) == "Etc/GMT+1"
+        # Across the meridian, in the hole's cell and off the data
+        assert data.zone_in_box(-0.9, -0.1, -0.6, 0.1) is None
+        assert data.zone_in_box(0.6, 0.6, 0.7, 0.7) is None
+        assert data.zone_in_box(1.2, 0.0, 1.3, 0.1) is None
+        data.close()
+
+    def test_safe_radius(self, data_file):
+        """Test the safe radius is the distance to the zone's nearest edge."""
+        data = MappedTimezoneData(data_file)
+
+        near = data.safe_radius(-0.1, -0.1, "Etc/GMT+1")
+        far = data.safe_radius(-0.1, -0.9, "Etc/GMT+1")
+
+        assert 0 < near < far
+        # Inside the hole, the nearest edge is at most 0.2 degrees away
+        assert data.safe_radius(0.6, 0.6, "Etc/GMT-2") < 0.2 * 69.1
+        assert data.safe_radius(0.0, 0.0, "Etc/Unknown") is None
+        data.close()
+
+    def test_only_touched_pages_resident(self, data_file):
+        """Test the resident size of a mapping covers no more than the file."""
+        data = MappedTimezoneData(data_file)
+        data.get_tz(-0.9, -0.9)
+
+        resident = data.update_resident()
+
+        if resident is not None:
+            pages = -(-data.nbytes // mmap.PAGESIZE)
+            assert 0 < resident <= pages * mmap.PAGESIZE
+        data.close()
+
+    def test_bad_file_rejected(self, tmp_path):
+        """Test a file that isn't timezone data is rejected."""
+        path = tmp_path / "not_timezones.arvt"
+        path.write_bytes(b"not timezone data" * 10)
+
+        with pytest.raises(ValueError):
+            MappedTimezoneData(str(path))
+
+
+def test_matches_tzfpy(tmp_path):
+    """Test a file converted from tzfpy agrees with it outside overlaps."""
+    tzfpy = pytest.importorskip("tzfpy")
+    from custom_components.arvee.boundary import parse_rings
+
+    bounds = (35.0, -10.0, 60.0, 30.0)  # Europe
+    path = str(tmp_path / "europe.arvt")
+    write_timezone_data(
+        path,
+        0.25,
+        tzfpy.timezonenames(),
+        lambda name: parse_rings(tzfpy.get_tz_polygon_geojson(name)),
+        bounds,
+    )
+    data = MappedTimezoneData(path)
+
+    rng = random.Random(0)
+    mismatches = []
+    for _ in range(20000):
+        lat, lon = rng.uniform(bounds[0], bounds[2]), rng.uniform(bounds[1], bounds[3])
+        if data.get_tz(lon, lat) != tzfpy.get_tz(lon, lat):
+            mismatches.append((lat, lon))
+    data.close()
+
+    assert [point for point in mismatches if len(tzfpy.get_tzs(*point[::-1])) < 2] == []
+
+
+@pytest.mark.asyncio
+async def test_resolver_uses_data_file(hass: HomeAssistant, data_file):
+    """Test the resolver answers from a data file instead of tzfpy."""
+    with patch.multiple(
+        resolver_module,
+        TZFPY_AVAILABLE=None,
+        get_tz=None,
+        get_tz_polygon_geojson=None,
+    ):
+        resolver = TimezoneResolver(hass)
+        resolver.data_file = data_file
+        assert await resolver.async_ready() is True
+        assert resolver.available is True
+        assert await resolver.async_get_timezone(0.6, 0.6) == "Etc/GMT-2"
+        assert resolver.cache.get(resolver.cache.cell(0.6, 0.6)) == BORDER
+        assert await resolver.async_get_timezone(-0.85, -0.85) == "Etc/GMT+1"
+        assert resolver.cache.get(resolver.cache.cell(-0.85, -0.85)) == "Etc/GMT+1"
+        # The resident size measured on opening the file lasts an interval
+        with patch.object(
+            resolver.mapped, "update_resident", wraps=resolver.mapped.update_resident
+        ) as update_resident:
+            safe_zone = await resolver.async_get_safe_zone(-0.1, -0.1, "Etc/GMT+1")
+            assert safe_zone is not None
+            await resolver.async_get_safe_zone(0.6, 0.6, "Etc/GMT-2")
+            update_resident.assert_not_called()
+        assert resolver.as_dict()["data"]["backend"] == "mapped"
+        assert resolver.as_dict()["available"] is True
+        # Other resolvers still look up with tzfpy
+        assert resolver_module.get_tz is None
+        resolver.mapped.close()
+
+
+@pytest.mark.asyncio
+async def test_resolver_falls_back_to_tzfpy(hass: HomeAssistant, tmp_path, mock_tzfpy):
+    """Test a missing data file leaves tzfpy in use."""
+    resolver = TimezoneResolver(hass)
+    resolver.data_file = str(tmp_path / "missing.arvt")
+
+    with patch.object(resolver_module, "_load_tzfpy", return_value=True):
+        await resolver.async_ready()
+
+    assert resolver.mapped is None
+    assert await resolver.async_get_timezone(39.0, -104.0) == "America/New_York"
+    assert resolver.as_dict()["data"]["backend"] == "tzfpy"
@@ -0,0 +1,62 @@
+"""Test Arvee runtime metrics."""
+from custom_components.arvee.metrics import ArveeMetrics, Histogram
+
+
+class TestHistogram:
+    """Test the latency histogram."""
+
+    def test_empty(self):
+        """Test an empty histogram has no statistics."""
+        histogram = Histogram()
+
+        assert histogram.mean is None
+        assert histogram.percentile(50) is None
+        assert histogram.as_dict()["count"] == 0
+
+    def test_add(self):
+        """Test durations are recorded in milliseconds."""
+        histogram = Histogram((1, 10, 100))
+        for seconds in (0.0005, 0.002, 0.003, 0.05):
+            histogram.add(seconds)
+
+        assert histogram.count == 4
+        assert histogram.counts == [1, 2, 1, 0]
+        assert histogram.mean == (0.5 + 2 + 3 + 50) / 4
+        assert histogram.max == 50
+
+    def test_percentile(self):
+        """Test percentiles report the bucket bound holding them."""
+        histogram = Histogram((1, 10, 100))
+        for _ in range(99):
+            histogram.add(0.0005)
+        histogram.add(0.5)
+
+        assert histogram.percentile(50) == 1
+        assert histogram.percentile(99) == 1
+        # Past the last bucket the maximum is reported
+        assert histogram.percentile(100) == 500
+
+    def test_as_dict(self):
+        """Test the histogram is reported with labelled buckets."""
+        histogram = Histogram((1, 10))
+        histogram.add(0.005)
+
+        result = histogram.as_dict()
+        assert result["buckets"] == {"<=1": 0, "<=10": 1, ">10": 0}
+        assert result["mean_ms"] == 5.0
+        assert result["p50_ms"] == 10
+
+
+class TestArveeMetrics:
+    """Test the per-entry counters."""
+
+    def test_as_dict(self):
+        """Test counters and histograms are reported."""
+        metrics = ArveeMetrics()
+        metrics.events_received = 3
+        metrics.fix_to_config.add(0.1)
+
+        result = metrics.as_dict()
+        assert result["events_received"] == 3
+        assert result["config_updates"] == 0
+        assert result["fix_to_config"]["count"] == 1
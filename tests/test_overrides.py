@@ -0,0 +1,179 @@
+"""Test the user-defined timezone overrides."""
+from unittest.mock import patch
+
+import pytest
+
+from homeassistant.core import HomeAssistant
+from homeassistant.exceptions import HomeAssistantError
+from pytest_homeassistant_custom_component.common import MockConfigEntry
+
+from custom_components.arvee.const import (
+    ATTR_LATITUDE,
+    ATTR_LOCATION,
+    ATTR_LONGITUDE,
+    ATTR_NAME,
+    ATTR_RADIUS,
+    ATTR_TIMEZONE,
+    CONF_LATITUDE_ENTITY,
+    CONF_LONGITUDE_ENTITY,
+    CONF_UPDATE_THRESHOLD,
+    DATA_OVERRIDES,
+    DOMAIN,
+    OVERRIDES_STORAGE_KEY,
+    SERVICE_REMOVE_OVERRIDE,
+    SERVICE_SET_OVERRIDE,
+)
+from custom_components.arvee.overrides import (
+    LOCATION_HOLD,
+    LOCATION_PIN,
+    OverrideIndex,
+    RegionOverride,
+)
+
+_MARINA = RegionOverride.from_polygon(
+    "Marina", "America/Denver", [(36.90, -111.50), (36.90, -111.40), (37.00, -111.45)]
+)
+_CAMPGROUND = RegionOverride.circle("Campground", "America/Phoenix", 36.93, -111.45, 1.0)
+
+
+def test_contains():
+    """Test circles and polygons contain the points inside them."""
+    assert _CAMPGROUND.contains(36.93, -111.45)
+    assert _CAMPGROUND.contains(36.94, -111.45)
+    assert not _CAMPGROUND.contains(36.95, -111.45)
+
+    assert _MARINA.contains(36.95, -111.45)
+    assert not _MARINA.contains(36.95, -111.49)
+    assert not _MARINA.contains(36.85, -111.45)
+
+
+def test_smallest_match_wins():
+    """Test the smallest of overlapping overrides is used."""
+    index = OverrideIndex([_MARINA, _CAMPGROUND])
+
+    assert index.match(36.93, -111.45) is _CAMPGROUND
+    assert index.match(36.95, -111.45) is _MARINA
+    assert index.match(36.95, -111.49) is None
+    assert index.match(0.0, 0.0) is None
+
+
+def test_incremental_updates():
+    """Test setting and removing overrides leaves the index a rebuild would."""
+    index = OverrideIndex([_MARINA, _CAMPGROUND])
+    moved = RegionOverride.circle("Campground", "America/Phoenix", 40.0, -105.0, 1.0)
+    index.set(moved)
+
+    assert index.match(36.93, -111.45) is _MARINA
+    assert index.match(40.0, -105.0) is moved
+    assert index._cells == OverrideIndex([_MARINA, moved])._cells
+
+    assert index.remove("Marina")
+    assert not index.remove("Marina")
+    assert index._cells == OverrideIndex([moved])._cells
+    assert index.as_dict()["overrides"] == 1
+
+
+def test_stored_form():
+    """Test overrides survive their stored form and bad ones are refused."""
+    for override in (_MARINA, _CAMPGROUND):
+        assert RegionOverride.from_dict(override.as_dict()) == override
+
+    with pytest.raises(ValueError):
+        RegionOverride.from_dict({**_CAMPGROUND.as_dict(), "location": "teleport"})
+    with pytest.raises(ValueError):
+        RegionOverride.from_polygon("Line", "UTC", [(0, 0), (1, 1), (0, 0)])
+
+
+def _add_entry(hass: HomeAssistant) -> MockConfigEntry:
+    """Add an Arvee entry tracking the mock GPS entities."""
+    entry = MockConfigEntry(
+        domain=DOMAIN,
+        unique_id=DOMAIN,
+        data={
+            CONF_LATITUDE_ENTITY: "sensor.test_latitude",
+            CONF_LONGITUDE_ENTITY: "sensor.test_longitude",
+            CONF_UPDATE_THRESHOLD: 10.0,
+        },
+    )
+    entry.add_to_hass(hass)
+    return entry
+
+
+@pytest.mark.asyncio
+async def test_override_service(hass: HomeAssistant, hass_storage, mock_gps_entities, mock_tzfpy):
+    """Test setting an override changes the timezone in place and removing it reverts."""
+    entry = _add_entry(hass)
+    with patch("custom_components.arvee.UPDATE_SETTLE_TIME", 0.01):
+        assert await hass.config_entries.async_setup(entry.entry_id)
+        await hass.async_block_till_done()
+        assert hass.config.time_zone == "America/New_York"
+        mock_tzfpy.reset_mock()
+
+        await hass.services.async_call(
+            DOMAIN,
+            SERVICE_SET_OVERRIDE,
+            {
+                ATTR_NAME: "Pier",
+                ATTR_TIMEZONE: "America/Chicago",
+                ATTR_LOCATION: LOCATION_HOLD,
+                ATTR_LATITUDE: 40.7128,
+                ATTR_LONGITUDE: -74.0060,
+                ATTR_RADIUS: 2,
+            },
+            blocking=True,
+        )
+        await hass.async_block_till_done()
+
+        data = hass.data[DOMAIN][entry.entry_id]
+        assert hass.config.time_zone == "America/Chicago"
+        assert data["override"].name == "Pier"
+        assert data["metrics"].override_hits == 1
+        mock_tzfpy.assert_not_called()
+        assert hass_storage[OVERRIDES_STORAGE_KEY]["data"]["overrides"][0]["name"] == "Pier"
+
+        await hass.services.async_call(
+            DOMAIN, SERVICE_REMOVE_OVERRIDE, {ATTR_NAME: "Pier"}, blocking=True
+        )
+        await hass.async_block_till_done()
+
+        assert hass.config.time_zone == "America/New_York"
+        assert data["override"] is None
+        assert len(hass.data[DATA_OVERRIDES]) == 0
+
+        with pytest.raises(HomeAssistantError):
+            await hass.services.async_call(
+                DOMAIN, SERVICE_REMOVE_OVERRIDE, {ATTR_NAME: "Pier"}, blocking=True
+            )
+        with pytest.raises(HomeAssistantError):
+            await hass.services.async_call(
+                DOMAIN,
+                SERVICE_SET_OVERRIDE,
+                {ATTR_NAME: "Pier", ATTR_TIMEZONE: "UTC", ATTR_RADIUS: 2},
+                blocking=True,
+            )
+
+
+@pytest.mark.asyncio
+async def test_saved_override_pins_location(hass: HomeAssistant, hass_storage, mock_gps_entities, mock_tzfpy):
+    """Test saved overrides are loaded and a pinned one sets the site's position."""
+    pinned = RegionOverride.from_polygon(
+        "Harbor",
+        "America/Halifax",
+        [(40.6, -74.1), (40.8, -74.1), (40.8, -73.9), (40.6, -73.9)],
+        LOCATION_PIN,
+    )
+    hass_storage[OVERRIDES_STORAGE_KEY] = {
+        "version": 1,
+        "key": OVERRIDES_STORAGE_KEY,
+        "data": {"overrides": [pinned.as_dict(), {"name": "Broken"}]},
+    }
+    entry = _add_entry(hass)
+    with patch("custom_components.arvee.UPDATE_SETTLE_TIME", 0.01):
+        assert await hass.config_entries.async_setup(entry.entry_id)
+        await hass.async_block_till_done()
+
+    mock_tzfpy.assert_not_called()
+    assert hass.config.time_zone == "America/Halifax"
+    assert hass.config.latitude == pytest.approx(40.7)
+    assert hass.config.longitude == pytest.approx(-74.0)
+    assert len(hass.data[DATA_OVERRIDES]) == 1
@@ -0,0 +1,159 @@
+"""Test the country and region lookups."""
+from array import array
+import json
+from unittest.mock import patch
+
+import pytest
+
+from homeassistant.core import HomeAssistant
+from pytest_homeassistant_custom_component.common import MockConfigEntry
+
+from custom_components.arvee.const import (
+    CONF_LATITUDE_ENTITY,
+    CONF_LONGITUDE_ENTITY,
+    CONF_REGION_FILE,
+    CONF_UPDATE_THRESHOLD,
+    DATA_RESOLVER,
+    DOMAIN,
+)
+from custom_components.arvee.mapped import MappedTimezoneData, write_timezone_data
+from custom_components.arvee.region import load_countries
+from custom_components.arvee.resolver import TimezoneResolver
+from script import convert_regions
+
+# Two neighbouring states, drawn as boxes
+_REGIONS = {
+    "Colorado": [array("d", [-109, 37, -102, 37, -102, 41, -109, 41, -109, 37])],
+    "Kansas": [array("d", [-102, 37, -94.6, 37, -94.6, 40, -102, 40, -102, 37])],
+}
+_BOUNDS = (36.0, -110.0, 42.0, -94.0)
+
+
+@pytest.fixture(name="region_file")
+def region_file_fixture(tmp_path):
+    """Write a region file for the two states and return its path."""
+    path = str(tmp_path / "regions.arvt")
+    write_timezone_data(path, 0.5, _REGIONS, _REGIONS.get, _BOUNDS)
+    return path
+
+
+def _get_tz(lon: float, lat: float) -> str:
+    """Return a timezone that changes at 101.5 degrees west."""
+    return "America/Denver" if lon < -101.5 else "America/Chicago"
+
+
+def test_countries():
+    """Test every timezone on land has a country."""
+    countries = load_countries()
+    assert countries["America/Denver"] == ("US", "United States")
+    assert countries["America/Toronto"] == ("CA", "Canada")
+    assert "Etc/GMT+7" not in countries
+
+    tzfpy = pytest.importorskip("tzfpy")
+    assert [
+        name
+        for name in tzfpy.timezonenames()
+        if name not in countries and not name.startswith("Etc/")
+    ] == []
+
+
+def test_convert_regions(tmp_path, capsys):
+    """Test GeoJSON areas are converted, with split areas merged."""
+    features = [
+        {
+            "type": "Feature",
+            "properties": {"name": name},
+            "geometry": {
+                "type": "Polygon",
+                "coordinates": [list(zip(ring[0::2], ring[1::2]))],
+            },
+        }
+        for name, rings in _REGIONS.items()
+        for ring in rings
+    ]
+    features.append({
+        "type": "Feature",
+        "properties": {"name": "Colorado"},
+        "geometry": {
+            "type": "Polygon",
+            "coordinates": [[[-109, 36.2], [-108, 36.2], [-108, 36.8], [-109, 36.8], [-109, 36.2]]],
+        },
+    })
+    source = tmp_path / "regions.geojson"
+    source.write_text(json.dumps({"type": "FeatureCollection", "features": features}))
+    output = str(tmp_path / "regions.arvt")
+
+    convert_regions.main([str(source), output, "--bounds", *map(str, _BOUNDS)])
+
+    assert json.loads(capsys.readouterr().out)["regions"] == 2
+    data = MappedTimezoneData(output)
+    assert data.get_tz(-104.99, 39.74) == "Colorado"
+    assert data.get_tz(-97.34, 37.69) == "Kansas"
+    assert data.get_tz(-108.5, 36.5) == "Colorado"
+    assert data.get_tz(-90.0, 38.0) is None
+    data.close()
+
+
+@pytest.mark.asyncio
+async def test_resolver_regions(hass: HomeAssistant, region_file, mock_tzfpy):
+    """Test regions are looked up on the worker and cached by cell."""
+    resolver = TimezoneResolver(hass)
+    resolver.region_file = region_file
+    with patch("custom_components.arvee.resolver._load_tzfpy", return_value=True):
+        assert await resolver.async_ready()
+
+    assert resolver.country("America/Denver") == ("US", "United States")
+    assert await resolver.async_get_region(39.74, -104.99) == "Colorado"
+    assert await resolver.async_get_region(39.76, -104.97) == "Colorado"
+    assert resolver.region_lookups == 1
+    assert await resolver.async_get_region(39.55, -102.5) == "Colorado"
+    assert await resolver.async_get_region(30.0, -100.0) is None
+    assert resolver.as_dict()["regions"]["regions"] == 2
+    resolver.regions.close()
+
+
+@pytest.mark.asyncio
+async def test_region_sensors(hass: HomeAssistant, region_file, mock_tzfpy):
+    """Test the sensors follow the position and only change with it."""
+    mock_tzfpy.side_effect = _get_tz
+    hass.states.async_set("sensor.test_latitude", "39.74")
+    hass.states.async_set("sensor.test_longitude", "-104.99")
+    entry = MockConfigEntry(
+        domain=DOMAIN,
+        title="Arvee",
+        unique_id=DOMAIN,
+        data={
+            CONF_LATITUDE_ENTITY: "sensor.test_latitude",
+            CONF_LONGITUDE_ENTITY: "sensor.test_longitude",
+            CONF_UPDATE_THRESHOLD: 10.0,
+        },
+        options={CONF_REGION_FILE: region_file},
+    )
+    entry.add_to_hass(hass)
+
+    with patch("custom_components.arvee.UPDATE_SETTLE_TIME", 0.01), patch(
+        "custom_components.arvee.resolver._load_tzfpy", return_value=True
+    ):
+        assert await hass.config_entries.async_setup(entry.entry_id)
+        await hass.async_block_till_done()
+
+        country = hass.states.get("sensor.arvee_country")
+        assert country.state == "United States"
+        assert country.attributes["country_code"] == "US"
+        region = hass.states.get("sensor.arvee_region")
+        assert region.state == "Colorado"
+
+        # Moving within the state doesn't write the sensors
+        hass.states.async_set("sensor.test_latitude", "40.9")
+        await hass.async_block_till_done()
+        assert hass.data[DOMAIN][entry.entry_id]["last_lat"] == 40.9
+        assert hass.states.get("sensor.arvee_region").last_updated == region.last_updated
+
+        # Crossing into Kansas does, before the timezone changes
+        hass.states.async_set("sensor.test_latitude", "39.0")
+        hass.states.async_set("sensor.test_longitude", "-101.8")
+        await hass.async_block_till_done()
+        assert hass.states.get("sensor.arvee_region").state == "Kansas"
+        assert hass.states.get("sensor.arvee_country").last_updated == country.last_updated
+
+    hass.data[DATA_RESOLVER].regions.close()
@@ -0,0 +1,38 @@
+"""Replay recorded GPS traces and compare their cost to the baselines."""
+import pytest
+
+from homeassistant.core import HomeAssistant
+
+from .replay import TRACES_DIR, async_replay, load_baselines, load_trace
+
+pytest.importorskip("tzfpy")
+
+BASELINES = load_baselines()
+
+
+class TestLoadTrace:
+    """Test trace parsing."""
+
+    def test_csv(self):
+        """Test CSV traces are parsed with accuracy."""
+        fixes = load_trace(TRACES_DIR / "i70_denver_kansas_city.csv.gz")
+        assert len(fixes) > 1000
+        assert fixes[0].accuracy is not None
+        assert all(a.timestamp <= b.timestamp for a, b in zip(fixes, fixes[1:]))
+
+    def test_gpx(self):
+        """Test GPX track points are parsed."""
+        fixes = load_trace(TRACES_DIR / "ontario_campground_parked.gpx.gz")
+        assert len(fixes) == 600
+        assert fixes[0].latitude == pytest.approx(44.0266, abs=0.01)
+
+
+@pytest.mark.asyncio
+@pytest.mark.parametrize("trace", sorted(BASELINES))
+async def test_trace_within_baseline(hass: HomeAssistant, trace: str):
+    """Test replaying a trace costs no more than its recorded baseline."""
+    report = await async_replay(hass, load_trace(TRACES_DIR / trace), trace)
+
+    assert report.fixes > 0
+    for counter, baseline in BASELINES[trace].items():
+        assert report.counters()[counter] <= baseline, (counter, report.as_dict())
@@ -0,0 +1,215 @@
+"""Test the timezone resolver."""
+import json
+from unittest.mock import MagicMock, patch
+
+import pytest
+
+from homeassistant.core import HomeAssistant
+
+from custom_components.arvee import resolver as resolver_module
+from custom_components.arvee.resolver import BORDER, TimezoneCache, TimezoneResolver
+
+
+def _split_tz(lon, lat):
+    """Return a fake timezone split at longitude -80.5."""
+    return "America/Chicago" if lon < -80.5 else "America/New_York"
+
+
+def _polygon(*rings: list[tuple[float, float]]) -> str:
+    """Return GeoJSON for a polygon with rings of lon/lat points."""
+    return json.dumps({
+        "type": "FeatureCollection",
+        "features": [
+            {
+                "type": "Feature",
+                "geometry": {
+                    "type": "Polygon",
+                    "coordinates": [[list(point) for point in ring] for ring in rings],
+                },
+            }
+        ],
+    })
+
+
+@pytest.fixture(name="zone_polygon")
+def zone_polygon_fixture():
+    """Patch in the polygon of the mocked zone."""
+    with patch.object(resolver_module, "get_tz_polygon_geojson") as geojson:
+        resolver_module._zone_rings.cache_clear()
+        yield geojson
+    resolver_module._zone_rings.cache_clear()
+
+
+class TestTimezoneCache:
+    """Test the grid-keyed LRU cache."""
+
+    def test_cell_key(self):
+        """Test coordinates map to floor-divided grid cells."""
+        cache = TimezoneCache(0.5, 8)
+        assert cache.cell(40.7, -74.2) == (81, -149)
+        assert cache.cell(40.9, -74.01) == (81, -149)
+
+    def test_miss_then_hit(self):
+        """Test hit and miss accounting."""
+        cache = TimezoneCache(0.5, 8)
+        assert cache.get((1, 1)) is None
+        cache.put((1, 1), "America/New_York")
+        assert cache.get((1, 1)) == "America/New_York"
+        assert (cache.hits, cache.misses) == (1, 1)
+
+    def test_lru_eviction(self):
+        """Test the least recently used cell is evicted."""
+        cache = TimezoneCache(0.5, 2)
+        cache.put((0, 0), "A")
+        cache.put((0, 1), "B")
+        cache.get((0, 0))
+        cache.put((0, 2), "C")
+
+        assert len(cache) == 2
+        assert cache.get((0, 1)) is None
+        assert cache.get((0, 0)) == "A"
+
+    def test_configure_new_cell_size_clears(self):
+        """Test changing the cell size drops cached cells."""
+        cache = TimezoneCache(0.5, 8)
+        cache.put((0, 0), "A")
+        cache.configure(0.5, 8)
+        assert len(cache) == 1
+        cache.configure(0.25, 8)
+        assert len(cache) == 0
+
+
+@pytest.mark.asyncio
+class TestTimezoneResolver:
+    """Test cached timezone resolution."""
+
+    async def test_repeat_lookup_uses_cache(self, hass: HomeAssistant, mock_tzfpy, zone_polygon):
+        """Test a second fix in the same cell is answered from the cache."""
+        zone_polygon.return_value = _polygon([(-75, 40), (-73, 40), (-73, 42), (-75, 42), (-75, 40)])
+        resolver = TimezoneResolver(hass, cell_size=0.1)
+
+        assert await resolver.async_get_timezone(40.71, -74.01) == "America/New_York"
+        calls = mock_tzfpy.call_count
+        assert await resolver.async_get_timezone(40.72, -74.02) == "America/New_York"
+
+        assert mock_tzfpy.call_count == calls
+        assert resolver.lookups == 1
+
+    async def test_border_cell_falls_back(self, hass: HomeAssistant, mock_tzfpy):
+        """Test a cell crossed by a border is always looked up exactly."""
+        mock_tzfpy.side_effect = _split_tz
+        resolver = TimezoneResolver(hass, cell_size=1.0)
+
+        assert await resolver.async_get_timezone(40.5, -80.6) == "America/Chicago"
+        assert resolver.cache.get(resolver.cache.cell(40.5, -80.6)) == BORDER
+
+        mock_tzfpy.reset_mock()
+        assert await resolver.async_get_timezone(40.5, -80.4) == "America/New_York"
+        mock_tzfpy.assert_called_once_with(-80.4, 40.5)
+        assert resolver.lookups == 2
+
+    async def test_border_between_samples(self, hass: HomeAssistant, mock_tzfpy, zone_polygon):
+        """Test a cell holding part of a border is found from the polygon's edges."""
+        # A small enclave inside the cell that no corner or midpoint reaches
+        zone_polygon.return_value = _polygon(
+            [(-75, 40), (-73, 40), (-73, 42), (-75, 42), (-75, 40)],
+            [(-74.03, 40.71), (-74.02, 40.71), (-74.02, 40.72), (-74.03, 40.71)],
+        )
+        resolver = TimezoneResolver(hass, cell_size=0.1)
+
+        assert await resolver.async_get_timezone(40.75, -74.05) == "America/New_York"
+        assert resolver.cache.get(resolver.cache.cell(40.75, -74.05)) == BORDER
+
+    async def test_zone_at_corner(self, hass: HomeAssistant, mock_tzfpy, zone_polygon):
+        """Test a cell another zone reaches into at a corner isn't cached."""
+        # The zone's own polygon has no edge in the cell
+        zone_polygon.return_value = _polygon(
+            [(-75, 40), (-73, 40), (-73, 42), (-75, 42), (-75, 40)]
+        )
+        mock_tzfpy.side_effect = lambda lon, lat: (
+            "America/Chicago" if lon < -74.09 and lat > 40.79 else "America/New_York"
+        )
+        resolver = TimezoneResolver(hass, cell_size=0.1)
+
+        assert await resolver.async_get_timezone(40.75, -74.05) == "America/New_York"
+        assert resolver.cache.get(resolver.cache.cell(40.75, -74.05)) == BORDER
+
+    async def test_overlap_at_corner(self, hass: HomeAssistant, mock_tzfpy, zone_polygon):
+        """Test a cell where zones overlap away from the coordinate isn't cached."""
+        zone_polygon.return_value = _polygon(
+            [(-75, 40), (-73, 40), (-73, 42), (-75, 42), (-75, 40)]
+        )
+
+        def get_tzs(lon, lat):
+            if lat > 40.79:
+                return ["America/New_York", "America/Toronto"]
+            return ["America/New_York"]
+
+        with patch.object(resolver_module, "get_tzs", get_tzs):
+            resolver = TimezoneResolver(hass, cell_size=0.1)
+            assert await resolver.async_get_timezone(40.75, -74.05) == "America/New_York"
+            assert resolver.cache.get(resolver.cache.cell(40.75, -74.05)) == BORDER
+
+            # A cell of one zone throughout is kept
+            assert await resolver.async_get_timezone(40.65, -74.05) == "America/New_York"
+            assert resolver.cache.get(resolver.cache.cell(40.65, -74.05)) == "America/New_York"
+
+    async def test_no_polygons_not_cached(self, hass: HomeAssistant, mock_tzfpy):
+        """Test only exact answers are kept without polygons to check the cell."""
+        resolver = TimezoneResolver(hass, cell_size=0.1)
+
+        assert await resolver.async_get_timezone(40.71, -74.01) == "America/New_York"
+        assert resolver.cache.get(resolver.cache.cell(40.71, -74.01)) == BORDER
+
+    async def test_unknown_timezone_not_cached(self, hass: HomeAssistant, mock_tzfpy):
+        """Test a failed lookup marks the cell for exact lookups."""
+        mock_tzfpy.return_value = None
+        resolver = TimezoneResolver(hass)
+
+        assert await resolver.async_get_timezone(0.0, 0.0) is None
+        assert resolver.cache.get(resolver.cache.cell(0.0, 0.0)) == BORDER
+
+
+@pytest.mark.asyncio
+class TestTzfpyWarmup:
+    """Test deferred loading of tzfpy."""
+
+    async def test_warmup_loads_tzfpy(self, hass: HomeAssistant):
+        """Test warm-up imports tzfpy and loads its data in the executor."""
+        mock_get_tz = MagicMock(return_value="Etc/GMT")
+        with patch.dict("sys.modules", {"tzfpy": MagicMock(get_tz=mock_get_tz)}), patch.multiple(
+            resolver_module,
+            TZFPY_AVAILABLE=None,
+            get_tz=None,
+            get_tz_polygon_geojson=None,
+            get_tzs=None,
+            timezone_names=None,
+        ):
+            resolver = TimezoneResolver(hass)
+            assert resolver.available is None
+
+            assert await resolver.async_ready() is True
+            assert resolver.available is True
+            assert resolver.load_time is not None
+            mock_get_tz.assert_called_once_with(0.0, 0.0)
+
+            assert await resolver.async_get_timezone(10.0, 10.0) == "Etc/GMT"
+
+    async def test_warmup_runs_once(self, hass: HomeAssistant, mock_tzfpy):
+        """Test concurrent lookups share a single warm-up."""
+        resolver = TimezoneResolver(hass)
+        resolver.async_start_warmup()
+        warmup = resolver._warmup
+        resolver.async_start_warmup()
+
+        assert resolver._warmup is warmup
+        assert await resolver.async_ready() is True
+
+    async def test_tzfpy_missing(self, hass: HomeAssistant):
+        """Test a missing tzfpy is reported as unavailable."""
+        with patch.dict("sys.modules", {"tzfpy": None}), patch.multiple(
+            resolver_module, TZFPY_AVAILABLE=None
+        ):
+            resolver = TimezoneResolver(hass)
+            assert await resolver.async_ready() is False
+            assert resolver.available is False
@@ -0,0 +1,136 @@
+"""Test planned routes."""
+import pytest
+
+from custom_components.arvee.route import (
+    TRANSITION_MARGIN,
+    Route,
+    decode_polyline,
+    parse_gpx,
+)
+
+
+def _get_tz(lon: float, lat: float) -> str:
+    """Return a timezone that changes at 101.5 degrees west."""
+    return "America/Denver" if lon < -101.5 else "America/Chicago"
+
+
+# Denver to Kansas City along the 39th parallel
+_POINTS = [(39.0, -105.0), (39.0, -103.0), (39.0, -100.0), (39.0, -94.6)]
+
+
+class TestParsing:
+    """Test reading routes."""
+
+    def test_gpx_track(self):
+        """Test track points are read in order, with or without a prefix."""
+        gpx = """<?xml version="1.0"?>
+        <gpx:gpx xmlns:gpx="http://www.topografix.com/GPX/1/1">
+          <gpx:wpt lat="1" lon="1"><gpx:name>Camp</gpx:name></gpx:wpt>
+          <gpx:trk><gpx:trkseg>
+            <gpx:trkpt lat="39.74" lon="-104.99"><gpx:ele>1600</gpx:ele></gpx:trkpt>
+            <gpx:trkpt lon='-94.58' lat='39.10'/>
+          </gpx:trkseg></gpx:trk>
+        </gpx:gpx>"""
+
+        assert parse_gpx(gpx) == [(39.74, -104.99), (39.10, -94.58)]
+
+    def test_gpx_waypoints(self):
+        """Test waypoints are used when there's no track or route."""
+        gpx = '<gpx><wpt lat="39.74" lon="-104.99"/><wpt lat="39.10" lon="-94.58"/></gpx>'
+
+        assert parse_gpx(gpx) == [(39.74, -104.99), (39.10, -94.58)]
+
+    @pytest.mark.parametrize(
+        "gpx", ["<gpx></gpx>", '<gpx><trkpt lat="39.74"/></gpx>', "not gpx"]
+    )
+    def test_gpx_invalid(self, gpx):
+        """Test GPX without usable points is rejected."""
+        with pytest.raises(ValueError):
+            parse_gpx(gpx)
+
+    def test_polyline(self):
+        """Test the reference example of the encoded polyline format."""
+        assert decode_polyline("_p~iF~ps|U_ulLnnqC_mqNvxq`@") == [
+            (38.5, -120.2),
+            (40.7, -120.95),
+            (43.252, -126.453),
+        ]
+
+    def test_polyline_truncated(self):
+        """Test a polyline cut off mid-value is rejected."""
+        with pytest.raises(ValueError):
+            decode_polyline("_p~iF~ps|U_")
+
+
+class TestRoute:
+    """Test transitions and placing fixes on a route."""
+
+    def test_transitions(self):
+        """Test a transition is found where the timezone changes."""
+        route = Route.build(_POINTS, _get_tz)
+
+        assert len(route.transitions) == 1
+        transition = route.transitions[0]
+        assert transition.previous == "America/Denver"
+        assert transition.timezone == "America/Chicago"
+        assert transition.longitude == pytest.approx(-101.5, abs=0.001)
+        assert 540 < route.total_distance < 580
+        assert route.timezone_at(0) == "America/Denver"
+        assert route.timezone_at(route.total_distance) == "America/Chicago"
+        assert route.next_transition(0) is transition
+        assert route.next_transition(transition.distance + 1) is None
+
+    def test_lookups_are_bounded(self):
+        """Test the number of lookups follows the route's length."""
+        calls = []
+
+        def get_tz(lon, lat):
+            calls.append((lon, lat))
+            return _get_tz(lon, lat)
+
+        route = Route.build(_POINTS, get_tz)
+
+        assert len(calls) < route.total_distance / 0.25 + 20
+
+    def test_locate(self):
+        """Test fixes on the route get its timezone, unless near a transition."""
+        route = Route.build(_POINTS, _get_tz)
+
+        position = route.locate(39.001, -104.0)
+        assert position.timezone == "America/Denver"
+        assert position.offset < 0.1
+        assert route.locate(39.001, -98.0).timezone == "America/Chicago"
+        near = route.locate(39.0, -101.5 + 0.5 * TRANSITION_MARGIN / 54)
+        assert near is not None
+        assert near.timezone is None
+
+    def test_long_leg_index(self):
+        """Test a long diagonal leg is indexed along its length, not its bounding box."""
+        route = Route.build([(30.0, -120.0), (45.0, -80.0)], _get_tz)
+
+        # The bounding box alone holds 240,000 cells
+        assert len(route._index) < 10_000
+        assert route.locate(37.5, -100.0) is not None
+        assert route.locate(30.0, -80.0) is None
+
+    def test_off_route(self):
+        """Test fixes away from the route aren't placed on it."""
+        route = Route.build(_POINTS, _get_tz)
+
+        assert route.locate(39.1, -104.0) is None
+        assert route.locate(45.0, -104.0) is None
+
+    def test_out_and_back(self):
+        """Test the pass nearest the previous position is used."""
+        route = Route.build([(39.0, -105.0), (39.0, -104.0), (39.0, -105.0)], _get_tz)
+
+        outbound = route.locate(39.0, -104.5, near=10.0)
+        inbound = route.locate(39.0, -104.5, near=route.total_distance - 10.0)
+
+        assert outbound.distance == pytest.approx(route.total_distance / 4, rel=0.01)
+        assert inbound.distance == pytest.approx(route.total_distance * 3 / 4, rel=0.01)
+
+    def test_too_short(self):
+        """Test a route needs two points."""
+        with pytest.raises(ValueError):
+            Route.build([(39.0, -105.0)], _get_tz)
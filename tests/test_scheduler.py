@@ -0,0 +1,92 @@
+"""Test the location update scheduler."""
+import asyncio
+
+import pytest
+
+from homeassistant.core import HomeAssistant
+
+from custom_components.arvee.scheduler import LocationUpdateScheduler
+
+
+@pytest.mark.asyncio
+class TestLocationUpdateScheduler:
+    """Test coalescing of location updates."""
+
+    async def test_requests_in_settle_window_coalesce(self, hass: HomeAssistant):
+        """Test back to back requests run a single update."""
+        calls = []
+
+        async def update():
+            calls.append(1)
+
+        scheduler = LocationUpdateScheduler(hass, update, 0.01)
+        scheduler.async_schedule()
+        scheduler.async_schedule()
+        scheduler.async_schedule()
+        await hass.async_block_till_done()
+
+        assert len(calls) == 1
+        assert not scheduler.running
+
+    async def test_request_during_update_runs_once_more(self, hass: HomeAssistant):
+        """Test requests made while running collapse into one follow-up."""
+        calls = []
+        release = asyncio.Event()
+
+        async def update():
+            calls.append(1)
+            if len(calls) == 1:
+                await release.wait()
+
+        scheduler = LocationUpdateScheduler(hass, update, 0.01)
+        scheduler.async_schedule()
+        await asyncio.sleep(0.05)
+        assert len(calls) == 1
+
+        for _ in range(5):
+            scheduler.async_schedule()
+        release.set()
+        await hass.async_block_till_done()
+
+        assert len(calls) == 2
+
+    async def test_refresh_runs_immediately(self, hass: HomeAssistant):
+        """Test refresh runs without waiting for the settle window."""
+        calls = []
+
+        async def update():
+            calls.append(1)
+
+        scheduler = LocationUpdateScheduler(hass, update, 60)
+        await scheduler.async_refresh()
+
+        assert len(calls) == 1
+
+    async def test_update_error_is_contained(self, hass: HomeAssistant):
+        """Test a failing update doesn't wedge the scheduler."""
+        calls = []
+
+        async def update():
+            calls.append(1)
+            raise ValueError("boom")
+
+        scheduler = LocationUpdateScheduler(hass, update, 0.01)
+        await scheduler.async_refresh()
+        await scheduler.async_refresh()
+
+        assert len(calls) == 2
+
+    async def test_shutdown_cancels_pending(self, hass: HomeAssistant):
+        """Test shutdown drops a pending update."""
+        calls = []
+
+        async def update():
+            calls.append(1)
+
+        scheduler = LocationUpdateScheduler(hass, update, 60)
+        scheduler.async_schedule()
+        await scheduler.async_shutdown()
+        await hass.async_block_till_done()
+
+        assert calls == []
+        assert not scheduler.running
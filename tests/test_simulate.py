@@ -0,0 +1,279 @@
+"""Test the dry-run simulation of the location update pipeline."""
+import json
+from unittest.mock import patch
+
+import pytest
+
+from homeassistant.core import HomeAssistant
+from homeassistant.exceptions import HomeAssistantError
+from pytest_homeassistant_custom_component.common import MockConfigEntry
+
+from custom_components.arvee.boundary import SafeZone
+from custom_components.arvee.const import (
+    ATTR_COORDINATES,
+    ATTR_INTERVAL,
+    ATTR_LATITUDE,
+    ATTR_LONGITUDE,
+    ATTR_OUTPUT,
+    ATTR_TIME,
+    CONF_LATITUDE_ENTITY,
+    CONF_LOCATION_INTERVAL,
+    CONF_LONGITUDE_ENTITY,
+    CONF_UPDATE_THRESHOLD,
+    DATA_RESOLVER,
+    DOMAIN,
+    SERVICE_SIMULATE,
+)
+from custom_components.arvee.overrides import OverrideIndex, RegionOverride
+from custom_components.arvee.simulate import SimulatedFix, Simulation
+
+from .replay import TRACES_DIR, async_replay, load_trace
+
+# One fix a second at 60 mph, heading east along 39 degrees north
+_SPEED = 60 / 3600 / 53.7  # degrees of longitude per second
+
+
+def _timezone(lat: float, lon: float) -> str:
+    """Return a timezone that changes at 101.5 degrees west."""
+    return "America/Denver" if lon < -101.5 else "America/Chicago"
+
+
+async def _get_tz(lat: float, lon: float) -> str:
+    """Look up the timezone of a fix."""
+    return _timezone(lat, lon)
+
+
+async def _safe_zone(lat: float, lon: float, timezone: str) -> SafeZone:
+    """Return the disc around a fix reaching the border at 101.5 degrees west."""
+    return SafeZone(lat, lon, abs(lon + 101.5) * 53.7, timezone)
+
+
+def _simulation(**kwargs) -> Simulation:
+    """Return a simulation with the default options, set up at the start of the drive."""
+    options = {
+        "update_threshold": 10.0,
+        "location_threshold": 10.0,
+        "location_interval": 900.0,
+        "home": (39.0, -104.0),
+        "time_zone": "America/Denver",
+        **kwargs,
+    }
+    return Simulation(_get_tz, _safe_zone, **options)
+
+
+def _drive(seconds: int, start: float = 1_700_000_000) -> list[SimulatedFix]:
+    """Return the fixes of a drive east from 104 degrees west."""
+    return [
+        SimulatedFix(start + step, 39.0, -104.0 + step * _SPEED)
+        for step in range(seconds)
+    ]
+
+
+@pytest.mark.asyncio
+async def test_drive_across_border():
+    """Test a long drive makes few lookups and writes, and one timezone change."""
+    simulation = _simulation()
+    summary = await simulation.async_run(_drive(4 * 3600))
+
+    assert summary["fixes"] == 4 * 3600
+    assert summary["accepted"] < 60
+    assert summary["below_threshold"] == summary["fixes"] - summary["accepted"]
+    # The change is held once, until half a mile past where it crossed
+    assert summary["border_holds"] == 1
+    assert summary["lookups"] < 60
+    assert [(change["from"], change["to"]) for change in summary["timezone_changes"]] == [
+        ("America/Denver", "America/Chicago")
+    ]
+    # One write an interval at most, plus the timezone change
+    assert 1 < summary["config_writes"] <= 4 * 4 + 1
+    assert simulation.timezone == "America/Chicago"
+
+
+@pytest.mark.asyncio
+async def test_parked_jitter_writes_nothing():
+    """Test GPS jitter while parked is never accepted."""
+    fixes = [
+        SimulatedFix(1_700_000_000 + step, 39.0 + (step % 3) * 1e-5, -104.0)
+        for step in range(3600)
+    ]
+    summary = await _simulation().async_run(fixes)
+
+    assert summary["accepted"] == 0
+    assert summary["config_writes"] == 0
+    assert summary["timezone_changes"] == []
+
+
+@pytest.mark.asyncio
+async def test_parked_past_border():
+    """Test a vehicle parked just past a border changes timezone after a while."""
+    # Stop a fifth of a mile past the border, never clear of the crossing,
+    # then sit there for ten minutes
+    fixes = [fix for fix in _drive(3 * 3600) if fix.longitude < -101.5 + 0.2 / 53.7]
+    end = fixes[-1]
+    fixes += [
+        SimulatedFix(end.time + step, end.latitude + (step % 3) * 1e-5, end.longitude)
+        for step in range(1, 600)
+    ]
+    summary = await _simulation().async_run(fixes)
+
+    assert summary["border_holds"] == 1
+    assert [change["to"] for change in summary["timezone_changes"]] == ["America/Chicago"]
+    assert summary["lookups"] < 60
+
+
+@pytest.mark.asyncio
+async def test_smoothing_drops_outliers():
+    """Test the jitter filter rejects a fix far off the track."""
+    fixes = _drive(600)
+    fixes[300] = SimulatedFix(fixes[300].time, 40.0, -104.0, 5.0)
+    summary = await _simulation(smoothing=True).async_run(fixes)
+
+    assert summary["dropped"] == 1
+    assert summary["timezone_changes"] == []
+
+
+@pytest.mark.asyncio
+async def test_override_wins():
+    """Test an override answers for the fixes inside it without a lookup."""
+    overrides = OverrideIndex([
+        RegionOverride.circle("Camp", "America/Phoenix", 39.0, -103.0, 2.0)
+    ])
+    summary = await _simulation(overrides=overrides).async_run(_drive(3600))
+
+    assert summary["override_hits"] >= 1
+    assert [change["to"] for change in summary["timezone_changes"]] == [
+        "America/Phoenix",
+        "America/Denver",
+    ]
+
+
+@pytest.mark.asyncio
+async def test_results_streamed():
+    """Test each fix and write is streamed as a line of JSON."""
+    streamed = []
+
+    async def output(lines):
+        streamed.extend(lines)
+
+    summary = await _simulation(location_interval=0).async_run(_drive(3600), output)
+
+    lines = [json.loads(line) for line in streamed]
+    writes = [line for line in lines if "write" in line]
+    assert len(lines) == summary["fixes"] + summary["config_writes"]
+    assert len(writes) == summary["config_writes"]
+    assert lines[0]["result"] == "below_threshold"
+
+
+@pytest.mark.asyncio
+async def test_matches_live_updates(hass: HomeAssistant):
+    """Test a trace gives the same results replayed live and simulated."""
+    pytest.importorskip("tzfpy")
+    fixes = load_trace(TRACES_DIR / "i70_denver_kansas_city.csv.gz")
+    home = (hass.config.latitude, hass.config.longitude)
+    time_zone = hass.config.time_zone
+
+    report = await async_replay(hass, fixes)
+
+    resolver = hass.data[DATA_RESOLVER]
+    simulation = Simulation(
+        resolver.async_get_timezone,
+        resolver.async_get_safe_zone,
+        10.0,
+        10.0,
+        900.0,
+        home=home,
+        time_zone=time_zone,
+    )
+    summary = await simulation.async_run(
+        [SimulatedFix(fix.timestamp, fix.latitude, fix.longitude, fix.accuracy) for fix in fixes],
+    )
+
+    live = report.metrics
+    assert summary["accepted"] == live["updates"] - live["below_threshold"]
+    for counter in ("below_threshold", "safe_zone_hits", "border_holds", "lookups"):
+        assert summary[counter] == live[counter], counter
+    assert summary["config_writes"] == report.config_updates
+    assert [change["to"] for change in summary["timezone_changes"]] == report.time_zones
+    assert len(report.time_zones) > 1
+
+
+@pytest.mark.asyncio
+async def test_simulate_service(hass: HomeAssistant, mock_gps_entities, mock_tzfpy, tmp_path):
+    """Test the service replays fixes without touching the configuration."""
+    entry = MockConfigEntry(
+        domain=DOMAIN,
+        unique_id=DOMAIN,
+        data={
+            CONF_LATITUDE_ENTITY: "sensor.test_latitude",
+            CONF_LONGITUDE_ENTITY: "sensor.test_longitude",
+            CONF_UPDATE_THRESHOLD: 10.0,
+        },
+    )
+    entry.add_to_hass(hass)
+    with patch("custom_components.arvee.UPDATE_SETTLE_TIME", 0.01):
+        assert await hass.config_entries.async_setup(entry.entry_id)
+        await hass.async_block_till_done()
+    mock_tzfpy.side_effect = lambda lon, lat: _timezone(lat, lon)
+    written = hass.config.as_dict()
+
+    coordinates = [
+        {ATTR_LATITUDE: fix.latitude, ATTR_LONGITUDE: round(fix.longitude, 6)}
+        for fix in _drive(3 * 3600)[::10]
+    ]
+    response = await hass.services.async_call(
+        DOMAIN,
+        SERVICE_SIMULATE,
+        {
+            ATTR_COORDINATES: coordinates,
+            ATTR_INTERVAL: 10,
+            CONF_LOCATION_INTERVAL: 0,
+        },
+        blocking=True,
+        return_response=True,
+    )
+
+    assert response["fixes"] == len(coordinates)
+    # Home Assistant is set up in New York, so the replay starts with a change
+    assert [change["to"] for change in response["timezone_changes"]] == [
+        "America/Denver",
+        "America/Chicago",
+    ]
+    assert response["config_writes"] > 1
+    assert hass.config.as_dict() == written
+
+    # Points with times, such as those returned by get_track, keep them
+    response = await hass.services.async_call(
+        DOMAIN,
+        SERVICE_SIMULATE,
+        {
+            ATTR_COORDINATES: [
+                {**point, ATTR_TIME: f"2026-05-16T08:{minute:02}:00+00:00", "timezone": None}
+                for minute, point in enumerate(coordinates[:60])
+            ],
+        },
+        blocking=True,
+        return_response=True,
+    )
+    assert response["fixes"] == 60
+
+    # Results are written to allowed paths as the replay goes
+    hass.config.allowlist_external_dirs = {str(tmp_path)}
+    response = await hass.services.async_call(
+        DOMAIN,
+        SERVICE_SIMULATE,
+        {ATTR_COORDINATES: coordinates, ATTR_OUTPUT: str(tmp_path / "out.jsonl")},
+        blocking=True,
+        return_response=True,
+    )
+    lines = (tmp_path / "out.jsonl").read_text().splitlines()
+    assert len(lines) == response["fixes"] + response["config_writes"]
+    hass.config.allowlist_external_dirs = set()
+
+    with pytest.raises(HomeAssistantError):
+        await hass.services.async_call(
+            DOMAIN,
+            SERVICE_SIMULATE,
+            {ATTR_COORDINATES: coordinates, ATTR_OUTPUT: str(tmp_path / "out.jsonl")},
+            blocking=True,
+            return_response=True,
+        )
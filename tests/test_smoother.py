@@ -0,0 +1,83 @@
+"""Test the Arvee GPS jitter filter."""
+import random
+
+import pytest
+
+from custom_components.arvee.smoother import MAX_REJECTIONS, METERS_PER_DEGREE, KalmanSmoother
+from custom_components.arvee.source import GpsFix
+
+
+def _drive(smoother: KalmanSmoother, seconds: int, noise: float = 0.0) -> GpsFix:
+    """Feed fixes moving north at 25 m/s, returning the last estimate."""
+    rng = random.Random(1)
+    estimate = None
+    for second in range(seconds):
+        lat = 40.0 + (second * 25 + rng.gauss(0, noise)) / METERS_PER_DEGREE
+        estimate = smoother.update(GpsFix(lat, -105.0, max(noise, 5.0)), second)
+    return estimate
+
+
+class TestKalmanSmoother:
+    """Test smoothing and outlier rejection."""
+
+    def test_first_fix(self):
+        """Test the first fix is passed through."""
+        smoother = KalmanSmoother()
+        fix = GpsFix(40.0, -105.0, 10.0)
+
+        assert smoother.update(fix, 0) == fix
+
+    def test_tracks_motion(self):
+        """Test steady motion is followed without lag."""
+        smoother = KalmanSmoother()
+        estimate = _drive(smoother, 120)
+
+        expected = 40.0 + 119 * 25 / METERS_PER_DEGREE
+        assert (estimate.latitude - expected) * METERS_PER_DEGREE == pytest.approx(0, abs=1)
+        assert smoother.rejected == 0
+
+    def test_reduces_jitter(self):
+        """Test noisy fixes are smoothed."""
+        smoother = KalmanSmoother()
+        estimate = _drive(smoother, 300, noise=30.0)
+
+        expected = 40.0 + 299 * 25 / METERS_PER_DEGREE
+        assert abs(estimate.latitude - expected) * METERS_PER_DEGREE < 30
+        assert estimate.accuracy < 30
+        assert smoother.rejected == 0
+
+    def test_rejects_outlier(self):
+        """Test a fix far from the predicted position is rejected."""
+        smoother = KalmanSmoother()
+        _drive(smoother, 60)
+
+        # A multipath fix 50 miles away
+        outlier = GpsFix(40.0 + 80_000 / METERS_PER_DEGREE, -105.0, 5.0)
+        assert smoother.update(outlier, 60) is None
+        assert smoother.rejected == 1
+
+        # The next good fix is judged against the prediction
+        lat = 40.0 + 61 * 25 / METERS_PER_DEGREE
+        assert smoother.update(GpsFix(lat, -105.0, 5.0), 61) is not None
+
+    def test_accuracy_weighting(self):
+        """Test inaccurate fixes move the estimate less."""
+        results = []
+        for accuracy in (5.0, 50.0):
+            smoother = KalmanSmoother()
+            for second in range(30):
+                smoother.update(GpsFix(40.0, -105.0, 5.0), second)
+            jump = GpsFix(40.0 + 20 / METERS_PER_DEGREE, -105.0, accuracy)
+            results.append(smoother.update(jump, 30).latitude)
+
+        assert results[0] > results[1] > 40.0
+
+    def test_restarts_after_real_jump(self):
+        """Test the filter follows a jump that keeps being reported."""
+        smoother = KalmanSmoother()
+        _drive(smoother, 60)
+
+        jump = GpsFix(45.0, -100.0, 5.0)
+        for second in range(MAX_REJECTIONS):
+            assert smoother.update(jump, 60 + second) is None
+        assert smoother.update(jump, 60 + MAX_REJECTIONS) == jump
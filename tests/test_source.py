@@ -0,0 +1,123 @@
+"""Test Arvee GPS sources."""
+from datetime import timedelta
+
+import pytest
+
+from homeassistant.core import HomeAssistant
+
+from custom_components.arvee.const import (
+    CONF_LATITUDE_ENTITY,
+    CONF_LONGITUDE_ENTITY,
+    CONF_SOURCES,
+    CONF_TRACKER_ENTITY,
+)
+from custom_components.arvee.source import FixSelector, config_sources
+
+
+def _set_tracker(
+    hass: HomeAssistant, entity_id: str, lat: float, lon: float, accuracy: float | None = None
+) -> None:
+    """Set a device tracker's position."""
+    attributes = {"latitude": lat, "longitude": lon}
+    if accuracy is not None:
+        attributes["gps_accuracy"] = accuracy
+    hass.states.async_set(entity_id, "not_home", attributes)
+
+
+class TestConfigSources:
+    """Test building sources from a configuration."""
+
+    def test_pair(self):
+        """Test a latitude/longitude pair is one source."""
+        assert config_sources(
+            {CONF_LATITUDE_ENTITY: "sensor.lat", CONF_LONGITUDE_ENTITY: "sensor.lon"}
+        ) == [("sensor.lat", "sensor.lon")]
+
+    def test_additional_sources(self):
+        """Test additional sources follow the primary one, without duplicates."""
+        assert config_sources(
+            {
+                CONF_TRACKER_ENTITY: "device_tracker.router",
+                CONF_SOURCES: ["device_tracker.phone", "device_tracker.router"],
+            }
+        ) == [("device_tracker.router",), ("device_tracker.phone",)]
+
+
+@pytest.mark.asyncio
+class TestFixSelector:
+    """Test picking the best fix among sources."""
+
+    async def test_pair(self, hass: HomeAssistant, mock_gps_entities):
+        """Test a pair source reads both entities."""
+        selector = FixSelector(hass, [("sensor.test_latitude", "sensor.test_longitude")])
+
+        fix = selector.refresh(0)
+        assert (fix.latitude, fix.longitude) == (40.7128, -74.0060)
+        assert fix.accuracy is None
+
+    async def test_most_accurate(self, hass: HomeAssistant):
+        """Test the most accurate fresh fix wins."""
+        _set_tracker(hass, "device_tracker.router", 40.0, -105.0, 50)
+        _set_tracker(hass, "device_tracker.phone", 40.1, -105.1, 5)
+        selector = FixSelector(hass, [("device_tracker.router",), ("device_tracker.phone",)])
+
+        fix = selector.refresh(0)
+        assert fix.latitude == 40.1
+        assert selector.selected == 1
+
+    async def test_priority_breaks_ties(self, hass: HomeAssistant):
+        """Test sources listed first win when they're as good."""
+        _set_tracker(hass, "device_tracker.router", 40.0, -105.0)
+        _set_tracker(hass, "device_tracker.phone", 40.1, -105.1)
+        selector = FixSelector(hass, [("device_tracker.router",), ("device_tracker.phone",)])
+
+        assert selector.refresh(0).latitude == 40.0
+
+    async def test_stale_source_dropped(self, hass: HomeAssistant, freezer):
+        """Test a source that stopped reporting is skipped."""
+        _set_tracker(hass, "device_tracker.phone", 40.1, -105.1, 5)
+        freezer.tick(timedelta(minutes=10))
+        _set_tracker(hass, "device_tracker.router", 40.0, -105.0, 50)
+        selector = FixSelector(
+            hass, [("device_tracker.router",), ("device_tracker.phone",)], max_age=300
+        )
+
+        assert selector.refresh(0).latitude == 40.0
+
+    async def test_stale_source_used_alone(self, hass: HomeAssistant, freezer):
+        """Test a stale fix is still used when no source is fresh."""
+        _set_tracker(hass, "device_tracker.router", 40.0, -105.0)
+        freezer.tick(timedelta(hours=1))
+        selector = FixSelector(hass, [("device_tracker.router",)], max_age=300)
+
+        assert selector.refresh(0).latitude == 40.0
+
+    async def test_update(self, hass: HomeAssistant):
+        """Test updates report whether the best fix moved."""
+        _set_tracker(hass, "device_tracker.router", 40.0, -105.0, 10)
+        _set_tracker(hass, "device_tracker.phone", 40.1, -105.1, 50)
+        selector = FixSelector(hass, [("device_tracker.router",), ("device_tracker.phone",)])
+        selector.refresh(0)
+
+        # A worse source moving doesn't move the fix
+        _set_tracker(hass, "device_tracker.phone", 40.2, -105.2, 50)
+        assert not selector.update("device_tracker.phone", 1)
+
+        _set_tracker(hass, "device_tracker.router", 40.3, -105.3, 10)
+        assert selector.update("device_tracker.router", 1)
+
+        # Unknown entities are ignored
+        assert not selector.update("sensor.other", 1)
+
+    async def test_unavailable_source(self, hass: HomeAssistant):
+        """Test the next source takes over when the selected one drops out."""
+        _set_tracker(hass, "device_tracker.router", 40.0, -105.0, 10)
+        _set_tracker(hass, "device_tracker.phone", 40.1, -105.1, 50)
+        selector = FixSelector(hass, [("device_tracker.router",), ("device_tracker.phone",)])
+        selector.refresh(0)
+
+        hass.states.async_set("device_tracker.router", "unavailable")
+        assert selector.update("device_tracker.router", 1)
+        assert selector.current().latitude == 40.1
+        assert selector.switches == 1
+        assert [source["available"] for source in selector.as_dict()] == [False, True]
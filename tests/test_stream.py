@@ -0,0 +1,172 @@
+"""Test reading GPS streams directly."""
+import asyncio
+from functools import reduce
+import json
+from unittest.mock import AsyncMock, MagicMock, patch
+
+import pytest
+
+from homeassistant.core import HomeAssistant
+from pytest_homeassistant_custom_component.common import MockConfigEntry
+
+from custom_components.arvee.const import (
+    CONF_LATITUDE_ENTITY,
+    CONF_LONGITUDE_ENTITY,
+    CONF_STREAM,
+    CONF_UPDATE_THRESHOLD,
+    DOMAIN,
+)
+from custom_components.arvee.diagnostics import async_get_config_entry_diagnostics
+from custom_components.arvee.stream import GpsStream, parse_gpsd, parse_nmea
+
+
+def _sentence(body: str) -> str:
+    """Return an NMEA sentence with its checksum."""
+    checksum = reduce(lambda value, char: value ^ ord(char), body, 0)
+    return f"${body}*{checksum:02X}"
+
+
+_DENVER_GGA = _sentence("GPGGA,172814.0,3944.352,N,10459.418,W,1,08,1.2,1609.3,M,-21.0,M,,")
+_DENVER_RMC = _sentence("GNRMC,172814.0,A,3944.352,N,10459.418,W,55.2,90.0,160526,,,A")
+_DENVER_TPV = json.dumps(
+    {"class": "TPV", "mode": 3, "lat": 39.7392, "lon": -104.9903, "eph": 4.5}
+)
+
+
+def _feed(lines: list[str]) -> tuple[MagicMock, MagicMock]:
+    """Patch connections to read lines, returning the mock and its writer."""
+    writer = MagicMock(drain=AsyncMock(), wait_closed=AsyncMock())
+
+    async def open_connection(host, port, limit):
+        reader = asyncio.StreamReader(limit=limit)
+        reader.feed_data("".join(f"{line}\r\n" for line in lines).encode())
+        reader.feed_eof()
+        return reader, writer
+
+    return patch(
+        "custom_components.arvee.stream.asyncio.open_connection",
+        side_effect=open_connection,
+    ), writer
+
+
+class TestParsing:
+    """Test parsing NMEA sentences and gpsd reports."""
+
+    def test_gga(self):
+        """Test a GGA sentence gives a fix with an accuracy from its HDOP."""
+        fix = parse_nmea(_DENVER_GGA)
+        assert fix.latitude == pytest.approx(39.7392)
+        assert fix.longitude == pytest.approx(-104.9903)
+        assert fix.accuracy == pytest.approx(6.0)
+
+    def test_rmc(self):
+        """Test an RMC sentence from any talker gives a fix."""
+        fix = parse_nmea(_DENVER_RMC)
+        assert fix.latitude == pytest.approx(39.7392)
+        assert fix.accuracy is None
+
+    def test_no_fix(self):
+        """Test sentences without a fix, and other sentences, are skipped."""
+        assert parse_nmea(_sentence("GPGGA,172814.0,,,,,0,00,,,M,,M,,")) is None
+        assert parse_nmea(_sentence("GPRMC,172814.0,V,,,,,,,160526,,,N")) is None
+        assert parse_nmea(_sentence("GPGSV,3,1,11,03,03,111,00")) is None
+        assert parse_nmea("not nmea") is None
+
+    def test_bad_checksum(self):
+        """Test a corrupted sentence is rejected."""
+        with pytest.raises(ValueError):
+            parse_nmea(_DENVER_GGA.replace("3944", "3945"))
+
+    def test_gpsd(self):
+        """Test a gpsd TPV report gives a fix, and other reports don't."""
+        fix = parse_gpsd(_DENVER_TPV)
+        assert fix.latitude == 39.7392
+        assert fix.accuracy == 4.5
+        assert parse_gpsd('{"class": "TPV", "mode": 1}') is None
+        assert parse_gpsd('{"class": "SKY", "satellites": []}') is None
+        with pytest.raises(ValueError):
+            parse_gpsd("{truncated")
+
+
+@pytest.mark.asyncio
+class TestGpsStream:
+    """Test reading and decimating GPS streams."""
+
+    async def test_gpsd(self, hass: HomeAssistant):
+        """Test fixes are read from gpsd after asking it to watch."""
+        connection, writer = _feed(['{"class": "VERSION", "release": "3.25"}', _DENVER_TPV])
+        fixes = []
+        stream = GpsStream(hass, "gpsd://gps.local", fixes.append)
+        with connection as open_connection:
+            stream.async_start()
+            await asyncio.sleep(0.01)
+            stream.async_stop()
+
+        open_connection.assert_called_once_with("gps.local", 2947, limit=65536)
+        assert writer.write.call_args[0][0].startswith(b"?WATCH=")
+        assert len(fixes) == 1
+        assert fixes[0].latitude == 39.7392
+        assert stream.lines == 2
+
+    async def test_nmea_decimated(self, hass: HomeAssistant):
+        """Test a burst of fixes passes on the first and then the latest."""
+        moved = _sentence("GPGGA,172815.0,3944.400,N,10459.418,W,1,08,1.2,1609.3,M,-21.0,M,,")
+        connection, _ = _feed([_DENVER_GGA, _DENVER_RMC, "$GPGGA,garbage*00", moved])
+        fixes = []
+        stream = GpsStream(hass, "tcp://router.local:5000", fixes.append, interval=0.05)
+        with connection:
+            stream.async_start()
+            await asyncio.sleep(0.01)
+            assert len(fixes) == 1
+            await asyncio.sleep(0.1)
+            stream.async_stop()
+
+        assert [fix.latitude for fix in fixes] == [
+            pytest.approx(39.7392),
+            pytest.approx(39.74),
+        ]
+        assert stream.errors == 1
+        assert stream.decimated == 1
+
+    async def test_unsupported(self, hass: HomeAssistant):
+        """Test an unknown scheme is refused."""
+        with pytest.raises(ValueError):
+            GpsStream(hass, "http://127.0.0.1", MagicMock())
+
+
+@pytest.mark.asyncio
+async def test_stream_moves_location(hass: HomeAssistant, mock_gps_entities, mock_tzfpy):
+    """Test a stream fix moves Home Assistant without going through an entity."""
+    connection, _ = _feed(['{"class": "VERSION"}', _DENVER_TPV])
+    entry = MockConfigEntry(
+        domain=DOMAIN,
+        unique_id=DOMAIN,
+        data={
+            CONF_LATITUDE_ENTITY: mock_gps_entities["latitude"],
+            CONF_LONGITUDE_ENTITY: mock_gps_entities["longitude"],
+            CONF_UPDATE_THRESHOLD: 10.0,
+        },
+        options={CONF_STREAM: "gpsd://gps.local"},
+    )
+    entry.add_to_hass(hass)
+    mock_tzfpy.side_effect = lambda lon, lat: (
+        "America/Denver" if lon < -101.5 else "America/New_York"
+    )
+
+    try:
+        with connection, patch("custom_components.arvee.UPDATE_SETTLE_TIME", 0.01):
+            assert await hass.config_entries.async_setup(entry.entry_id)
+            await hass.async_block_till_done()
+            for _ in range(100):
+                if hass.config.time_zone == "America/Denver":
+                    break
+                await asyncio.sleep(0.01)
+                await hass.async_block_till_done()
+
+        assert hass.config.time_zone == "America/Denver"
+        assert hass.config.latitude == 39.7392
+        diagnostics = await async_get_config_entry_diagnostics(hass, entry)
+        assert diagnostics["stream"]["scheme"] == "gpsd"
+        assert diagnostics["stream"]["fixes"] == 1
+    finally:
+        assert await hass.config_entries.async_unload(entry.entry_id)
@@ -0,0 +1,190 @@
+"""Test the trip history."""
+from datetime import timedelta
+import os
+from unittest.mock import patch
+
+import pytest
+
+from homeassistant.core import HomeAssistant
+from homeassistant.util import dt as dt_util
+from pytest_homeassistant_custom_component.common import MockConfigEntry
+
+from custom_components.arvee.const import (
+    CONF_LATITUDE_ENTITY,
+    CONF_LONGITUDE_ENTITY,
+    CONF_UPDATE_THRESHOLD,
+    DOMAIN,
+    SERVICE_GET_TRACK,
+)
+from custom_components.arvee.track import TRACK_MAX_GAP, TripLog
+
+
+def _drive(log: TripLog, points: list[tuple[float, float]], start: float = 1_700_000_000) -> None:
+    """Add fixes ten seconds apart."""
+    for step, (lat, lon) in enumerate(points):
+        log.add(start + 10 * step, lat, lon, "America/Denver")
+
+
+class TestTripLog:
+    """Test recording and simplifying the track."""
+
+    def test_straight_line_simplified(self):
+        """Test fixes along a straight road leave its two ends."""
+        log = TripLog()
+        _drive(log, [(39.7, -105.0 + 0.002 * step) for step in range(60)])
+
+        points = log.points()
+        assert [(point.latitude, point.longitude) for point in points] == [
+            (39.7, -105.0),
+            (39.7, pytest.approx(-104.882)),
+        ]
+        assert log.count == 1
+        assert log.as_dict()["held"] == 59
+
+    def test_corner_kept(self):
+        """Test a turn is kept while the fixes around it are dropped."""
+        log = TripLog()
+        east = [(39.7, -105.0 + 0.001 * step) for step in range(50)]
+        north = [(39.7 + 0.001 * step, -104.951) for step in range(1, 50)]
+        _drive(log, east + north)
+
+        points = [(point.latitude, point.longitude) for point in log.points()]
+        assert len(points) == 3
+        assert points[1] == (39.7, pytest.approx(-104.951))
+        assert log.simplified == 48
+
+    def test_timezone_change_kept(self):
+        """Test the fixes either side of a timezone change are kept."""
+        log = TripLog()
+        for step in range(20):
+            timezone = "America/Denver" if step < 10 else "America/Chicago"
+            log.add(1_700_000_000 + step, 39.7, -101.6 + 0.01 * step, timezone)
+
+        points = log.points()
+        assert [point.timezone for point in points] == [
+            "America/Denver",
+            "America/Denver",
+            "America/Chicago",
+            "America/Chicago",
+        ]
+        assert points[1].longitude == pytest.approx(-101.51)
+        assert points[2].longitude == pytest.approx(-101.5)
+
+    def test_parked_keeps_a_point_per_gap(self):
+        """Test a stop still leaves points to find it by time."""
+        log = TripLog()
+        for step in range(7):
+            log.add(1_700_000_000 + step * TRACK_MAX_GAP / 2, 39.7, -105.0, None)
+        assert log.count == 3
+
+    def test_ring_overwrites_oldest(self):
+        """Test the oldest points make room for new ones."""
+        log = TripLog(capacity=4)
+        zigzag = [(39.7 + 0.01 * (step % 2), -105.0 + 0.01 * step) for step in range(10)]
+        _drive(log, zigzag)
+
+        assert log.count == 4
+        assert log.overwritten == 5
+        assert [point.longitude for point in log.points()] == [
+            pytest.approx(-105.0 + 0.01 * step) for step in range(5, 10)
+        ]
+
+    def test_time_range(self):
+        """Test points are returned between two times."""
+        log = TripLog()
+        zigzag = [(39.7 + 0.01 * (step % 2), -105.0 + 0.01 * step) for step in range(10)]
+        _drive(log, zigzag)
+
+        points = log.points(1_700_000_020, 1_700_000_050)
+        assert [point.time for point in points] == [
+            1_700_000_020, 1_700_000_030, 1_700_000_040, 1_700_000_050
+        ]
+        assert log.points(start=1_700_000_090)[-1].time == 1_700_000_090
+        assert log.points(end=1_600_000_000) == []
+
+    def test_older_fix_dropped(self):
+        """Test a fix older than the newest point doesn't go back in time."""
+        log = TripLog()
+        _drive(log, [(39.7, -105.0), (39.8, -105.0)])
+        log.add(1_700_000_005, 39.75, -105.1, "America/Denver")
+
+        assert [point.time for point in log.points()] == [1_700_000_000, 1_700_000_010]
+
+    def test_stored_form(self):
+        """Test the track survives being written and read back."""
+        log = TripLog()
+        zigzag = [(39.7 + 0.01 * (step % 2), -105.0 + 0.01 * step) for step in range(10)]
+        _drive(log, zigzag)
+        log.add(1_700_000_100, 39.7, -104.0, None)
+
+        data = log.to_bytes()
+        assert len(data) < 16 + 40 + 14 * 11
+
+        restored = TripLog.from_bytes(data)
+        assert restored.points() == [
+            point.__class__(int(point.time), point.latitude, point.longitude, point.timezone)
+            for point in log.points()
+        ]
+
+        # Only the newest points are kept when read into a smaller log
+        assert TripLog.from_bytes(data, capacity=3).points() == restored.points()[-3:]
+
+    def test_bad_stored_form(self):
+        """Test other data is rejected."""
+        with pytest.raises(ValueError):
+            TripLog.from_bytes(b"ARVT")
+        with pytest.raises(ValueError):
+            TripLog.from_bytes(TripLog().to_bytes().replace(b"ARVK", b"XXXX"))
+        log = TripLog()
+        _drive(log, [(39.7, -105.0), (39.8, -105.0)])
+        with pytest.raises(ValueError):
+            TripLog.from_bytes(log.to_bytes()[:-1])
+
+
+@pytest.mark.asyncio
+async def test_get_track(hass: HomeAssistant, trip_log_dir, mock_gps_entities, mock_tzfpy):
+    """Test the service returns the track, which is kept across restarts."""
+    entry = MockConfigEntry(
+        domain=DOMAIN,
+        unique_id=DOMAIN,
+        data={
+            CONF_LATITUDE_ENTITY: mock_gps_entities["latitude"],
+            CONF_LONGITUDE_ENTITY: mock_gps_entities["longitude"],
+            CONF_UPDATE_THRESHOLD: 10.0,
+        },
+    )
+    entry.add_to_hass(hass)
+    with patch("custom_components.arvee.UPDATE_SETTLE_TIME", 0.01):
+        assert await hass.config_entries.async_setup(entry.entry_id)
+        await hass.async_block_till_done()
+        hass.states.async_set(mock_gps_entities["latitude"], "41.0")
+        reported = hass.states.get(mock_gps_entities["latitude"]).last_updated
+        await hass.async_block_till_done()
+
+    response = await hass.services.async_call(
+        DOMAIN, SERVICE_GET_TRACK, {}, blocking=True, return_response=True
+    )
+    assert [(point["latitude"], point["longitude"]) for point in response["points"]] == [
+        (40.7128, -74.006),
+        (41.0, -74.006),
+    ]
+    assert response["points"][0]["timezone"] == "America/New_York"
+    # Points are logged at the time the source reported them
+    assert response["points"][-1]["time"] == reported.isoformat()
+    assert response["total_distance"] == pytest.approx(19.9, abs=0.1)
+
+    response = await hass.services.async_call(
+        DOMAIN,
+        SERVICE_GET_TRACK,
+        {"end": dt_util.utcnow() - timedelta(hours=1)},
+        blocking=True,
+        return_response=True,
+    )
+    assert response["points"] == []
+
+    # Unloading writes the log, and setting up again reads it back
+    assert await hass.config_entries.async_unload(entry.entry_id)
+    assert os.path.getsize(trip_log_dir / f"arvee.track.{entry.entry_id}") < 100
+    assert await hass.config_entries.async_setup(entry.entry_id)
+    await hass.async_block_till_done()
+    assert hass.data[DOMAIN][entry.entry_id]["track"].count >= 2
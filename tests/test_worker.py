@@ -0,0 +1,107 @@
+"""Test the dedicated lookup worker."""
+import asyncio
+import threading
+
+import pytest
+
+from homeassistant.const import EVENT_HOMEASSISTANT_STOP
+from homeassistant.core import HomeAssistant
+
+from custom_components.arvee.worker import LookupSuperseded, LookupWorker
+
+
+@pytest.mark.asyncio
+class TestLookupWorker:
+    """Test batching and superseding of worker jobs."""
+
+    async def test_runs_on_own_thread(self, hass: HomeAssistant):
+        """Test jobs run on the worker thread and return their result."""
+        worker = LookupWorker(hass)
+
+        name = await worker.async_run(lambda: threading.current_thread().name)
+
+        assert name.startswith("arvee_lookup")
+        assert worker.jobs == 1
+        assert worker.depth == 0
+
+    async def test_exception_is_raised(self, hass: HomeAssistant):
+        """Test an exception raised by a job reaches its caller."""
+        worker = LookupWorker(hass)
+
+        def fail():
+            raise ValueError("boom")
+
+        with pytest.raises(ValueError):
+            await worker.async_run(fail)
+
+    async def test_queued_jobs_run_as_one_batch(self, hass: HomeAssistant):
+        """Test jobs queued while the worker is busy share one batch."""
+        worker = LookupWorker(hass)
+        release = threading.Event()
+
+        first = hass.async_create_task(worker.async_run(release.wait))
+        await asyncio.sleep(0)
+        queued = [
+            hass.async_create_task(worker.async_run(lambda i=i: i)) for i in range(3)
+        ]
+        await asyncio.sleep(0)
+        assert worker.depth == 3
+        assert worker.max_depth == 3
+
+        release.set()
+        assert await first is True
+        assert await asyncio.gather(*queued) == [0, 1, 2]
+        assert worker.batches == 2
+        assert worker.wait_time.count == 4
+
+    async def test_same_key_supersedes(self, hass: HomeAssistant):
+        """Test a queued job is replaced by a newer one with the same key."""
+        worker = LookupWorker(hass)
+        release = threading.Event()
+
+        busy = hass.async_create_task(worker.async_run(release.wait))
+        await asyncio.sleep(0)
+        old = hass.async_create_task(worker.async_run(lambda: "old", key="entry"))
+        await asyncio.sleep(0)
+        new = hass.async_create_task(worker.async_run(lambda: "new", key="entry"))
+        await asyncio.sleep(0)
+
+        release.set()
+        await busy
+        with pytest.raises(LookupSuperseded):
+            await old
+        assert await new == "new"
+        assert worker.superseded == 1
+
+    async def test_full_queue_drops_oldest(self, hass: HomeAssistant):
+        """Test the oldest queued job is dropped when the queue is full."""
+        worker = LookupWorker(hass, max_queued=2)
+        release = threading.Event()
+
+        busy = hass.async_create_task(worker.async_run(release.wait))
+        await asyncio.sleep(0)
+        jobs = [
+            hass.async_create_task(worker.async_run(lambda i=i: i)) for i in range(3)
+        ]
+        await asyncio.sleep(0)
+
+        release.set()
+        await busy
+        with pytest.raises(LookupSuperseded):
+            await jobs[0]
+        assert await asyncio.gather(*jobs[1:]) == [1, 2]
+        assert worker.dropped == 1
+
+    async def test_stops_with_home_assistant(self, hass: HomeAssistant):
+        """Test the worker thread is shut down when Home Assistant stops."""
+        worker = LookupWorker(hass)
+        await worker.async_run(lambda: None)
+        assert worker._executor is not None
+
+        hass.bus.async_fire(EVENT_HOMEASSISTANT_STOP)
+        await hass.async_block_till_done()
+
+        assert worker._executor is None
+        assert not any(
+            thread.name.startswith("arvee_lookup") for thread in threading.enumerate()
+        )